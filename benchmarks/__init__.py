@@ -0,0 +1 @@
+"""Benchmarks for the Location TG Bot."""
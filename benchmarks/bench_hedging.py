@@ -0,0 +1,95 @@
+"""
+Tail latency of fact requests with and without hedging.
+
+A simulated completion takes a log-normal time around --median seconds,
+and a --stuck fraction of calls hangs for --stuck-time seconds, like an
+overloaded upstream replica. Requests arrive open-loop at --rate per
+second.
+
+Usage:
+    python -m benchmarks.bench_hedging [--requests N] [--rate R]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from bot.services.hedging import Hedger
+
+
+async def run_mode(args: argparse.Namespace, hedging: bool) -> None:
+    """Run the requests and report latency quantiles and extra calls."""
+    rng = random.Random(42)
+    hedger = Hedger(
+        quantile=args.quantile,
+        min_delay=0.05,
+        budget_percent=args.budget,
+        window=200,
+        min_samples=20,
+    )
+    calls = 0
+
+    async def complete() -> str:
+        nonlocal calls
+        calls += 1
+        if rng.random() < args.stuck:
+            await asyncio.sleep(args.stuck_time)
+        else:
+            await asyncio.sleep(rng.lognormvariate(0, 0.4) * args.median)
+        return "fact"
+
+    latencies: list[float] = []
+
+    async def request() -> None:
+        started = time.monotonic()
+        if hedging:
+            await hedger.run(complete)
+        else:
+            await complete()
+        latencies.append(time.monotonic() - started)
+
+    tasks = []
+    for _ in range(args.requests):
+        tasks.append(asyncio.create_task(request()))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+
+    cuts = statistics.quantiles(latencies, n=1000)
+    extra = (calls - args.requests) / args.requests * 100
+    print(
+        f"{'hedged' if hedging else 'plain':>7}  p50 {cuts[499]:6.3f}s  "
+        f"p90 {cuts[899]:6.3f}s  p99 {cuts[989]:6.3f}s  p99.9 {cuts[998]:6.3f}s  "
+        f"extra calls {extra:4.1f}%"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Compare both modes."""
+    print(
+        f"{args.requests} requests at {args.rate:.0f}/s, median {args.median}s, "
+        f"{args.stuck:.0%} stuck for {args.stuck_time}s, hedged after "
+        f"p{args.quantile * 100:g} within a {args.budget:g}% budget"
+    )
+    for hedging in (False, True):
+        await run_mode(args, hedging)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200, help="requests/s")
+    parser.add_argument("--median", type=float, default=0.1, help="seconds")
+    parser.add_argument("--stuck", type=float, default=0.03, help="fraction")
+    parser.add_argument("--stuck-time", type=float, default=2.0, help="seconds")
+    parser.add_argument("--quantile", type=float, default=0.95)
+    parser.add_argument("--budget", type=float, default=5.0, help="percent")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+End-to-end load test of the webhook or polling path against local API
+stand-ins.
+
+Starts a fake OpenAI API and a fake Telegram Bot API in this process, runs
+bot.main under uvicorn in a subprocess pointed at them, then posts
+synthetic location updates to /webhook at a target rate. Users follow a
+Zipf-like activity distribution and most locations cluster around a few
+landmarks, so the fact cache and per-user rate limits behave as in
+production. Everything runs offline.
+
+Reported: achieved throughput, webhook response latency and reply latency
+(update posted until the bot's sendMessage reaches the fake Telegram API)
+at p50/p95/p99, reply kinds and error rates. Failed webhook posts, missing
+replies and replies that are neither a fact nor a rate limit notice (e.g.
+the "no fact found" message) all count as errors. The exit code is 1 when
+the error rate exceeds --max-error-rate, for use as a CI gate.
+
+With --polling the updates are queued in the fake Telegram API and the
+bot fetches them with getUpdates instead of receiving webhooks, so both
+intake paths can be compared at the same load.
+
+The global rate limit layer is disabled by default so it does not cap the
+test; pass --env to override any bot setting, e.g.
+--env WEBHOOK_ASYNC_PROCESSING=true --env OPENAI_BATCHING=true.
+
+Usage:
+    python -m benchmarks.bench_load [--rps N] [--duration S] [--users N]
+        [--user-skew F] [--openai-latency S] [--openai-error-rate F]
+        [--openai-429-rate F] [--telegram-latency S] [--max-error-rate F]
+        [--polling] [--env KEY=VALUE ...]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fake_telegram import FakeTelegramServer
+
+BOT_TOKEN = "123456:bench"
+
+# Moscow landmarks most requests cluster around
+HOTSPOTS = [
+    (55.7539, 37.6208),  # Red Square
+    (55.7520, 37.6175),  # Kremlin
+    (55.7601, 37.6186),  # Bolshoi Theatre
+    (55.7447, 37.6050),  # Cathedral of Christ the Saviour
+    (55.7298, 37.6010),  # Gorky Park
+    (55.7765, 37.6550),  # Komsomolskaya Square stations
+    (55.7497, 37.5394),  # Moscow City
+    (55.7414, 37.6208),  # Tretyakov Gallery
+]
+CITY_BBOX = (55.57, 37.37, 55.91, 37.85)  # south, west, north, east
+HOTSPOT_SHARE = 0.7
+HOTSPOT_SIGMA_DEG = 0.003  # ~300 m
+
+
+class LocationUpdates:
+    """Synthetic location updates with realistic user and place skew."""
+
+    def __init__(self, users: int, skew: float, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.user_ids = [1_000_000 + i for i in range(users)]
+        # Zipf-like: the user of activity rank r sends ~1/r**skew of updates
+        self.cum_weights = list(
+            itertools.accumulate(1 / rank**skew for rank in range(1, users + 1))
+        )
+        self.update_ids = itertools.count(1)
+
+    def location(self) -> tuple[float, float]:
+        """Pick a point near a landmark or anywhere in the city."""
+        if self.rng.random() < HOTSPOT_SHARE:
+            lat, lon = self.rng.choice(HOTSPOTS)
+            return (
+                lat + self.rng.gauss(0, HOTSPOT_SIGMA_DEG),
+                lon + self.rng.gauss(0, HOTSPOT_SIGMA_DEG * 1.8),
+            )
+        south, west, north, east = CITY_BBOX
+        return self.rng.uniform(south, north), self.rng.uniform(west, east)
+
+    def next(self) -> tuple[int, bytes]:
+        """Build the next update, returns (chat_id, JSON body)."""
+        user_id = self.rng.choices(self.user_ids, cum_weights=self.cum_weights)[0]
+        latitude, longitude = self.location()
+        update_id = next(self.update_ids)
+        user = {"id": user_id, "is_bot": False, "first_name": "User"}
+        body = {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": "User"},
+                "from": user,
+                "location": {"latitude": latitude, "longitude": longitude},
+            },
+        }
+        return user_id, json.dumps(body).encode()
+
+
+def free_port() -> int:
+    """Pick a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(samples: list[float]) -> str:
+    """Format p50/p95/p99 of samples in milliseconds."""
+    if len(samples) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return " ".join(f"p{p}={cuts[p - 1] * 1000:.1f}ms" for p in (50, 95, 99))
+
+
+def reply_kind(text: str) -> str:
+    """Classify a bot reply."""
+    if text.startswith("📍"):
+        return "fact"
+    if text.startswith("⏳"):
+        return "rate_limited"
+    return "other"
+
+
+async def start_bot(port: int, env: dict[str, str], log) -> subprocess.Popen:
+    """Run bot.main under uvicorn and wait until it serves requests."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "bot.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            if process.poll() is not None:
+                raise RuntimeError(f"Bot exited with code {process.returncode}")
+            try:
+                if (await client.get(f"http://127.0.0.1:{port}/health")).is_success:
+                    return process
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Bot did not become ready in 30s")
+
+
+async def generate_load(
+    url: str | None,
+    updates: LocationUpdates,
+    rps: float,
+    duration: float,
+    telegram: FakeTelegramServer,
+) -> tuple[list[tuple[int, float, float | None]], float]:
+    """
+    Send updates open-loop with Poisson arrivals at the target rate.
+
+    Updates are posted to url, or queued for getUpdates when url is None.
+
+    Returns:
+        (chat_id, posted_at, latency or None on error) per request, and the
+        elapsed seconds
+    """
+    results: list[tuple[int, float, float | None]] = []
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+
+        async def post(chat_id: int, body: bytes) -> None:
+            posted_at = time.perf_counter()
+            if url is None:
+                telegram.push_update(json.loads(body))
+                results.append((chat_id, posted_at, 0.0))
+                return
+            try:
+                response = await client.post(
+                    url, content=body, headers={"content-type": "application/json"}
+                )
+                latency = time.perf_counter() - posted_at
+                results.append(
+                    (chat_id, posted_at, latency if response.is_success else None)
+                )
+            except httpx.HTTPError:
+                results.append((chat_id, posted_at, None))
+
+        tasks = []
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(post(*updates.next())))
+            next_at += updates.rng.expovariate(rps)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return results, elapsed
+
+
+async def wait_for_replies(
+    telegram: FakeTelegramServer, expected: int, timeout: float
+) -> None:
+    """Wait until the expected number of replies arrived or timeout."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if sum(len(sent) for sent in telegram.sent.values()) >= expected:
+            return
+        await asyncio.sleep(0.1)
+
+
+def report(
+    results: list[tuple[int, float, float | None]],
+    elapsed: float,
+    telegram: FakeTelegramServer,
+    openai: FakeOpenAIServer,
+) -> float:
+    """Print the load test report and return the overall error rate."""
+    ok = [latency for _, _, latency in results if latency is not None]
+    http_errors = len(results) - len(ok)
+
+    posted: dict[int, list[float]] = defaultdict(list)
+    for chat_id, posted_at, latency in results:
+        if latency is not None:
+            posted[chat_id].append(posted_at)
+
+    reply_latencies = []
+    kinds: Counter[str] = Counter()
+    for chat_id, times in posted.items():
+        replies = sorted(telegram.sent.get(chat_id, []))
+        for posted_at, (replied_at, text) in zip(sorted(times), replies, strict=False):
+            reply_latencies.append(replied_at - posted_at)
+            kinds[reply_kind(text)] += 1
+    missing = len(ok) - len(reply_latencies)
+
+    errors = http_errors + missing + kinds["other"]
+    error_rate = errors / len(results) if results else 0.0
+
+    print(f"requests:        {len(results)} in {elapsed:.1f}s")
+    print(f"throughput:      {len(ok) / elapsed:.1f} updates/s acknowledged")
+    print(f"webhook latency: {percentiles(ok)}")
+    print(f"reply latency:   {percentiles(reply_latencies)}")
+    print(f"replies:         {dict(kinds)}")
+    print(f"http errors:     {http_errors}")
+    print(f"missing replies: {missing}")
+    print(f"other replies:   {kinds['other']}")
+    print(f"error rate:      {error_rate:.2%}")
+    print(
+        f"openai:          {openai.completions} completions, {openai.errors} "
+        f"errors, max {openai.max_in_flight} in flight"
+    )
+    print(f"telegram calls:  {dict(telegram.calls)}")
+    return error_rate
+
+
+async def run(args: argparse.Namespace) -> float:
+    """Run the load test and return the error rate."""
+    openai = FakeOpenAIServer(
+        latency_median=args.openai_latency,
+        error_rate=args.openai_error_rate,
+        rate_limit_rate=args.openai_429_rate,
+    )
+    telegram = FakeTelegramServer(latency=args.telegram_latency)
+
+    async with openai, telegram:
+        port = free_port()
+        env = {
+            **os.environ,
+            "TELEGRAM_BOT_TOKEN": BOT_TOKEN,
+            "TELEGRAM_BASE_URL": telegram.url,
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": openai.url,
+            "WEBHOOK_URL": "",
+            "POLLING_ENABLED": str(args.polling).lower(),
+            "RATE_LIMIT_GLOBAL_REQUESTS": "0",
+            "LOG_LEVEL": "WARNING",
+        }
+        env.update(item.split("=", 1) for item in args.env)
+
+        with tempfile.NamedTemporaryFile(
+            "w+", prefix="bench_load_", suffix=".log", delete=False
+        ) as log:
+            bot = await start_bot(port, env, log)
+            try:
+                results, elapsed = await generate_load(
+                    None if args.polling else f"http://127.0.0.1:{port}/webhook",
+                    LocationUpdates(args.users, args.user_skew),
+                    args.rps,
+                    args.duration,
+                    telegram,
+                )
+                acknowledged = sum(latency is not None for _, _, latency in results)
+                await wait_for_replies(telegram, acknowledged, args.drain_timeout)
+            finally:
+                bot.terminate()
+                bot.wait()
+        print(f"bot log:         {log.name}")
+        return report(results, elapsed, telegram, openai)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--user-skew", type=float, default=0.6)
+    parser.add_argument("--openai-latency", type=float, default=0.5)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-429-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--polling", action="store_true", help="use getUpdates")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE")
+    args = parser.parse_args()
+
+    error_rate = asyncio.run(run(args))
+    if error_rate > args.max_error_rate:
+        print(f"FAIL: error rate above {args.max_error_rate:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Decision latency benchmark for rate limiter backends.
+
+Usage:
+    python -m benchmarks.bench_rate_limit_backends [--decisions N] [--redis-url URL]
+
+Without --redis-url the Redis backend runs against the in-process stand-in.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fake_redis import FakeRedisServer
+from bot.services.rate_limit_backends import Limit, RedisBackend, SQLiteBackend
+from bot.services.rate_limiter import BucketStore, MemoryBackend
+
+LIMITS = {
+    "user": Limit(1, 5),
+    "chat": Limit(20, 60),
+    "cell": Limit(60, 60),
+    "global": Limit(1_000_000, 60),
+}
+
+
+async def run(label: str, backend, decisions: int) -> None:
+    """Time individual try_acquire calls and print percentiles."""
+    latencies = []
+    for i in range(decisions):
+        checks = [("user", i), ("chat", i % 500), ("cell", (i % 97, i % 89))]
+        checks.append(("global", None))
+        started = time.perf_counter()
+        await backend.try_acquire(checks)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    await backend.close()
+
+    latencies.sort()
+    print(
+        f"{label:<22} mean {statistics.fmean(latencies):8.1f} us  "
+        f"p50 {latencies[len(latencies) // 2]:8.1f} us  "
+        f"p99 {latencies[int(len(latencies) * 0.99)]:8.1f} us"
+    )
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--decisions", type=int, default=5_000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    stores = {
+        layer: BucketStore(limit.max_rate, limit.time_period, max_entries=10**7)
+        for layer, limit in LIMITS.items()
+    }
+    await run("memory", MemoryBackend(stores), args.decisions)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits.sqlite3")
+        await run("sqlite (WAL)", SQLiteBackend(path, LIMITS), args.decisions)
+
+    if args.redis_url:
+        await run("redis", RedisBackend(args.redis_url, LIMITS), args.decisions)
+    else:
+        async with FakeRedisServer() as server:
+            backend = RedisBackend(server.url, LIMITS)
+            await run("redis (stand-in)", backend, args.decisions)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
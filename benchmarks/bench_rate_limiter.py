@@ -0,0 +1,96 @@
+"""
+Memory benchmark for the per-user rate limiter store.
+
+Usage:
+    python -m benchmarks.bench_rate_limiter [--users N]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from bot.services.rate_limiter import BucketStore
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def measure(label: str, build) -> None:
+    """Print total and per-user allocated memory of the structure built."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    structure, users = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(
+        f"{label:<40} {users:>10,} users  {size / 2**20:8.1f} MiB  "
+        f"{size / users:6.0f} B/user"
+    )
+    del structure
+
+
+def build_bucket_store(users: int):
+    """Build a store where every user is active at the same time."""
+    store = BucketStore(max_rate=1, time_period=5, max_entries=users)
+    for user_id in range(users):
+        store.consume(user_id)
+    return store, users
+
+
+def build_aiolimiter_dict(users: int):
+    """Build the previous dict of AsyncLimiter objects for comparison."""
+    from aiolimiter import AsyncLimiter
+
+    limiters = {
+        user_id: AsyncLimiter(max_rate=1, time_period=5) for user_id in range(users)
+    }
+    return limiters, users
+
+
+def simulate_churn(total_users: int, users_per_second: int) -> None:
+    """Stream distinct users through the store and report the live size."""
+    clock = FakeClock()
+    store = BucketStore(max_rate=1, time_period=5, max_entries=10_000_000, clock=clock)
+    peak = 0
+    for user_id in range(total_users):
+        clock.now = user_id / users_per_second
+        store.consume(user_id)
+        peak = max(peak, len(store))
+
+    print(
+        f"churn: {total_users:,} distinct users at {users_per_second:,}/s -> "
+        f"peak {peak:,} live records, {len(store):,} at end, "
+        f"{store.expired:,} expired"
+    )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    measure("BucketStore (all active)", lambda: build_bucket_store(args.users))
+    try:
+        measure(
+            "dict[int, AsyncLimiter] (previous)",
+            lambda: build_aiolimiter_dict(args.users),
+        )
+    except ImportError:
+        print("aiolimiter not installed, skipping comparison")
+
+    simulate_churn(total_users=args.users * 20, users_per_second=1_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Outbound send throughput against Telegram's flood limits, with and without
+the send scheduler.
+
+A simulated Bot API answers 429 (RetryAfter) when a bot exceeds 30
+messages in any second or sends to one chat more than once per second.
+Replies for many chats arrive open-loop above that ceiling, some chats
+getting bursts of several messages.
+
+"direct" sends immediately and retries once after RetryAfter, like the
+handler did before the scheduler; "scheduler" goes through SendScheduler.
+
+Usage:
+    python -m benchmarks.bench_send_scheduler [--rate N] [--duration S]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+
+from bot.services.send_scheduler import SendScheduler
+
+
+class LimitedTelegram:
+    """Bot API stand-in enforcing global and per-chat flood limits."""
+
+    def __init__(self, global_limit: int = 30, chat_interval: float = 1.0):
+        self.global_limit = global_limit
+        self.chat_interval = chat_interval
+        self.latency = 0.02
+        self._recent: deque[float] = deque()
+        self._last_by_chat: dict[int, float] = {}
+        self.delivered = 0
+        self.refused = 0
+
+    async def send_message(self, chat_id: int) -> None:
+        """Deliver a message or raise RetryAfter like the Bot API."""
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 1.0:
+            self._recent.popleft()
+        last = self._last_by_chat.get(chat_id)
+        if len(self._recent) >= self.global_limit or (
+            last is not None and now - last < self.chat_interval
+        ):
+            self.refused += 1
+            raise RetryAfter(1)
+        self._recent.append(now)
+        self._last_by_chat[chat_id] = now
+        self.delivered += 1
+
+
+async def send_direct(telegram: LimitedTelegram, chat_id: int) -> bool:
+    """Send, waiting out one RetryAfter."""
+    try:
+        await telegram.send_message(chat_id)
+    except RetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+        try:
+            await telegram.send_message(chat_id)
+        except RetryAfter:
+            return False
+    return True
+
+
+async def run_mode(mode: str, rate: float, duration: float, chats: int) -> None:
+    """Offer messages at rate for duration and report what got through."""
+    rng = random.Random(42)
+    telegram = LimitedTelegram()
+    scheduler = SendScheduler(
+        global_rate=25.0,
+        global_burst=5,
+        chat_interval=1.0,
+        max_retries=3,
+        retry_jitter=0.5,
+        typing_delay=0.3,
+        typing_interval=5.0,
+    )
+    latencies: list[float] = []
+    lost = 0
+
+    async def deliver(chat_id: int) -> None:
+        nonlocal lost
+        queued = time.monotonic()
+        try:
+            if mode == "direct":
+                ok = await send_direct(telegram, chat_id)
+            else:
+                await scheduler.send(chat_id, lambda: telegram.send_message(chat_id))
+                ok = True
+        except RetryAfter:
+            ok = False
+        if ok:
+            latencies.append(time.monotonic() - queued)
+        else:
+            lost += 1
+
+    tasks = []
+    started = time.monotonic()
+    next_at = started
+    while next_at - started < duration:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        chat_id = rng.randrange(chats)
+        # A reply often comes with a follow-up (streamed edit, second part)
+        for _ in range(1 if rng.random() < 0.7 else 3):
+            tasks.append(asyncio.create_task(deliver(chat_id)))
+        next_at += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+    await scheduler.stop()
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    print(
+        f"{mode:>9}  offered {len(tasks):5}  delivered {telegram.delivered:5} "
+        f"({telegram.delivered / elapsed:5.1f}/s)  lost {lost:5}  "
+        f"429s {telegram.refused:5}  latency p50 {cuts[49]:5.2f}s "
+        f"p95 {cuts[94]:5.2f}s"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Compare both modes."""
+    print(
+        f"offering ~{args.rate * 1.6:.0f} messages/s to {args.chats} chats "
+        f"for {args.duration:.0f}s, limits 30/s global and 1/s per chat"
+    )
+    for mode in ("direct", "scheduler"):
+        await run_mode(mode, args.rate, args.duration, args.chats)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    # One warning per RetryAfter would drown the report
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rate", type=float, default=25, help="replies/s")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--chats", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Update throughput of sharded mode by number of worker processes.
+
+The benchmark process plays the web process: it parses each payload,
+finds the routing key and routes the raw bytes with ShardRouter. Every
+worker runs the real consume() path (Update.de_json and dispatch through
+an Application) with handlers registered on the bot's filters, which burn
+--handler-cpu-us of CPU instead of calling OpenAI. Throughput should grow
+with the worker count until the cores or the router run out.
+
+Usage:
+    python -m benchmarks.bench_sharding [--updates N] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+from telegram.ext import Application, CommandHandler, MessageHandler, filters
+
+from benchmarks.bench_webhook_ingest import make_payloads
+from benchmarks.fake_telegram import FakeTelegramServer
+from bot.services import ingest
+from bot.sharding import ShardRouter, consume, routing_key
+
+TOKEN = "123456:benchmark-token"
+
+
+def _burn(microseconds: int):
+    """Build a handler busy-waiting for the given CPU time."""
+
+    async def handler(update, context) -> None:
+        deadline = time.perf_counter() + microseconds / 1_000_000
+        while time.perf_counter() < deadline:
+            pass
+
+    return handler
+
+
+async def _serve(shard_id, updates, results, base_url, handler_cpu_us) -> None:
+    """Worker loop: same consume() path as the bot, handlers burn CPU."""
+    application = Application.builder().token(TOKEN).base_url(base_url).build()
+    handler = _burn(handler_cpu_us)
+    application.add_handler(CommandHandler("start", handler))
+    application.add_handler(CommandHandler("help", handler))
+    application.add_handler(
+        MessageHandler(filters.LOCATION & ~filters.COMMAND, handler)
+    )
+    await application.initialize()
+    results.put(("ready", shard_id, 0))
+    processed = await consume(updates, application)
+    results.put(("done", shard_id, processed))
+    await application.shutdown()
+
+
+def bench_worker(shard_id, num_workers, updates, results, base_url, handler_cpu_us):
+    """Shard worker entry point for the benchmark."""
+    asyncio.run(_serve(shard_id, updates, results, base_url, handler_cpu_us))
+
+
+async def measure(
+    workers: int, payloads: list[bytes], base_url: str, handler_cpu_us: int
+) -> float:
+    """Route all payloads through a router with the given number of workers."""
+    results = multiprocessing.get_context("spawn").Queue()
+    router = ShardRouter(
+        workers,
+        queue_size=len(payloads) + 1,
+        target=bench_worker,
+        args=(results, base_url, handler_cpu_us),
+    )
+    router.start()
+    try:
+        for _ in range(workers):
+            await asyncio.to_thread(results.get, timeout=60)
+
+        started = time.perf_counter()
+        for body in payloads:
+            data = ingest.loads(body)
+            if ingest.is_handled_update(data):
+                router.route(routing_key(data), body)
+        routed_in = time.perf_counter() - started
+        await router.stop(timeout=600)
+        elapsed = time.perf_counter() - started
+
+        processed = 0
+        for _ in range(workers):
+            _, _, count = await asyncio.to_thread(results.get, timeout=60)
+            processed += count
+    finally:
+        await router.stop()
+
+    rate = processed / elapsed
+    print(
+        f"{workers:>3} workers  {processed:>7,} updates  {elapsed:6.2f}s  "
+        f"{rate:9,.0f} updates/s  (routing {routed_in:5.2f}s)"
+    )
+    return rate
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Measure every worker count."""
+    payloads = make_payloads(args.updates)
+    counts = [int(count) for count in args.workers.split(",")]
+    print(
+        f"{os.cpu_count()} CPUs, {args.updates:,} updates, "
+        f"{args.handler_cpu_us} us handler CPU"
+    )
+    async with FakeTelegramServer() as telegram:
+        rates = [
+            await measure(count, payloads, telegram.url, args.handler_cpu_us)
+            for count in counts
+        ]
+    for count, rate in zip(counts, rates, strict=True):
+        print(f"{count:>3} workers  {rate / rates[0]:5.2f}x of {counts[0]} worker(s)")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(2**i for i in range(1, 6) if 2**i <= cpus), cpus})
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument(
+        "--workers",
+        default=",".join(str(count) for count in default_workers),
+        help="comma separated worker counts",
+    )
+    parser.add_argument("--handler-cpu-us", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
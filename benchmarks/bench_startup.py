@@ -0,0 +1,93 @@
+"""
+Cold-start import cost of bot.main.
+
+Prints a `python -X importtime` report of the slowest imports and compares
+the import time of bot.main ("lazy", the OpenAI SDK is imported on first
+use or by the background warm-up) against importing the SDK up front as
+bot.main used to ("eager"). Each measurement runs in a fresh interpreter.
+
+Startup phase timings of a running bot (initialize, prewarm, webhook,
+ready and first update served) are reported under "startup" in /stats.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs N] [--top N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ENV = {
+    **os.environ,
+    "TELEGRAM_BOT_TOKEN": os.environ.get("TELEGRAM_BOT_TOKEN", "0:bench"),
+    "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+}
+
+TIMED_IMPORT = """
+import time
+started = time.perf_counter()
+{preload}
+import bot.main
+import sys
+print(time.perf_counter() - started, "openai" in sys.modules)
+"""
+
+
+def import_time(preload: str) -> tuple[float, bool]:
+    """Import bot.main in a fresh interpreter, return seconds and SDK state."""
+    result = subprocess.run(
+        [sys.executable, "-c", TIMED_IMPORT.format(preload=preload)],
+        env=ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds, sdk_loaded = result.stdout.split()[-2:]
+    return float(seconds), sdk_loaded == "True"
+
+
+def importtime_report(top: int) -> None:
+    """Print the slowest imports by cumulative time."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot.main"],
+        env=ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {name}")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    importtime_report(args.top)
+    print()
+
+    for label, preload in (("eager", "import openai"), ("lazy", "")):
+        samples = [import_time(preload) for _ in range(args.runs)]
+        median = statistics.median(seconds for seconds, _ in samples)
+        sdk_loaded = samples[-1][1]
+        print(
+            f"{label:>5}: import bot.main {median * 1000:7.1f}ms median "
+            f"of {args.runs} (OpenAI SDK loaded: {sdk_loaded})"
+        )
+
+
+if __name__ == "__main__":
+    main()
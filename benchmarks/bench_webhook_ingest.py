@@ -0,0 +1,113 @@
+"""
+Per-update CPU cost of the webhook ingest path, before and after.
+
+"before" mirrors the original handler: stdlib JSON parsing, Update.de_json
+for every update and four INFO log lines including the full payload.
+"after" is the current path: raw-bytes parsing with the fast JSON backend,
+raw-payload filtering and no per-update INFO logging.
+
+Usage:
+    python -m benchmarks.bench_webhook_ingest [--updates N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import time
+
+from telegram import Bot, Update
+
+from bot.services import ingest
+
+
+def make_payloads(count: int) -> list[bytes]:
+    """Build a realistic mix: mostly locations, some commands and chatter."""
+    rng = random.Random(42)
+    payloads = []
+    for update_id in range(count):
+        user = {"id": rng.randint(1, 10**9), "is_bot": False, "first_name": "User"}
+        message = {
+            "message_id": update_id,
+            "date": 1_700_000_000,
+            "chat": {"id": user["id"], "type": "private", "first_name": "User"},
+            "from": user,
+        }
+        kind = rng.random()
+        if kind < 0.8:
+            message["location"] = {
+                "latitude": 55.75 + rng.uniform(-0.1, 0.1),
+                "longitude": 37.62 + rng.uniform(-0.1, 0.1),
+            }
+        elif kind < 0.9:
+            message["text"] = "/start"
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": 6}]
+        else:
+            message["text"] = "hello there"
+        payloads.append(
+            json.dumps({"update_id": update_id, "message": message}).encode()
+        )
+    return payloads
+
+
+def before(body: bytes, bot: Bot, logger: logging.Logger) -> None:
+    """Original ingest path."""
+    logger.info("Received webhook request")
+    data = json.loads(body)
+    logger.info(f"Webhook data: {data}")
+    update = Update.de_json(data, bot)
+    logger.info(f"Processing update: {update.update_id}")
+    location = update.message.location
+    if location:
+        logger.info(
+            f"Received location from user {update.message.from_user.id}: "
+            f"{location.latitude}, {location.longitude}"
+        )
+
+
+def after(body: bytes, bot: Bot, logger: logging.Logger) -> None:
+    """Current ingest path."""
+    data = ingest.loads(body)
+    if ingest.should_log_payload():
+        logger.info(f"Webhook data: {data}")
+    if not ingest.is_handled_update(data):
+        return
+    Update.de_json(data, bot)
+
+
+def measure(label: str, path, payloads: list[bytes], bot: Bot) -> float:
+    """Run path over all payloads and print the per-update cost."""
+    logger = logging.getLogger(f"bench.{label}")
+    started = time.perf_counter()
+    for body in payloads:
+        path(body, bot, logger)
+    per_update = (time.perf_counter() - started) / len(payloads) * 1e6
+    print(f"{label:<8} {per_update:8.1f} us/update")
+    return per_update
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20_000)
+    args = parser.parse_args()
+
+    # Log to /dev/null at INFO like production stdout, minus terminal cost
+    with open(os.devnull, "w") as devnull:
+        logging.basicConfig(
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            level=logging.INFO,
+            stream=devnull,
+        )
+        bot = Bot("123456:benchmark-token")
+        payloads = make_payloads(args.updates)
+
+        print(f"JSON backend: {ingest.JSON_BACKEND}, {args.updates:,} updates")
+        old = measure("before", before, payloads, bot)
+        new = measure("after", after, payloads, bot)
+        print(f"speedup  {old / new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
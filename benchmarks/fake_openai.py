@@ -0,0 +1,145 @@
+"""Local stand-in for the OpenAI chat completions API."""
+
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fake_http import FakeHTTPServer
+
+FACT = (
+    "Здесь в XIX веке стояла деревянная церковь, перенесённая потом в музей "
+    "деревянного зодчества."
+)
+
+
+class FakeOpenAIServer(FakeHTTPServer):
+    """
+    OpenAI API with configurable latency and error rates.
+
+    Completion latency is log-normal around latency_median seconds. A
+    rate_limit_rate fraction of requests gets a 429 with Retry-After and an
+    error_rate fraction a 500, so client retries and backoff are exercised.
+    Streaming requests get the fact as server-sent chunks, and batch
+    requests (response_format set) a {"facts": [...]} object with one fact
+    per coordinate in the user message.
+    """
+
+    def __init__(
+        self,
+        latency_median: float = 0.5,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 42,
+        **kwargs,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.completions = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        super().__init__(self._build_app(), **kwargs)
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure as the OpenAI base_url."""
+        return f"{self.base_url}/v1"
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/v1/models/{model}")
+        async def retrieve_model(model: str):
+            return {"id": model, "object": "model", "created": 0, "owned_by": "fake"}
+
+        @app.post("/v1/chat/completions")
+        async def create_completion(request: Request):
+            body = await request.json()
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(
+                    self.rng.lognormvariate(0, self.latency_sigma) * self.latency_median
+                )
+            finally:
+                self.in_flight -= 1
+
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                self.errors += 1
+                return JSONResponse(
+                    {"error": {"message": "Rate limited", "type": "rate_limit"}},
+                    status_code=429,
+                    headers={"retry-after": "1"},
+                )
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return JSONResponse(
+                    {"error": {"message": "Server error", "type": "server_error"}},
+                    status_code=500,
+                )
+
+            self.completions += 1
+            if body.get("stream"):
+                return StreamingResponse(
+                    self._stream_chunks(body), media_type="text/event-stream"
+                )
+            return {
+                "id": f"chatcmpl-{self.completions}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content(body)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 60,
+                    "completion_tokens": 40,
+                    "total_tokens": 100,
+                },
+            }
+
+        return app
+
+    async def _stream_chunks(self, body: dict):
+        """Yield FACT as chat.completion.chunk server-sent events."""
+        chunk = {
+            "id": f"chatcmpl-{self.completions}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+        }
+        words = FACT.split(" ")
+        for i, word in enumerate(words):
+            piece = word if i == 0 else f" {word}"
+            delta = (
+                {"role": "assistant", "content": piece}
+                if i == 0
+                else {"content": piece}
+            )
+            choice = {"index": 0, "delta": delta, "finish_reason": None}
+            yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+            await asyncio.sleep(0)
+        choice = {"index": 0, "delta": {}, "finish_reason": "stop"}
+        yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+        yield "data: [DONE]\n\n"
+
+
+def content(body: dict) -> str:
+    """Completion text for a request: FACT, or a batch of FACTs as JSON."""
+    if not body.get("response_format"):
+        return FACT
+    locations = json.loads(body["messages"][-1]["content"])
+    return json.dumps({"facts": [FACT] * len(locations)}, ensure_ascii=False)
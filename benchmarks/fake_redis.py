@@ -0,0 +1,130 @@
+"""
+Minimal in-process Redis-protocol stand-in.
+
+Implements the subset of commands used by the bot (PING, AUTH, SELECT,
+MULTI/EXEC/DISCARD, GET, INCR, DECR, PEXPIRE, FLUSHALL) so shared backends
+can be tested and benchmarked without a real Redis server.
+"""
+
+import asyncio
+import time
+
+
+class FakeRedisServer:
+    """Single-database RESP server backed by a dict."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: dict[bytes, tuple[int, float | None]] = {}
+        self.commands_received = 0
+        self._server: asyncio.Server | None = None
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def url(self) -> str:
+        """redis:// URL of the running server."""
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> None:
+        """Start listening (port 0 picks a free port)."""
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop the server and close client connections."""
+        self._server.close()
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeRedisServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        queued: list[list[bytes]] | None = None
+        try:
+            while (args := await self._read_command(reader)) is not None:
+                self.commands_received += 1
+                name = args[0].upper()
+                if name == b"MULTI":
+                    queued = []
+                    writer.write(b"+OK\r\n")
+                elif name == b"EXEC":
+                    results = [self._execute(command) for command in queued or []]
+                    queued = None
+                    writer.write(b"*%d\r\n" % len(results) + b"".join(results))
+                elif name == b"DISCARD":
+                    queued = None
+                    writer.write(b"+OK\r\n")
+                elif queued is not None:
+                    queued.append(args)
+                    writer.write(b"+QUEUED\r\n")
+                else:
+                    writer.write(self._execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            del self._connections[task]
+
+    def _get(self, key: bytes) -> int | None:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, args: list[bytes]) -> bytes:
+        name = args[0].upper()
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"FLUSHALL":
+            self.data.clear()
+            return b"+OK\r\n"
+        if name == b"GET":
+            value = self._get(args[1])
+            if value is None:
+                return b"$-1\r\n"
+            data = str(value).encode()
+            return b"$%d\r\n%s\r\n" % (len(data), data)
+        if name in (b"INCR", b"DECR"):
+            key = args[1]
+            value = (self._get(key) or 0) + (1 if name == b"INCR" else -1)
+            expires_at = self.data[key][1] if key in self.data else None
+            self.data[key] = (value, expires_at)
+            return b":%d\r\n" % value
+        if name == b"PEXPIRE":
+            key = args[1]
+            value = self._get(key)
+            if value is None:
+                return b":0\r\n"
+            self.data[key] = (value, time.monotonic() + int(args[2]) / 1000)
+            return b":1\r\n"
+        return b"-ERR unknown command '%s'\r\n" % args[0]
@@ -0,0 +1,119 @@
+"""Local stand-in for the Telegram Bot API."""
+
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, Request
+
+from benchmarks.fake_http import FakeHTTPServer
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Bench",
+    "username": "bench_bot",
+}
+
+
+async def _params(request: Request) -> dict:
+    """Decode Bot API parameters (form encoded, values are JSON or plain)."""
+    body = (await request.body()).decode()
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body) if body else {}
+    params = {}
+    for key, value in parse_qsl(body):
+        try:
+            params[key] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key] = value
+    return params
+
+
+class FakeTelegramServer(FakeHTTPServer):
+    """
+    Bot API that records outgoing calls.
+
+    sendMessage arrival times and texts are kept per chat, so a load
+    generator can match them to the updates it posted and measure reply
+    latency. Updates added with push_update are served by getUpdates with
+    Telegram's offset and long-poll semantics.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.sent: dict[int, list[tuple[float, str]]] = defaultdict(list)
+        self.pending: list[dict] = []
+        self._new_updates = asyncio.Event()
+        self._message_id = 0
+        super().__init__(self._build_app(), **kwargs)
+
+    def push_update(self, update: dict) -> None:
+        """Queue an update for getUpdates."""
+        self.pending.append(update)
+        self._new_updates.set()
+
+    async def _get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # Calling with an offset confirms all earlier updates
+        self.pending = [u for u in self.pending if u["update_id"] >= offset]
+        if not self.pending and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except TimeoutError:
+                pass
+        return self.pending[:limit]
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure as the Telegram base_url."""
+        return f"{self.base_url}/bot"
+
+    def _message(self, chat_id: int, text: str) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/bot{token}/{method}")
+        async def bot_api(token: str, method: str, request: Request):
+            params = await _params(request)
+            self.calls[method] += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+            if method == "getMe":
+                result = BOT_USER
+            elif method == "getUpdates":
+                result = await self._get_updates(params)
+            elif method == "getWebhookInfo":
+                result = {
+                    "url": "",
+                    "has_custom_certificate": False,
+                    "pending_update_count": 0,
+                }
+            elif method == "sendMessage":
+                chat_id, text = int(params["chat_id"]), params.get("text", "")
+                self.sent[chat_id].append((time.perf_counter(), text))
+                result = self._message(chat_id, text)
+            elif method == "editMessageText":
+                result = self._message(int(params["chat_id"]), params.get("text", ""))
+            else:
+                # setWebhook, deleteWebhook, sendChatAction, ...
+                result = True
+            return {"ok": True, "result": result}
+
+        return app
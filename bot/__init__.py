@@ -0,0 +1,7 @@
+"""Location TG Bot."""
+
+import time
+
+# Importing bot.main imports this package first, so this marks the start of
+# its imports; StartupTimer measures startup phases from here
+process_started = time.perf_counter()
@@ -0,0 +1,50 @@
+"""Telegram application factory shared by the web process and shard workers."""
+
+from telegram.ext import Application, CommandHandler, MessageHandler, filters
+
+from bot.handlers.live_location import handle_live_location
+from bot.handlers.location import handle_help, handle_location, handle_start
+from bot.services.http_clients import build_telegram_request
+from config.settings import settings
+
+
+def add_handlers(application: Application) -> None:
+    """
+    Register the bot's update handlers.
+
+    Args:
+        application: Application to register the handlers on
+    """
+    application.add_handler(CommandHandler("start", handle_start))
+    application.add_handler(CommandHandler("help", handle_help))
+    application.add_handler(
+        MessageHandler(
+            filters.UpdateType.MESSAGE & filters.LOCATION & ~filters.COMMAND,
+            handle_location,
+        )
+    )
+    # Live location sessions send their position updates as edits
+    application.add_handler(
+        MessageHandler(
+            filters.UpdateType.EDITED_MESSAGE & filters.LOCATION,
+            handle_live_location,
+        )
+    )
+
+
+def build_application() -> Application:
+    """
+    Build the Telegram application with the tuned HTTP client and handlers.
+
+    Returns:
+        Application, not yet initialized
+    """
+    application = (
+        Application.builder()
+        .token(settings.telegram_bot_token)
+        .base_url(settings.telegram_base_url)
+        .request(build_telegram_request())
+        .build()
+    )
+    add_handlers(application)
+    return application
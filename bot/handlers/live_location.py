@@ -0,0 +1,88 @@
+"""Live location handler for walking tours."""
+
+import logging
+from functools import partial
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from bot.services.geo import cell_for
+from bot.services.live_location import live_tracker
+from bot.services.openai_client import openai_client
+from bot.services.overload import overload
+from bot.services.rate_limiter import rate_limiter
+from bot.services.send_scheduler import send_scheduler
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_live_location(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """
+    Handle position updates of a shared live location.
+
+    Each update edits the live location message. A fact is sent only when
+    the user has moved far enough since the last one; updates in between
+    are dropped silently.
+
+    Args:
+        update: Telegram update object
+        context: Callback context
+    """
+    message = update.edited_message
+    if not settings.live_location_enabled or not message or not message.location:
+        return
+
+    user = update.effective_user
+    if not user:
+        return
+
+    location = message.location
+    chat_id = message.chat_id
+    key = (chat_id, message.message_id)
+
+    # The final edit of a live location no longer carries live_period
+    if location.live_period is None:
+        live_tracker.stop(key)
+        return
+
+    if not live_tracker.should_look_up(
+        key, location.latitude, location.longitude, location.horizontal_accuracy
+    ):
+        return
+
+    # Skipped silently when overloaded, a later update retries
+    if settings.overload_enabled and overload.should_shed():
+        return
+
+    # No "please wait" reply for automatic updates, a later one retries
+    if await rate_limiter.acquire_request(user.id, chat_id=chat_id) is not None:
+        return
+    if not await openai_client.has_fact(location.latitude, location.longitude, "ru"):
+        cell = cell_for(
+            location.latitude, location.longitude, settings.fact_cache_cell_size_m
+        )
+        if await rate_limiter.acquire_upstream(cell) is not None:
+            return
+    live_tracker.looked_up(key, location.latitude, location.longitude)
+
+    with overload.track():
+        fact = await openai_client.get_location_fact(
+            latitude=location.latitude,
+            longitude=location.longitude,
+            language="ru",
+        )
+    if not fact or not live_tracker.is_new_fact(key, fact):
+        return
+
+    await send_scheduler.send(chat_id, partial(message.reply_text, f"📍 {fact}"))
+    logger.info(
+        "Live location fact sent",
+        extra={
+            "category": "fact_sent",
+            "update_id": update.update_id,
+            "user_id": user.id,
+        },
+    )
@@ -1,15 +1,47 @@
 """Location handler for processing user location messages."""
 
 import logging
+import re
+import time
+from functools import partial
 
-from telegram import Update
+from telegram import Message, Update
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
+from bot.services.geo import cell_for
+from bot.services.live_location import live_tracker
+from bot.services.metrics import overload_shed
 from bot.services.openai_client import openai_client
+from bot.services.overload import overload
 from bot.services.rate_limiter import rate_limiter
+from bot.services.send_scheduler import send_scheduler
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+NOT_FOUND_MESSAGE = (
+    "😔 Не смог найти интересный факт об этом месте. "
+    "Попробуйте отправить другую точку!"
+)
+
+BUSY_MESSAGE = (
+    "⏳ Сейчас слишком много запросов, и я не успеваю отвечать. "
+    "Попробуйте ещё раз через минуту!"
+)
+
+RATE_LIMIT_MESSAGES = {
+    "chat": "⏳ В этом чате сейчас слишком много запросов. Попробуйте через минуту.",
+    "cell": (
+        "⏳ Об этом месте сейчас спрашивают слишком часто. "
+        "Попробуйте чуть позже или отправьте другую точку."
+    ),
+    "global": "⏳ Сейчас у бота слишком много запросов. Попробуйте через минуту.",
+}
+
+# End of a sentence followed by whitespace, so "3.5" is not split
+_SENTENCE_END = re.compile(r"[.!?…](?=\s)")
+
 
 async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -30,38 +62,167 @@ async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     chat_id = update.effective_chat.id
     user_id = user.id
 
+    started = time.monotonic()
     logger.info(
-        f"Received location from user {user_id}: {location.latitude}, {location.longitude}"
+        "Received location",
+        extra={
+            "category": "received_location",
+            "update_id": update.update_id,
+            "user_id": user_id,
+        },
     )
 
-    # Check rate limit
-    if not await rate_limiter.check_rate_limit(user_id):
-        await update.message.reply_text(
-            "⏳ Пожалуйста, подождите немного перед следующим запросом. "
-            "Можно отправлять не более одной локации в 5 секунд."
+    denied = await rate_limiter.acquire_request(user_id, chat_id=chat_id)
+    if denied is not None:
+        await _reply_rate_limited(update.message, denied)
+        return
+
+    if location.live_period and settings.live_location_enabled:
+        # Its position updates arrive as edits, see handle_live_location
+        live_tracker.start(
+            (chat_id, update.message.message_id),
+            location.latitude,
+            location.longitude,
         )
+
+    # Answer right away instead of piling up behind a slow or failing OpenAI
+    if settings.overload_enabled and overload.should_shed():
+        await _reply_degraded(update.message, location.latitude, location.longitude)
         return
 
-    # Acquire rate limit slot
-    await rate_limiter.acquire(user_id)
+    # Cell and global limits cap OpenAI spend, cached answers are not charged
+    if not await openai_client.has_fact(location.latitude, location.longitude, "ru"):
+        cell = cell_for(
+            location.latitude, location.longitude, settings.fact_cache_cell_size_m
+        )
+        denied = await rate_limiter.acquire_upstream(cell)
+        if denied is not None:
+            await _reply_rate_limited(update.message, denied)
+            return
 
-    # Send typing action
-    await context.bot.send_chat_action(chat_id=chat_id, action="typing")
+    # Shown only if the fact is not ready almost immediately
+    send_scheduler.chat_action(
+        chat_id, partial(context.bot.send_chat_action, chat_id=chat_id, action="typing")
+    )
+
+    if settings.openai_streaming:
+        with overload.track():
+            await _reply_streaming(
+                update.message, location.latitude, location.longitude
+            )
+        return
 
     # Get fact from OpenAI
-    fact = await openai_client.get_location_fact(
-        latitude=location.latitude,
-        longitude=location.longitude,
-        language="ru",  # Default to Russian for MVP
+    with overload.track():
+        fact = await openai_client.get_location_fact(
+            latitude=location.latitude,
+            longitude=location.longitude,
+            language="ru",  # Default to Russian for MVP
+        )
+
+    text = f"📍 {fact}" if fact else NOT_FOUND_MESSAGE
+    await send_scheduler.send(chat_id, partial(update.message.reply_text, text))
+
+    logger.info(
+        "Fact sent" if fact else "Fact not found",
+        extra={
+            "category": "fact_sent",
+            "update_id": update.update_id,
+            "user_id": user_id,
+            "latency_ms": round((time.monotonic() - started) * 1000),
+        },
     )
 
-    if fact:
-        await update.message.reply_text(f"📍 {fact}")
-    else:
-        await update.message.reply_text(
-            "😔 Не смог найти интересный факт об этом месте. "
-            "Попробуйте отправить другую точку!"
-        )
+
+def rate_limit_message(layer: str) -> str:
+    """
+    Explain which limit rejected a request.
+
+    Args:
+        layer: Rate limit layer that denied the request
+
+    Returns:
+        Message for the user
+    """
+    if layer in RATE_LIMIT_MESSAGES:
+        return RATE_LIMIT_MESSAGES[layer]
+    requests = settings.rate_limit_requests
+    amount = "одной локации" if requests == 1 else f"{requests} локаций"
+    return (
+        "⏳ Пожалуйста, подождите немного перед следующим запросом. "
+        f"Можно отправлять не более {amount} в {settings.rate_limit_period} секунд."
+    )
+
+
+async def _reply_rate_limited(message: Message, layer: str) -> None:
+    """Tell the user the request was rate limited."""
+    await send_scheduler.send(
+        message.chat_id, partial(message.reply_text, rate_limit_message(layer))
+    )
+
+
+async def _reply_degraded(message: Message, latitude: float, longitude: float) -> None:
+    """
+    Reply without calling OpenAI: the nearest known fact or a busy message.
+
+    Args:
+        message: Message to reply to
+        latitude: Location latitude
+        longitude: Location longitude
+    """
+    fact = await openai_client.nearby_fact(
+        latitude, longitude, "ru", settings.overload_fallback_radius_m
+    )
+    overload_shed.labels("nearby_fact" if fact else "busy").inc()
+    text = f"📍 {fact}" if fact else BUSY_MESSAGE
+    await send_scheduler.send(message.chat_id, partial(message.reply_text, text))
+
+
+async def _reply_streaming(message: Message, latitude: float, longitude: float) -> None:
+    """
+    Reply with a streamed fact: first sentence as soon as it arrives, then
+    throttled edits of the same message until the fact is complete.
+
+    Args:
+        message: Message to reply to
+        latitude: Location latitude
+        longitude: Location longitude
+    """
+    chat_id = message.chat_id
+    reply: Message | None = None
+    shown = ""
+    text = ""
+    last_edit = 0.0
+
+    async for text in openai_client.stream_location_fact(
+        latitude=latitude, longitude=longitude, language="ru"
+    ):
+        if reply is None:
+            match = _SENTENCE_END.search(text)
+            if match is None:
+                continue
+            shown = text[: match.end()]
+            reply = await send_scheduler.send(
+                chat_id, partial(message.reply_text, f"📍 {shown}")
+            )
+            last_edit = time.monotonic()
+        elif time.monotonic() - last_edit >= settings.stream_edit_interval:
+            # Intermediate edits are best effort, skipped when over the limits;
+            # the final one is queued and retried
+            try:
+                if await send_scheduler.try_send(
+                    chat_id, partial(reply.edit_text, f"📍 {text}")
+                ):
+                    shown = text
+            except TelegramError as e:
+                logger.debug(f"Skipped streaming edit: {e}")
+            last_edit = time.monotonic()
+
+    if reply is None:
+        text = f"📍 {text}" if text else NOT_FOUND_MESSAGE
+        await send_scheduler.send(chat_id, partial(message.reply_text, text))
+    elif text != shown:
+        await send_scheduler.send(chat_id, partial(reply.edit_text, f"📍 {text}"))
 
 
 async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -80,7 +241,10 @@ async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
 
     if update.message:
-        await update.message.reply_text(welcome_message)
+        await send_scheduler.send(
+            update.message.chat_id,
+            partial(update.message.reply_text, welcome_message),
+        )
 
 
 async def handle_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -101,4 +265,6 @@ async def handle_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     )
 
     if update.message:
-        await update.message.reply_text(help_message)
+        await send_scheduler.send(
+            update.message.chat_id, partial(update.message.reply_text, help_message)
+        )
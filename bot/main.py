@@ -1,110 +1,201 @@
 """Main FastAPI application for the Location TG Bot."""
 
+import asyncio
 import logging
-import sys
+import os
+import secrets
+import time
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from telegram import Update
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    MessageHandler,
-    filters,
-)
 
-import os
-print(f"Starting application...")
-print(f"Current directory: {os.getcwd()}")
-print(f"Python path: {os.environ.get('PYTHONPATH', 'Not set')}")
-print(f"PORT: {os.environ.get('PORT', 'Not set')}")
+# Diagnostic output for deployment debugging, off by default
+STARTUP_DIAGNOSTICS = os.environ.get("STARTUP_DIAGNOSTICS", "").lower() in ("1", "true")
+
+if STARTUP_DIAGNOSTICS:
+    print("Starting application...")
+    print(f"Current directory: {os.getcwd()}")
+    print(f"Python path: {os.environ.get('PYTHONPATH', 'Not set')}")
+    print(f"PORT: {os.environ.get('PORT', 'Not set')}")
 
 try:
-    from bot.handlers.location import handle_help, handle_location, handle_start
+    from bot import process_started
+    from bot.application import build_application
+    from bot.services import ingest, metrics
+    from bot.services.http_clients import prewarm
+    from bot.services.live_location import live_tracker
+    from bot.services.loop_monitor import loop_monitor
+    from bot.services.openai_client import openai_client
+    from bot.services.overload import overload
+    from bot.services.poller import update_poller
+    from bot.services.profiler import ProfilerBusyError, profiler
+    from bot.services.rate_limiter import rate_limiter
+    from bot.services.send_scheduler import send_scheduler
+    from bot.services.startup import StartupTimer, ensure_webhook
+    from bot.services.update_queue import update_queue
+    from bot.sharding import ShardRouter, routing_key
+    from config.logging_config import logging_stats, setup_logging, shutdown_logging
     from config.settings import settings
-    print("Successfully imported all modules")
+
+    if STARTUP_DIAGNOSTICS:
+        print("Successfully imported all modules")
 except ImportError as e:
     print(f"Import error: {e}")
-    print(f"Directory contents: {os.listdir('.')}")
-    if os.path.exists('bot'):
-        print(f"Bot directory contents: {os.listdir('bot')}")
-    if os.path.exists('config'):
-        print(f"Config directory contents: {os.listdir('config')}")
+    if STARTUP_DIAGNOSTICS:
+        print(f"Directory contents: {os.listdir('.')}")
+        if os.path.exists("bot"):
+            print(f"Bot directory contents: {os.listdir('bot')}")
+        if os.path.exists("config"):
+            print(f"Config directory contents: {os.listdir('config')}")
     raise
 
+# fastapi, telegram and the bot modules are imported eagerly above; only the
+# OpenAI SDK is deferred to first use (see OpenAIClient.client)
+startup_timer = StartupTimer(process_started)
+startup_timer.record("imports", time.perf_counter() - process_started)
+_background_tasks: set[asyncio.Task] = set()
+shard_router: ShardRouter | None = None
+
 # Configure logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=getattr(logging, settings.log_level, logging.INFO),
-    stream=sys.stdout,
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Gauges read at scrape time
+metrics.openai_in_flight.set_function(lambda: openai_client.concurrency.in_flight)
+metrics.openai_concurrency_limit.set_function(lambda: openai_client.concurrency.limit)
+
 # Create FastAPI app
 app = FastAPI(title="Location TG Bot", version="1.0.0")
 
 # Create Telegram application
-application = Application.builder().token(settings.telegram_bot_token).build()
+application = build_application()
 
 
 @app.on_event("startup")
 async def startup():
     """Initialize the bot on startup."""
+    global shard_router
     logger.info("Starting bot initialization...")
-    
+
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+
     # Check configuration
     if not settings.telegram_bot_token:
         logger.error("TELEGRAM_BOT_TOKEN is not set!")
         return
-    
+
     if not settings.openai_api_key:
         logger.error("OPENAI_API_KEY is not set!")
         return
-    
+
     logger.info(f"Bot token length: {len(settings.telegram_bot_token)}")
     logger.info(f"OpenAI key length: {len(settings.openai_api_key)}")
     logger.info(f"Webhook URL: {settings.webhook_url}")
-    
-    try:
-        # Add handlers
-        application.add_handler(CommandHandler("start", handle_start))
-        application.add_handler(CommandHandler("help", handle_help))
-        application.add_handler(
-            MessageHandler(filters.LOCATION & ~filters.COMMAND, handle_location)
-        )
-        logger.info("Handlers added successfully")
 
+    try:
         # Initialize application
-        await application.initialize()
+        with startup_timer.phase("initialize"):
+            await application.initialize()
         logger.info("Application initialized")
-        
+
         await application.start()
         logger.info("Application started")
 
-        # Set webhook if URL is provided
-        if settings.webhook_url:
-            webhook_url = f"{settings.webhook_url}/webhook"
-            await application.bot.set_webhook(webhook_url)
-            logger.info(f"Webhook set to: {webhook_url}")
-            
-            # Get webhook info
-            webhook_info = await application.bot.get_webhook_info()
-            logger.info(f"Webhook info: {webhook_info}")
+        if settings.shard_workers > 0:
+            # Workers run their own queue, refresher and warm-up
+            shard_router = ShardRouter(
+                settings.shard_workers,
+                settings.shard_queue_size,
+                settings.shard_virtual_nodes,
+            )
+            shard_router.start()
         else:
-            logger.warning("No webhook URL provided, bot will not receive updates")
+            if settings.webhook_async_processing:
+                update_queue.start(application.process_update)
+
+            if openai_client.refresher is not None:
+                openai_client.refresher.start()
 
+        # In fast startup mode updates are served while these run
+        if settings.fast_startup:
+            _run_in_background(_warm_up())
+            _run_in_background(_register_webhook())
+        else:
+            await _warm_up()
+            await _register_webhook()
+
+        startup_timer.mark_ready()
         logger.info("Bot started successfully")
-        
+
     except Exception as e:
         logger.error(f"Error during bot startup: {e}")
         raise
 
 
+def _run_in_background(coro) -> None:
+    """Run a startup step as a task, keeping a reference until it is done."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _warm_up() -> None:
+    """Open connections now so the first user does not pay TLS handshakes."""
+    warm_ups = [
+        prewarm(
+            "Telegram",
+            application.bot.get_me,
+            connections=settings.http_prewarm_connections,
+            timeout=settings.http_prewarm_timeout,
+        )
+    ]
+    # Shard workers call OpenAI, the web process does not
+    if shard_router is None:
+        warm_ups.append(openai_client.warm_up())
+    with startup_timer.phase("prewarm"):
+        await asyncio.gather(*warm_ups)
+
+
+async def _register_webhook() -> None:
+    """Set the webhook if URL is provided and not registered yet."""
+    if not settings.webhook_url:
+        if settings.polling_enabled:
+            logger.info("No webhook URL provided, polling for updates")
+            await update_poller.start(application.bot, application.process_update)
+        else:
+            logger.warning("No webhook URL provided, bot will not receive updates")
+        return
+
+    try:
+        with startup_timer.phase("webhook"):
+            await ensure_webhook(application.bot, f"{settings.webhook_url}/webhook")
+    except Exception as e:
+        logger.error(f"Error registering webhook: {e}")
+        if not settings.fast_startup:
+            raise
+
+
 @app.on_event("shutdown")
 async def shutdown():
     """Cleanup on shutdown."""
+    for task in list(_background_tasks):
+        task.cancel()
+    await update_poller.stop()
+    if shard_router is not None:
+        await shard_router.stop()
+    await update_queue.stop()
+    await send_scheduler.stop()
     await application.stop()
     await application.shutdown()
+    await rate_limiter.close()
+    if openai_client.refresher is not None:
+        await openai_client.refresher.stop()
+    await openai_client.close()
+    await loop_monitor.stop()
     logger.info("Bot stopped")
+    shutdown_logging()
 
 
 @app.get("/")
@@ -123,8 +214,12 @@ async def health():
 async def config_check():
     """Check configuration and environment."""
     return {
-        "telegram_token_set": bool(settings.telegram_bot_token and len(settings.telegram_bot_token) > 10),
-        "openai_key_set": bool(settings.openai_api_key and len(settings.openai_api_key) > 10),
+        "telegram_token_set": bool(
+            settings.telegram_bot_token and len(settings.telegram_bot_token) > 10
+        ),
+        "openai_key_set": bool(
+            settings.openai_api_key and len(settings.openai_api_key) > 10
+        ),
         "webhook_url": settings.webhook_url,
         "environment": settings.environment,
         "port": settings.port,
@@ -132,6 +227,65 @@ async def config_check():
     }
 
 
+@app.get("/stats")
+async def stats():
+    """Get runtime statistics of internal services."""
+    return {
+        "fact_cache": openai_client.cache.stats() if openai_client.cache else None,
+        "fact_store": (
+            await openai_client.store.stats() if openai_client.store else None
+        ),
+        "fact_refresher": (
+            openai_client.refresher.stats() if openai_client.refresher else None
+        ),
+        "openai_inflight": openai_client.inflight.stats(),
+        "openai_concurrency": openai_client.concurrency.stats(),
+        "openai_hedging": (
+            openai_client.hedger.stats() if openai_client.hedger else None
+        ),
+        "openai_batcher": (
+            openai_client.batcher.stats() if openai_client.batcher else None
+        ),
+        "update_queue": update_queue.stats() if update_queue.running else None,
+        "polling": update_poller.stats() if update_poller.running else None,
+        "rate_limiter": rate_limiter.stats(),
+        "overload": overload.stats(),
+        "send_scheduler": send_scheduler.stats(),
+        "live_locations": live_tracker.stats(),
+        "logging": logging_stats(),
+        "startup": startup_timer.stats(),
+        "event_loop": loop_monitor.stats() if loop_monitor.running else None,
+        "sharding": shard_router.stats() if shard_router else None,
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Expose metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _require_admin(request: Request) -> None:
+    """Reject requests without the admin token, hide endpoints if unset."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404)
+    token = request.headers.get("x-admin-token", "")
+    if not secrets.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=403)
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 5.0):
+    """Sample the event loop thread and return collapsed stacks."""
+    _require_admin(request)
+    duration = min(max(seconds, 0.1), settings.profiler_max_duration)
+    try:
+        stacks = await profiler.profile(duration)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return PlainTextResponse(stacks)
+
+
 @app.get("/webhook/info")
 async def webhook_info():
     """Get webhook information."""
@@ -161,10 +315,10 @@ async def set_webhook(request: Request):
     try:
         data = await request.json()
         webhook_url = data.get("url")
-        
+
         if not webhook_url:
             return {"error": "URL is required"}
-        
+
         if application.bot:
             await application.bot.set_webhook(webhook_url)
             return {"success": True, "webhook_url": webhook_url}
@@ -190,16 +344,46 @@ async def delete_webhook():
 @app.post("/webhook")
 async def webhook(request: Request):
     """Handle Telegram webhook updates."""
+    metrics.webhook_in_flight.inc()
     try:
-        logger.info("Received webhook request")
-        data = await request.json()
-        logger.info(f"Webhook data: {data}")
-        
+        with metrics.webhook_duration.time():
+            return await _handle_webhook(request)
+    finally:
+        metrics.webhook_in_flight.dec()
+
+
+async def _handle_webhook(request: Request) -> Response:
+    """Parse, filter and process (or enqueue) one webhook update."""
+    try:
+        body = await request.body()
+        data = ingest.loads(body)
+
+        if ingest.should_log_payload():
+            logger.info(f"Webhook data: {data}")
+
+        # Skip building Update objects nobody would handle
+        if not ingest.is_handled_update(data):
+            return Response(status_code=200)
+
+        if shard_router is not None:
+            # The owning worker parses and processes it
+            shard_router.route(routing_key(data), body)
+            startup_timer.mark_first_update()
+            return Response(status_code=200)
+
         update = Update.de_json(data, application.bot)
 
         if update:
-            logger.info(f"Processing update: {update.update_id}")
-            await application.process_update(update)
+            logger.info(
+                "Processing update",
+                extra={"category": "processing_update", "update_id": update.update_id},
+            )
+            if update_queue.running:
+                # Ack Telegram immediately, workers process in the background
+                await update_queue.put(update)
+            else:
+                await application.process_update(update)
+            startup_timer.mark_first_update()
         else:
             logger.warning("No update object created")
 
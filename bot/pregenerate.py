@@ -0,0 +1,263 @@
+"""
+Generate facts ahead of time for an area and save them in the fact store.
+
+Tiles a bounding box (or the points of a CSV file) into fact cache cells and
+generates one fact per cell and language at the cell center. Finished cells
+are appended to a checkpoint file, so an interrupted run resumes where it
+stopped.
+
+The bot only reads the fact store with FACT_STORE_ENABLED=true, so the CLI
+refuses to run without it; --db defaults to FACT_STORE_PATH.
+
+Usage (with FACT_STORE_ENABLED=true in the environment or .env):
+    python -m bot.pregenerate --bbox 55.70,37.55,55.80,37.70
+    python -m bot.pregenerate --csv points.csv --language ru --language en
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import sys
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from pathlib import Path
+from typing import TextIO
+
+from bot.services.fact_store import FactStore
+from bot.services.geo import Cell, cell_center, cell_for
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Generate = Callable[[float, float, str], Awaitable[str | None]]
+
+
+def tile_bbox(
+    south: float, west: float, north: float, east: float, cell_size_m: float
+) -> list[Cell]:
+    """
+    List the cells covering a bounding box.
+
+    Args:
+        south: Southern latitude
+        west: Western longitude
+        north: Northern latitude
+        east: Eastern longitude
+        cell_size_m: Cell edge length in meters
+
+    Returns:
+        Cells row by row, south to north and west to east
+    """
+    first_row, _ = cell_for(south, west, cell_size_m)
+    last_row, _ = cell_for(north, west, cell_size_m)
+    cells = []
+    for row in range(first_row, last_row + 1):
+        # Column widths differ per row, find the row's own column range
+        latitude, _ = cell_center((row, 0), cell_size_m)
+        _, first_col = cell_for(latitude, west, cell_size_m)
+        _, last_col = cell_for(latitude, east, cell_size_m)
+        cells.extend((row, col) for col in range(first_col, last_col + 1))
+    return cells
+
+
+def cells_from_csv(file: TextIO, cell_size_m: float) -> list[Cell]:
+    """
+    List the distinct cells of the points in a CSV file.
+
+    Rows are "latitude,longitude[,...]"; a header row is skipped.
+
+    Args:
+        file: CSV text file
+        cell_size_m: Cell edge length in meters
+
+    Returns:
+        Cells in order of first appearance
+    """
+    cells: dict[Cell, None] = {}
+    for row in csv.reader(file):
+        if not row:
+            continue
+        try:
+            latitude, longitude = float(row[0]), float(row[1])
+        except ValueError:
+            continue  # header
+        cells[cell_for(latitude, longitude, cell_size_m)] = None
+    return list(cells)
+
+
+class Checkpoint:
+    """Append-only record of finished (cell, language) pairs."""
+
+    def __init__(self, path: str):
+        """
+        Load finished pairs and open the file for appending.
+
+        Args:
+            path: Checkpoint file path
+        """
+        self.done: set[tuple[Cell, str]] = set()
+        checkpoint = Path(path)
+        if checkpoint.exists():
+            for line in checkpoint.read_text().splitlines():
+                row, col, language = line.split(",")
+                self.done.add(((int(row), int(col)), language))
+        self._file = checkpoint.open("a")
+
+    def __contains__(self, item: tuple[Cell, str]) -> bool:
+        return item in self.done
+
+    def add(self, cell: Cell, language: str) -> None:
+        """Record a finished pair."""
+        self.done.add((cell, language))
+        self._file.write(f"{cell[0]},{cell[1]},{language}\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the checkpoint file."""
+        self._file.close()
+
+
+class Pacer:
+    """Space request starts at least 60 / requests_per_minute seconds apart."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60 / requests_per_minute if requests_per_minute > 0 else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait for the next start slot."""
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, time.monotonic()) + self.interval
+
+
+async def pregenerate(
+    cells: Iterable[Cell],
+    languages: list[str],
+    generate: Generate,
+    checkpoint: Checkpoint,
+    cell_size_m: float,
+    concurrency: int,
+    requests_per_minute: float,
+) -> dict:
+    """
+    Generate a fact for every cell and language not yet in the checkpoint.
+
+    Args:
+        cells: Cells to cover
+        languages: Fact languages
+        generate: Generates and stores a fact for a location
+        checkpoint: Finished pairs, updated as cells complete
+        cell_size_m: Cell edge length in meters
+        concurrency: Max requests in flight
+        requests_per_minute: Max request starts per minute
+
+    Returns:
+        Dictionary with generated, empty, failed and skipped counts
+    """
+    counts = {"generated": 0, "empty": 0, "failed": 0, "skipped": 0}
+    pending = []
+    for cell in cells:
+        for language in languages:
+            if (cell, language) in checkpoint:
+                counts["skipped"] += 1
+            else:
+                pending.append((cell, language))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pacer = Pacer(requests_per_minute)
+    total = len(pending)
+
+    async def run(cell: Cell, language: str) -> None:
+        async with semaphore:
+            await pacer.wait()
+            latitude, longitude = cell_center(cell, cell_size_m)
+            try:
+                fact = await generate(latitude, longitude, language)
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning(f"Cell {cell} ({language}) failed: {e}")
+                return
+
+        counts["generated" if fact else "empty"] += 1
+        checkpoint.add(cell, language)
+        finished = counts["generated"] + counts["empty"] + counts["failed"]
+        if finished % 100 == 0:
+            logger.info(f"Pre-generated {finished}/{total}")
+
+    await asyncio.gather(*(run(cell, language) for cell, language in pending))
+    return counts
+
+
+def main() -> None:
+    """Run the pre-generation CLI."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--bbox", help="south,west,north,east")
+    area.add_argument("--csv", help="CSV of latitude,longitude points")
+    parser.add_argument("--language", action="append", choices=("ru", "en"))
+    parser.add_argument(
+        "--cell-size", type=float, default=settings.fact_cache_cell_size_m
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=300, help="max requests/minute")
+    parser.add_argument("--db", default=settings.fact_store_path)
+    parser.add_argument("--checkpoint", default="pregenerate.checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="only count cells")
+    args = parser.parse_args()
+    if not settings.fact_store_enabled and not args.dry_run:
+        parser.error("the fact store is disabled, set FACT_STORE_ENABLED=true")
+
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+        stream=sys.stderr,
+    )
+
+    if args.bbox:
+        south, west, north, east = (float(value) for value in args.bbox.split(","))
+        cells = tile_bbox(south, west, north, east, args.cell_size)
+    else:
+        with open(args.csv, newline="", encoding="utf-8") as file:
+            cells = cells_from_csv(file, args.cell_size)
+    languages = args.language or ["ru"]
+    print(f"{len(cells)} cells x {len(languages)} languages", file=sys.stderr)
+    if args.dry_run:
+        return
+
+    counts = asyncio.run(_run(cells, languages, args))
+    print(counts, file=sys.stderr)
+
+
+async def _run(cells: list[Cell], languages: list[str], args) -> dict:
+    """Generate with the bot's OpenAI client, writing to the fact store."""
+    # Imported here so --dry-run and the helpers do not build the client
+    from bot.services.openai_client import openai_client
+
+    if openai_client.store is not None:
+        await openai_client.store.close()
+    openai_client.store = FactStore(args.db)
+    checkpoint = Checkpoint(args.checkpoint)
+    try:
+        return await pregenerate(
+            cells,
+            languages,
+            openai_client.refresh_fact,
+            checkpoint,
+            args.cell_size,
+            args.concurrency,
+            args.rpm,
+        )
+    finally:
+        checkpoint.close()
+        await openai_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Micro-batching of concurrent location fact lookups."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Location = tuple[float, float]
+BatchFetcher = Callable[[list[Location], str], Awaitable[list[str | None]]]
+SingleFetcher = Callable[[float, float, str], Awaitable[str | None]]
+
+
+class _Pending:
+    """Lookups of one language waiting to be flushed together."""
+
+    __slots__ = ("locations", "futures", "timer")
+
+    def __init__(self):
+        self.locations: list[Location] = []
+        self.futures: list[asyncio.Future] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class FactBatcher:
+    """
+    Collect lookups for a short window and resolve them with one request.
+
+    Lookups are grouped per language. A batch is flushed when the window
+    elapses or max_batch lookups are collected, whichever comes first. If
+    the batch request fails or returns a malformed result, every lookup of
+    the batch falls back to its own single request.
+    """
+
+    def __init__(
+        self,
+        fetch_batch: BatchFetcher,
+        fetch_one: SingleFetcher,
+        window: float,
+        max_batch: int,
+    ):
+        """
+        Initialize batcher.
+
+        Args:
+            fetch_batch: Resolves a list of locations to facts in order
+            fetch_one: Resolves a single location (fallback)
+            window: Seconds to wait for more lookups after the first one
+            max_batch: Max lookups per batch
+        """
+        self.fetch_batch = fetch_batch
+        self.fetch_one = fetch_one
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[str, _Pending] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_lookups = 0
+        self.fallbacks = 0
+
+    async def submit(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """
+        Add a lookup to the current batch and wait for its fact.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+
+        Returns:
+            Fact text or None
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(language)
+        if pending is None:
+            pending = self._pending[language] = _Pending()
+            pending.timer = loop.call_later(self.window, self._flush, language)
+
+        future = loop.create_future()
+        pending.locations.append((latitude, longitude))
+        pending.futures.append(future)
+
+        if len(pending.locations) >= self.max_batch:
+            self._flush(language)
+        return await future
+
+    def _flush(self, language: str) -> None:
+        """Detach the pending batch of a language and resolve it."""
+        pending = self._pending.pop(language, None)
+        if pending is None:
+            return
+        pending.timer.cancel()
+        task = asyncio.create_task(self._resolve(pending, language))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: _Pending, language: str) -> None:
+        """Run the batch request, falling back to single requests."""
+        locations, futures = pending.locations, pending.futures
+        if len(locations) == 1:
+            results = await asyncio.gather(
+                self.fetch_one(*locations[0], language), return_exceptions=True
+            )
+            self._deliver(futures, results)
+            return
+
+        self.batches += 1
+        self.batched_lookups += len(locations)
+        try:
+            facts = await self.fetch_batch(locations, language)
+            if len(facts) != len(locations):
+                raise ValueError(f"Expected {len(locations)} facts, got {len(facts)}")
+            self._deliver(futures, facts)
+        except Exception as e:
+            self.fallbacks += 1
+            logger.warning(f"Batch of {len(locations)} failed ({e}), falling back")
+            results = await asyncio.gather(
+                *(self.fetch_one(lat, lon, language) for lat, lon in locations),
+                return_exceptions=True,
+            )
+            self._deliver(futures, results)
+
+    @staticmethod
+    def _deliver(futures: list[asyncio.Future], results: list) -> None:
+        """Set results (or exceptions) on waiters that are still waiting."""
+        for future, result in zip(futures, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """
+        Get batching counters.
+
+        Returns:
+            Dictionary with batch counts and average batch size
+        """
+        return {
+            "batches": self.batches,
+            "batched_lookups": self.batched_lookups,
+            "avg_batch_size": (
+                self.batched_lookups / self.batches if self.batches else 0.0
+            ),
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,227 @@
+"""Adaptive (AIMD) concurrency limiter for upstream API calls."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a request cannot get a slot before its deadline."""
+
+
+class Permit:
+    """Slot held by one in-flight call, used to report its outcome."""
+
+    __slots__ = ("started", "throttled", "retry_after", "failed")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.throttled = False
+        self.retry_after: float | None = None
+        self.failed = False
+
+    def mark_throttled(self, retry_after: float | None = None) -> None:
+        """
+        Report that upstream rejected the call with 429.
+
+        Args:
+            retry_after: Seconds upstream asked us to wait, if given
+        """
+        self.throttled = True
+        self.retry_after = retry_after
+
+    def mark_failed(self) -> None:
+        """Report a non-throttling failure (does not affect the limit)."""
+        self.failed = True
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit that adapts to upstream behaviour.
+
+    The limit grows additively (by about one per limit's worth of fast
+    successes) while calls complete within target_latency, shrinks by
+    latency_backoff on slow calls and is halved on 429s. Retry-After pauses
+    new calls entirely. Excess calls wait in a bounded FIFO queue and are
+    rejected when their deadline passes.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        max_queue: int,
+        latency_backoff: float = 0.9,
+        throttle_backoff: float = 0.5,
+    ):
+        """
+        Initialize limiter.
+
+        Args:
+            initial_limit: Starting concurrency limit
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            target_latency: Calls slower than this (seconds) shrink the limit
+            max_queue: Max calls waiting for a slot
+            latency_backoff: Multiplier applied on slow calls
+            throttle_backoff: Multiplier applied on 429s
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.latency_backoff = latency_backoff
+        self.throttle_backoff = throttle_backoff
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._resume_handle: asyncio.TimerHandle | None = None
+
+        self.rejections = 0
+        self.throttled = 0
+
+    def _has_capacity(self) -> bool:
+        return (
+            self.in_flight < int(self.limit) and time.monotonic() >= self.paused_until
+        )
+
+    def would_wait(self) -> bool:
+        """Whether a call starting now would queue for a slot."""
+        return bool(self._waiters) or not self._has_capacity()
+
+    async def acquire(self, timeout: float | None = None) -> None:
+        """
+        Wait for a slot.
+
+        Args:
+            timeout: Seconds to wait in the queue before giving up
+
+        Raises:
+            ConcurrencyLimitExceeded: If the queue is full or deadline passed
+        """
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejections += 1
+            raise ConcurrencyLimitExceeded("Upstream call queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except TimeoutError:
+            self._give_back(waiter)
+            self.rejections += 1
+            raise ConcurrencyLimitExceeded(
+                f"No upstream slot within {timeout}s"
+            ) from None
+        except asyncio.CancelledError:
+            self._give_back(waiter)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _give_back(self, waiter: asyncio.Future) -> None:
+        """Return a slot handed to a waiter right before it gave up."""
+        if waiter.done() and not waiter.cancelled():
+            self.in_flight -= 1
+            self._wake()
+
+    def release(self, permit: Permit) -> None:
+        """
+        Free a slot and adapt the limit to the call outcome.
+
+        Args:
+            permit: Permit of the finished call
+        """
+        self.in_flight -= 1
+        latency = time.monotonic() - permit.started
+
+        if permit.throttled:
+            self.throttled += 1
+            self.limit = max(self.limit * self.throttle_backoff, self.min_limit)
+            if permit.retry_after:
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + permit.retry_after
+                )
+                self._schedule_resume()
+            logger.warning(
+                f"Upstream throttled, concurrency limit {self.limit:.1f}, "
+                f"retry after {permit.retry_after}"
+            )
+        elif permit.failed:
+            pass
+        elif latency > self.target_latency:
+            self.limit = max(self.limit * self.latency_backoff, self.min_limit)
+        else:
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None) -> AsyncIterator[Permit]:
+        """
+        Hold a slot for the duration of the block.
+
+        Args:
+            timeout: Seconds to wait in the queue before giving up
+
+        Yields:
+            Permit to report throttling or failure on
+        """
+        await self.acquire(timeout)
+        permit = Permit()
+        try:
+            yield permit
+        except asyncio.CancelledError:
+            permit.mark_failed()
+            raise
+        except Exception:
+            if not permit.throttled:
+                permit.mark_failed()
+            raise
+        finally:
+            self.release(permit)
+
+    def _wake(self) -> None:
+        """Hand free slots to queued waiters in FIFO order."""
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _schedule_resume(self) -> None:
+        """Wake waiters when a Retry-After pause ends."""
+        if self._resume_handle is not None:
+            self._resume_handle.cancel()
+        delay = max(self.paused_until - time.monotonic(), 0.0)
+        self._resume_handle = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def stats(self) -> dict:
+        """
+        Get limiter state.
+
+        Returns:
+            Dictionary with current limit, in-flight, queue and counters
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "paused_for": max(self.paused_until - time.monotonic(), 0.0),
+            "rejections": self.rejections,
+            "throttled": self.throttled,
+        }
@@ -0,0 +1,213 @@
+"""In-memory geospatial cache for location facts."""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from bot.services.geo import (
+    METERS_PER_DEGREE_LAT,
+    Cell,
+    bounding_box,
+    cell_center,
+    cell_for,
+    haversine_m,
+)
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[Cell, str]
+
+
+class FactCache:
+    """
+    TTL + LRU cache of facts keyed by spatial grid cell and language.
+
+    Expired entries are kept for another stale_ttl seconds, so they can be
+    served with get_stale while a fresh fact is fetched in the background.
+    """
+
+    def __init__(self):
+        """Initialize fact cache."""
+        self.max_size = settings.fact_cache_max_size
+        self.ttl = settings.fact_cache_ttl
+        self.stale_ttl = settings.fact_cache_stale_ttl
+        self.cell_size_m = settings.fact_cache_cell_size_m
+        self._entries: OrderedDict[CacheKey, tuple[str, float]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, latitude: float, longitude: float, language: str) -> CacheKey:
+        """
+        Build the cache key for a location.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+
+        Returns:
+            (cell, language) tuple
+        """
+        return cell_for(latitude, longitude, self.cell_size_m), language
+
+    def get(self, latitude: float, longitude: float, language: str) -> str | None:
+        """
+        Look up a cached fact for the cell containing the location.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+
+        Returns:
+            Cached fact or None if missing or expired
+        """
+        key = self.key(latitude, longitude, language)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        fact, expires_at = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return fact
+
+    def get_stale(self, latitude: float, longitude: float, language: str) -> str | None:
+        """
+        Look up an expired fact that is still within its stale window.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+
+        Returns:
+            Stale fact or None
+        """
+        key = self.key(latitude, longitude, language)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        fact, expires_at = entry
+        if expires_at + self.stale_ttl <= time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        self.stale_hits += 1
+        return fact
+
+    def nearest(
+        self, latitude: float, longitude: float, language: str, radius_m: float
+    ) -> str | None:
+        """
+        Look up the fact of the nearest cell within radius_m, even if expired.
+
+        Scans the cells around the location, so it costs one dictionary
+        lookup per cell of the radius. Not counted as a hit or a miss.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+            radius_m: Max distance to the cell center in meters
+
+        Returns:
+            Fact of the nearest cell or None
+        """
+        south, west, north, east = bounding_box(latitude, longitude, radius_m)
+        lat_step = self.cell_size_m / METERS_PER_DEGREE_LAT
+        now = time.monotonic()
+        best: tuple[float, str] | None = None
+        for row in range(
+            math.floor(south / lat_step), math.floor(north / lat_step) + 1
+        ):
+            row_lat = (row + 0.5) * lat_step
+            first = cell_for(row_lat, west, self.cell_size_m)[1]
+            last = cell_for(row_lat, east, self.cell_size_m)[1]
+            for col in range(first, last + 1):
+                entry = self._entries.get(((row, col), language))
+                if entry is None or entry[1] + self.stale_ttl <= now:
+                    continue
+                distance = haversine_m(
+                    latitude, longitude, *cell_center((row, col), self.cell_size_m)
+                )
+                if distance <= radius_m and (best is None or distance < best[0]):
+                    best = (distance, entry[0])
+        return best[1] if best is not None else None
+
+    def expires_in(self, key: CacheKey) -> float | None:
+        """
+        Get the seconds until an entry expires, negative once it is stale.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Seconds until expiry or None if not cached
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[1] - time.monotonic()
+
+    def set(self, latitude: float, longitude: float, language: str, fact: str) -> None:
+        """
+        Store a fact for the cell containing the location.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+            fact: Fact text to cache
+        """
+        key = self.key(latitude, longitude, language)
+        self._entries[key] = (fact, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached facts."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with size, hit/miss counters and hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "cell_size_m": self.cell_size_m,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        return len(self._entries)
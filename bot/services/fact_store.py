@@ -0,0 +1,389 @@
+"""Durable, spatially indexed store of generated location facts."""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, TextIO
+
+from bot.services.geo import bounding_box, haversine_m
+from config.settings import settings
+
+
+class StoredFact(NamedTuple):
+    """A fact with the location and model it was generated for."""
+
+    latitude: float
+    longitude: float
+    language: str
+    model: str
+    fact: str
+    created_at: float
+    distance_m: float = 0.0
+
+
+class FactStore:
+    """
+    Facts in a SQLite database in WAL mode with an R-tree index.
+
+    Every fact is a point in the R-tree, so "facts within r meters" is an
+    indexed bounding-box query followed by an exact distance check on the
+    few candidates. A lookup takes well under a millisecond, cheap enough
+    to run on every location update.
+
+    There is one fact per place and language, a place being the location
+    rounded to PLACE_DECIMALS: storing a fact for a known place replaces
+    the old one, so refreshes do not grow the table.
+
+    The database is shared with other processes (shard and web workers,
+    bot.pregenerate), so a query may wait for their write lock. The
+    connection lives on a dedicated thread to keep such waits off the
+    event loop; queries run one at a time.
+    """
+
+    # About 11 m of latitude
+    PLACE_DECIMALS = 4
+    _PLACE = f"round(latitude, {PLACE_DECIMALS}), round(longitude, {PLACE_DECIMALS})"
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        """
+        Initialize fact store.
+
+        Args:
+            path: Database file path
+            timeout: Seconds to wait for another connection's lock
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="fact-store-db")
+        self._executor.submit(self._open, timeout).result()
+
+    def _open(self, timeout: float) -> None:
+        """Open the database and create the schema, on the database thread."""
+        self._conn = sqlite3.connect(self.path, isolation_level=None, timeout=timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            " id INTEGER PRIMARY KEY,"
+            " latitude REAL NOT NULL, longitude REAL NOT NULL,"
+            " language TEXT NOT NULL, model TEXT NOT NULL,"
+            " fact TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS facts_index"
+            " USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+        )
+        if not self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'facts_place'"
+        ).fetchone():
+            self._drop_superseded()
+            self._conn.execute(
+                f"CREATE UNIQUE INDEX facts_place ON facts ({self._PLACE}, language)"
+            )
+
+    async def _run(self, function: Callable, *args):
+        """Run a function on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def _drop_superseded(self) -> None:
+        """Delete all but the newest fact per place, left by older versions."""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "DELETE FROM facts WHERE id NOT IN (SELECT id FROM ("
+                " SELECT id, row_number() OVER ("
+                f" PARTITION BY {self._PLACE}, language"
+                " ORDER BY created_at DESC, id DESC) AS rank FROM facts)"
+                " WHERE rank = 1)"
+            )
+            self._conn.execute(
+                "DELETE FROM facts_index WHERE id NOT IN (SELECT id FROM facts)"
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    async def add(
+        self,
+        latitude: float,
+        longitude: float,
+        language: str,
+        fact: str,
+        model: str,
+        created_at: float | None = None,
+    ) -> None:
+        """
+        Store a fact, replacing the one stored for the same place.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Fact language
+            fact: Fact text
+            model: Model that generated the fact
+            created_at: Unix timestamp, defaults to now
+        """
+        await self.add_many(
+            [
+                StoredFact(
+                    latitude,
+                    longitude,
+                    language,
+                    model,
+                    fact,
+                    time.time() if created_at is None else created_at,
+                )
+            ]
+        )
+
+    async def add_many(self, facts: Iterable[StoredFact]) -> int:
+        """
+        Store facts in one transaction, replacing those of the same places.
+
+        A stored fact newer than the given one is kept.
+
+        Args:
+            facts: Facts to store, distance_m is ignored
+
+        Returns:
+            Number of stored facts
+        """
+        return await self._run(self._add_many, list(facts))
+
+    def _add_many(self, facts: list[StoredFact]) -> int:
+        """Upsert facts in one transaction, on the database thread."""
+        count = 0
+        self._conn.execute("BEGIN")
+        try:
+            for fact in facts:
+                row = self._conn.execute(
+                    "INSERT INTO facts"
+                    " (latitude, longitude, language, model, fact, created_at)"
+                    f" VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT ({self._PLACE}, language)"
+                    " DO UPDATE SET latitude = excluded.latitude,"
+                    " longitude = excluded.longitude, model = excluded.model,"
+                    " fact = excluded.fact, created_at = excluded.created_at"
+                    " WHERE excluded.created_at >= facts.created_at"
+                    " RETURNING id",
+                    fact[:6],
+                ).fetchone()
+                if row is None:
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO facts_index VALUES (?, ?, ?, ?, ?)",
+                    (
+                        row[0],
+                        fact.latitude,
+                        fact.latitude,
+                        fact.longitude,
+                        fact.longitude,
+                    ),
+                )
+                count += 1
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return count
+
+    async def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        language: str | None = None,
+        limit: int = 10,
+    ) -> list[StoredFact]:
+        """
+        Find facts within radius_m of a location, nearest first, then newest.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            radius_m: Search radius in meters
+            language: Only return facts in this language
+            limit: Max facts returned
+
+        Returns:
+            Stored facts with distance_m set
+        """
+        return await self._run(
+            self._within, latitude, longitude, radius_m, language, limit
+        )
+
+    def _within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        language: str | None,
+        limit: int,
+    ) -> list[StoredFact]:
+        """Run a radius query, on the database thread."""
+        south, west, north, east = bounding_box(latitude, longitude, radius_m)
+        query = (
+            "SELECT f.latitude, f.longitude, f.language, f.model, f.fact,"
+            " f.created_at FROM facts_index i JOIN facts f ON f.id = i.id"
+            " WHERE i.min_lat >= ? AND i.max_lat <= ?"
+            " AND i.min_lon >= ? AND i.max_lon <= ?"
+        )
+        params: list = [south, north, west, east]
+        if language is not None:
+            query += " AND f.language = ?"
+            params.append(language)
+
+        found = []
+        for row in self._conn.execute(query, params):
+            distance = haversine_m(latitude, longitude, row[0], row[1])
+            if distance <= radius_m:
+                found.append(StoredFact(*row, distance_m=distance))
+        found.sort(key=lambda fact: (fact.distance_m, -fact.created_at))
+        return found[:limit]
+
+    async def nearest(
+        self, latitude: float, longitude: float, language: str, radius_m: float
+    ) -> StoredFact | None:
+        """
+        Get the nearest fact in a language within radius_m.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Fact language
+            radius_m: Search radius in meters
+
+        Returns:
+            Nearest stored fact or None
+        """
+        found = await self.within(latitude, longitude, radius_m, language, limit=1)
+        if found:
+            self.hits += 1
+            return found[0]
+        self.misses += 1
+        return None
+
+    async def export_jsonl(self, file: TextIO) -> int:
+        """
+        Write all facts as JSON lines.
+
+        Args:
+            file: Text file to write to
+
+        Returns:
+            Number of exported facts
+        """
+        return await self._run(self._export_jsonl, file)
+
+    def _export_jsonl(self, file: TextIO) -> int:
+        """Write all facts, on the database thread."""
+        count = 0
+        for row in self._conn.execute(
+            "SELECT latitude, longitude, language, model, fact, created_at"
+            " FROM facts ORDER BY id"
+        ):
+            file.write(json.dumps(StoredFact(*row)._asdict(), ensure_ascii=False))
+            file.write("\n")
+            count += 1
+        return count
+
+    async def import_jsonl(self, file: TextIO, batch_size: int = 1000) -> int:
+        """
+        Load facts from JSON lines written by export_jsonl.
+
+        Args:
+            file: Text file to read from
+            batch_size: Facts per transaction
+
+        Returns:
+            Number of imported facts
+        """
+        count = 0
+        batch: list[StoredFact] = []
+        for line in file:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            batch.append(
+                StoredFact(
+                    latitude=float(data["latitude"]),
+                    longitude=float(data["longitude"]),
+                    language=data["language"],
+                    model=data.get("model", ""),
+                    fact=data["fact"],
+                    created_at=float(data.get("created_at") or time.time()),
+                )
+            )
+            if len(batch) >= batch_size:
+                count += await self.add_many(batch)
+                batch.clear()
+        return count + await self.add_many(batch)
+
+    async def count(self) -> int:
+        """
+        Count stored facts.
+
+        Returns:
+            Number of stored facts
+        """
+        return await self._run(
+            lambda: self._conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+        )
+
+    async def stats(self) -> dict:
+        """
+        Get store statistics.
+
+        Returns:
+            Dictionary with entry count, hits and misses
+        """
+        return {
+            "entries": await self.count(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def close(self) -> None:
+        """Close the database connection and stop its thread."""
+        await self._run(self._conn.close)
+        self._executor.shutdown()
+
+
+def main() -> None:
+    """Import or export the fact store as JSON lines."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("file", help="JSON lines file, - for stdin/stdout")
+    parser.add_argument("--db", default=settings.fact_store_path)
+    args = parser.parse_args()
+
+    count = asyncio.run(_transfer(args.command, args.file, args.db))
+    print(f"{args.command}ed {count} facts", file=sys.stderr)
+
+
+async def _transfer(command: str, path: str, db: str) -> int:
+    """Import or export facts between a JSON lines file and the store."""
+    store = FactStore(db)
+    try:
+        if command == "export":
+            if path == "-":
+                return await store.export_jsonl(sys.stdout)
+            with open(path, "w", encoding="utf-8") as file:
+                return await store.export_jsonl(file)
+        if path == "-":
+            return await store.import_jsonl(sys.stdin)
+        with open(path, encoding="utf-8") as file:
+            return await store.import_jsonl(file)
+    finally:
+        await store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Geospatial helpers for quantizing coordinates into grid cells."""
+
+import math
+
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_DEGREE_LAT = 111_320.0
+
+Cell = tuple[int, int]
+
+
+def _lon_step(row: int, lat_step: float) -> float:
+    """Return the longitude width (degrees) of cells in the given row."""
+    row_center_lat = (row + 0.5) * lat_step
+    # Clamp near the poles so cells never get infinitely wide
+    cos_lat = max(math.cos(math.radians(row_center_lat)), 0.01)
+    return lat_step / cos_lat
+
+
+def cell_for(latitude: float, longitude: float, cell_size_m: float) -> Cell:
+    """
+    Quantize coordinates into a square grid cell of roughly cell_size_m meters.
+
+    Rows are fixed-height latitude bands; the column width of each row is
+    scaled by the cosine of its center latitude so cells stay roughly square.
+
+    Args:
+        latitude: Location latitude
+        longitude: Location longitude
+        cell_size_m: Cell edge length in meters
+
+    Returns:
+        (row, col) integer cell identifier
+    """
+    lat_step = cell_size_m / METERS_PER_DEGREE_LAT
+    row = math.floor(latitude / lat_step)
+    col = math.floor(longitude / _lon_step(row, lat_step))
+    return row, col
+
+
+def cell_center(cell: Cell, cell_size_m: float) -> tuple[float, float]:
+    """
+    Get the center coordinates of a grid cell.
+
+    Args:
+        cell: (row, col) cell identifier
+        cell_size_m: Cell edge length in meters
+
+    Returns:
+        (latitude, longitude) of the cell center
+    """
+    row, col = cell
+    lat_step = cell_size_m / METERS_PER_DEGREE_LAT
+    lon_step = _lon_step(row, lat_step)
+    return (row + 0.5) * lat_step, (col + 0.5) * lon_step
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points.
+
+    Args:
+        lat1: First point latitude
+        lon1: First point longitude
+        lat2: Second point latitude
+        lon2: Second point longitude
+
+    Returns:
+        Distance in meters
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius_m: float
+) -> tuple[float, float, float, float]:
+    """
+    Get a box that contains every point within radius_m of a location.
+
+    The box is not wrapped around the antimeridian.
+
+    Args:
+        latitude: Center latitude
+        longitude: Center longitude
+        radius_m: Radius in meters
+
+    Returns:
+        (south, west, north, east) in degrees
+    """
+    lat_delta = radius_m / METERS_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    lon_delta = lat_delta / cos_lat
+    return (
+        max(latitude - lat_delta, -90.0),
+        longitude - lon_delta,
+        min(latitude + lat_delta, 90.0),
+        longitude + lon_delta,
+    )
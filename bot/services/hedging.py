@@ -0,0 +1,200 @@
+"""Hedged requests: repeat a slow call and use whichever answers first."""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from bot.services.metrics import openai_hedge_wins, openai_hedges
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Issue a second identical request when the first one is unusually slow.
+
+    The hedge delay is a quantile of recent latencies, e.g. the p95,
+    so only the slowest calls are repeated, and never less than min_delay.
+    Whichever attempt succeeds first is used and the other one is
+    cancelled; if one fails, the other can still succeed.
+
+    Every request earns budget_percent / 100 of a hedge, and a hedge
+    spends one, so hedges add at most budget_percent extra requests (plus
+    a small burst of saved-up credit).
+
+    Latencies are measured from the start of the original request. When
+    the hedge wins, the primary's elapsed time is still recorded as a lower
+    bound of its latency, so slow calls keep pushing the quantile up. While
+    the upstream is busy (calls queue for a concurrency slot) elapsed times
+    include the queue wait and a hedge would only queue too, so such
+    requests are neither recorded nor hedged.
+    """
+
+    def __init__(
+        self,
+        quantile: float,
+        min_delay: float,
+        budget_percent: float,
+        window: int,
+        min_samples: int,
+        max_credit: float = 10.0,
+        busy: Callable[[], bool] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize hedger.
+
+        Args:
+            quantile: Latency quantile after which a request is hedged
+            min_delay: Seconds before which a request is never hedged
+            budget_percent: Max hedges as a percentage of requests
+            window: Number of recent latencies the quantile is taken over
+            min_samples: Latencies needed before hedging starts
+            max_credit: Max hedges saved up for a burst of slow calls
+            busy: Whether a call starting now would queue for the upstream
+            clock: Monotonic time source
+        """
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.budget_ratio = budget_percent / 100
+        self.min_samples = min_samples
+        self.max_credit = max_credit
+        self._busy = busy or (lambda: False)
+        self._clock = clock
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._threshold: float | None = None
+        self._credit = 0.0
+
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.over_budget = 0
+        self.skipped_busy = 0
+
+    def threshold(self) -> float | None:
+        """
+        Get the current hedge delay.
+
+        Returns:
+            Seconds after which a request is hedged, None until enough
+            latencies are known
+        """
+        if len(self._latencies) < self.min_samples:
+            return None
+        if self._threshold is None:
+            ordered = sorted(self._latencies)
+            index = min(math.ceil(self.quantile * len(ordered)) - 1, len(ordered) - 1)
+            self._threshold = max(ordered[max(index, 0)], self.min_delay)
+        return self._threshold
+
+    def record(self, latency: float) -> None:
+        """
+        Add the latency of a request.
+
+        Args:
+            latency: Seconds the request took, or a lower bound of it
+        """
+        self._latencies.append(latency)
+        self._threshold = None
+
+    def _spend_credit(self) -> bool:
+        """Take one hedge from the budget if available."""
+        if self._credit < 1:
+            self.over_budget += 1
+            return False
+        self._credit -= 1
+        return True
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a request, hedging it if it is slower than the threshold.
+
+        Args:
+            call: Coroutine function performing the request, called once
+                more for the hedge
+
+        Returns:
+            Result of the first attempt that succeeds
+
+        Raises:
+            Exception: Error of the primary attempt if all attempts fail
+        """
+        self.requests += 1
+        self._credit = min(self._credit + self.budget_ratio, self.max_credit)
+        delay = self.threshold()
+
+        # A primary that has to queue measures the queue, not the upstream
+        measured = not self._busy()
+        start = self._clock()
+        primary = asyncio.ensure_future(call())
+        attempts = [primary]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done and self._may_hedge():
+                    self.hedged += 1
+                    openai_hedges.inc()
+                    logger.debug(f"Hedging a request slower than {delay:.2f}s")
+                    attempts.append(asyncio.ensure_future(call()))
+
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = next(
+                    (
+                        task
+                        for task in attempts
+                        if task in done and not task.exception()
+                    ),
+                    None,
+                )
+                if winner is not None:
+                    break
+            else:
+                # Every attempt failed, report the original error
+                return primary.result()
+
+            if winner is not primary:
+                self.wins += 1
+                openai_hedge_wins.inc()
+            if measured:
+                # The primary's own latency, a lower bound if the hedge won
+                self.record(self._clock() - start)
+            return winner.result()
+        finally:
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    def _may_hedge(self) -> bool:
+        """Whether the upstream is free and the budget allows a hedge."""
+        if self._busy():
+            self.skipped_busy += 1
+            return False
+        return self._spend_credit()
+
+    def stats(self) -> dict:
+        """
+        Get hedging statistics.
+
+        Returns:
+            Dictionary with request, hedge and win counts and the delay
+        """
+        threshold = self.threshold()
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "wins": self.wins,
+            "over_budget": self.over_budget,
+            "skipped_busy": self.skipped_busy,
+            "threshold": round(threshold, 3) if threshold is not None else None,
+            "samples": len(self._latencies),
+        }
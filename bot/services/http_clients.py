@@ -0,0 +1,132 @@
+"""Tuned HTTP connection pools for the OpenAI and Telegram clients."""
+
+import asyncio
+import importlib.util
+import logging
+from collections.abc import Awaitable, Callable
+
+import httpx
+from telegram.request import HTTPXRequest
+
+from bot.services.metrics import telegram_request_duration
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def http2_available() -> bool:
+    """Whether the optional h2 package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _use_http2(enabled: bool, client_name: str) -> bool:
+    """Resolve the HTTP/2 toggle, falling back to HTTP/1.1 without h2."""
+    if enabled and not http2_available():
+        logger.warning(
+            f"HTTP/2 requested for {client_name} but h2 is not installed "
+            "(pip install 'httpx[http2]'), using HTTP/1.1"
+        )
+        return False
+    return enabled
+
+
+def build_openai_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled httpx client used by the OpenAI SDK.
+
+    Returns:
+        httpx.AsyncClient configured from settings
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.openai_timeout,
+            connect=settings.openai_connect_timeout,
+        ),
+        http2=_use_http2(settings.openai_http2, "OpenAI"),
+    )
+
+
+class TunedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest with a configurable keep-alive expiry."""
+
+    def __init__(self, keepalive_expiry: float, **kwargs):
+        """
+        Initialize request.
+
+        Args:
+            keepalive_expiry: Seconds an idle pooled connection is kept
+            **kwargs: Arguments for HTTPXRequest
+        """
+        super().__init__(**kwargs)
+        # HTTPXRequest has no keep-alive option, rebuild its client with one
+        pool_size = kwargs.get("connection_pool_size", 1)
+        self._client_kwargs["limits"] = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client = self._build_client()
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        """Send a Bot API request, recording its latency per API method."""
+        with telegram_request_duration.labels(url.rsplit("/", 1)[-1]).time():
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+def build_telegram_request() -> HTTPXRequest:
+    """
+    Build the pooled request object used by the Telegram bot.
+
+    Returns:
+        HTTPXRequest configured from settings
+    """
+    http2 = _use_http2(settings.telegram_http2, "Telegram")
+    return TunedHTTPXRequest(
+        keepalive_expiry=settings.telegram_keepalive_expiry,
+        connection_pool_size=settings.telegram_connection_pool_size,
+        connect_timeout=settings.telegram_connect_timeout,
+        read_timeout=settings.telegram_read_timeout,
+        write_timeout=settings.telegram_write_timeout,
+        pool_timeout=settings.telegram_pool_timeout,
+        http_version="2" if http2 else "1.1",
+    )
+
+
+async def prewarm(
+    name: str, call: Callable[[], Awaitable], connections: int, timeout: float
+) -> int:
+    """
+    Open pooled connections ahead of traffic with concurrent cheap calls.
+
+    Failures are logged and ignored, warming is best effort.
+
+    Args:
+        name: Client name for logging
+        call: Cheap request to issue, one per connection
+        connections: Number of concurrent calls
+        timeout: Seconds to wait for all calls
+
+    Returns:
+        Number of calls that succeeded
+    """
+    if connections <= 0:
+        return 0
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *(call() for _ in range(connections)), return_exceptions=True
+            ),
+            timeout,
+        )
+    except TimeoutError:
+        logger.warning(f"Pre-warming {name} connections timed out after {timeout}s")
+        return 0
+
+    succeeded = sum(not isinstance(result, Exception) for result in results)
+    logger.info(f"Pre-warmed {succeeded}/{connections} {name} connections")
+    return succeeded
@@ -0,0 +1,70 @@
+"""Fast path for parsing and filtering incoming webhook payloads."""
+
+import json
+import logging
+import random
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+
+    def loads(body: bytes) -> dict:
+        """Parse a JSON payload from raw bytes."""
+        return orjson.loads(body)
+
+except ImportError:  # pragma: no cover - depends on installed extras
+    JSON_BACKEND = "json"
+
+    def loads(body: bytes) -> dict:
+        """Parse a JSON payload from raw bytes."""
+        return json.loads(body)
+
+
+# Update keys that carry a message our handlers may react to
+_MESSAGE_KEYS = ("message", "edited_message")
+
+
+def is_handled_update(data: dict) -> bool:
+    """
+    Cheaply check whether any registered handler can process an update.
+
+    Works on the raw payload, so updates nobody handles (plain text,
+    stickers, channel posts, ...) are dropped before Update.de_json builds
+    the full object tree.
+
+    Args:
+        data: Raw update payload
+
+    Returns:
+        True if the update carries a location or a bot command
+    """
+    for key in _MESSAGE_KEYS:
+        message = data.get(key)
+        if message is None:
+            continue
+        if "location" in message:
+            return True
+        text = message.get("text")
+        return key == "message" and text is not None and text.startswith("/")
+    return False
+
+
+def should_log_payload() -> bool:
+    """
+    Decide whether to log the full payload of this update.
+
+    Payload logging is off unless log_webhook_payloads is set, and then
+    only a log_webhook_payload_sample_rate fraction of updates is logged.
+
+    Returns:
+        True if the payload should be logged
+    """
+    return (
+        settings.log_webhook_payloads
+        and random.random() < settings.log_webhook_payload_sample_rate
+    )
@@ -0,0 +1,262 @@
+"""Per-session state of shared live locations."""
+
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from bot.services.geo import Cell, cell_for, haversine_m
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Live location message, unique per chat
+SessionKey = tuple[int, int]
+
+# Max idle sessions removed per update, keeps sweeping amortized O(1)
+_SWEEP_BATCH = 16
+
+
+class LiveSession:
+    """Where a live location was last looked up."""
+
+    __slots__ = ("latitude", "longitude", "cell", "looked_up_at", "seen_at", "fact")
+
+    def __init__(self, latitude: float, longitude: float, cell: Cell, now: float):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.cell = cell
+        self.looked_up_at = now
+        self.seen_at = now
+        self.fact = 0  # hash of the last fact sent
+
+
+class LiveLocationTracker:
+    """
+    Decide which live location updates are worth a new fact.
+
+    A live location arrives as a stream of edits of one message, every few
+    seconds while the user moves. A session remembers the point of its last
+    lookup, and a new lookup is due only once the user has moved
+    min_distance_m from it, or entered a new cell and moved at least
+    jitter_m. Updates less accurate than max_accuracy_m, moves within the
+    reported accuracy and updates within min_interval of the last lookup
+    are ignored, so GPS jitter never triggers a lookup.
+
+    Sessions are kept in last-update order: idle ones are swept from the
+    front and the oldest are evicted beyond max_sessions.
+    """
+
+    def __init__(
+        self,
+        min_distance_m: float,
+        jitter_m: float,
+        min_interval: float,
+        max_accuracy_m: float,
+        session_ttl: float,
+        max_sessions: int,
+        cell_size_m: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize tracker.
+
+        Args:
+            min_distance_m: Meters from the last lookup that trigger a new one
+            jitter_m: Meters moved before a cell change triggers a lookup
+            min_interval: Seconds between lookups of one session
+            max_accuracy_m: Updates with a larger accuracy radius are ignored
+            session_ttl: Seconds without updates before a session is dropped
+            max_sessions: Max sessions kept, the oldest are evicted
+            cell_size_m: Cell size of the fact cache in meters
+            clock: Monotonic time source
+        """
+        self.min_distance_m = min_distance_m
+        self.jitter_m = jitter_m
+        self.min_interval = min_interval
+        self.max_accuracy_m = max_accuracy_m
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.cell_size_m = cell_size_m
+        self._clock = clock
+        self._sessions: OrderedDict[SessionKey, LiveSession] = OrderedDict()
+
+        self.updates = 0
+        self.lookups = 0
+        self.inaccurate = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: SessionKey) -> bool:
+        return key in self._sessions
+
+    def start(self, key: SessionKey, latitude: float, longitude: float) -> None:
+        """
+        Start a session at a point that was just looked up.
+
+        Args:
+            key: Chat and message id of the live location
+            latitude: Initial latitude
+            longitude: Initial longitude
+        """
+        now = self._clock()
+        self._sweep(now)
+        self._sessions[key] = LiveSession(
+            latitude, longitude, cell_for(latitude, longitude, self.cell_size_m), now
+        )
+        self._sessions.move_to_end(key)
+        self.lookups += 1
+
+    def should_look_up(
+        self,
+        key: SessionKey,
+        latitude: float,
+        longitude: float,
+        accuracy_m: float | None = None,
+    ) -> bool:
+        """
+        Record a position update and tell whether it deserves a lookup.
+
+        An update of an unknown session (e.g. after a restart) starts one
+        at that point without a lookup. Call looked_up once the lookup is
+        actually made.
+
+        Args:
+            key: Chat and message id of the live location
+            latitude: Reported latitude
+            longitude: Reported longitude
+            accuracy_m: Reported accuracy radius in meters
+
+        Returns:
+            True if a new fact should be looked up
+        """
+        now = self._clock()
+        self.updates += 1
+        session = self._sessions.get(key)
+        if session is None:
+            self._sweep(now)
+            self._sessions[key] = LiveSession(
+                latitude,
+                longitude,
+                cell_for(latitude, longitude, self.cell_size_m),
+                now,
+            )
+            return False
+
+        session.seen_at = now
+        self._sessions.move_to_end(key)
+
+        accuracy_m = accuracy_m or 0.0
+        if accuracy_m > self.max_accuracy_m:
+            self.inaccurate += 1
+            return False
+        if now - session.looked_up_at < self.min_interval:
+            return False
+
+        moved = haversine_m(session.latitude, session.longitude, latitude, longitude)
+        # A move within the accuracy radius may be noise
+        if moved <= accuracy_m:
+            return False
+        if moved >= self.min_distance_m:
+            return True
+        return (
+            moved >= self.jitter_m
+            and cell_for(latitude, longitude, self.cell_size_m) != session.cell
+        )
+
+    def looked_up(self, key: SessionKey, latitude: float, longitude: float) -> None:
+        """
+        Move a session's reference point to where a lookup was made.
+
+        Args:
+            key: Chat and message id of the live location
+            latitude: Looked up latitude
+            longitude: Looked up longitude
+        """
+        session = self._sessions.get(key)
+        if session is None:
+            return
+        session.latitude = latitude
+        session.longitude = longitude
+        session.cell = cell_for(latitude, longitude, self.cell_size_m)
+        session.looked_up_at = self._clock()
+        self.lookups += 1
+
+    def is_new_fact(self, key: SessionKey, fact: str) -> bool:
+        """
+        Check that a fact differs from the last one sent for the session.
+
+        Nearby points often share a cached fact, sending it twice adds
+        nothing.
+
+        Args:
+            key: Chat and message id of the live location
+            fact: Fact about to be sent
+
+        Returns:
+            True if the fact was not the session's last one
+        """
+        session = self._sessions.get(key)
+        if session is None:
+            return True
+        fact_hash = hash(fact)
+        if session.fact == fact_hash:
+            return False
+        session.fact = fact_hash
+        return True
+
+    def stop(self, key: SessionKey) -> None:
+        """
+        End a session when the user stops sharing.
+
+        Args:
+            key: Chat and message id of the live location
+        """
+        self._sessions.pop(key, None)
+
+    def _sweep(self, now: float, limit: int = _SWEEP_BATCH) -> None:
+        """Remove up to limit idle sessions and enforce max_sessions."""
+        deadline = now - self.session_ttl
+        removed = 0
+        while self._sessions and removed < limit:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.seen_at > deadline:
+                break
+            self._sessions.popitem(last=False)
+            removed += 1
+        self.expired += removed
+
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        """
+        Get live location statistics.
+
+        Returns:
+            Dictionary with session and update counts
+        """
+        return {
+            "sessions": len(self._sessions),
+            "updates": self.updates,
+            "lookups": self.lookups,
+            "inaccurate": self.inaccurate,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+# Create singleton instance
+live_tracker = LiveLocationTracker(
+    min_distance_m=settings.live_min_distance_m,
+    jitter_m=settings.live_jitter_m,
+    min_interval=settings.live_min_interval,
+    max_accuracy_m=settings.live_max_accuracy_m,
+    session_ttl=settings.live_session_ttl,
+    max_sessions=settings.live_max_sessions,
+    cell_size_m=settings.fact_cache_cell_size_m,
+)
@@ -0,0 +1,139 @@
+"""Event loop lag monitor with a stall watchdog."""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from bot.services.metrics import event_loop_lag, event_loop_stalls
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measure event loop scheduling delay and report long stalls.
+
+    A task sleeps for interval and records how late it wakes up. A watchdog
+    thread checks the task's heartbeat; when the loop has not run for
+    stall_threshold seconds it logs the running task and the stack of the
+    loop thread while the stall is still in progress.
+    """
+
+    def __init__(self, interval: float, stall_threshold: float):
+        """
+        Initialize monitor.
+
+        Args:
+            interval: Seconds between lag measurements
+            stall_threshold: Seconds without a heartbeat reported as a stall
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.max_lag = 0.0
+        self.measurements = 0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor is started."""
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start measuring on the running loop and start the watchdog."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the measuring task and the watchdog."""
+        if not self.running:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._watchdog.join)
+
+    async def _measure(self) -> None:
+        """Record how late every wake-up is."""
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - scheduled, 0.0)
+            event_loop_lag.observe(lag)
+            self.measurements += 1
+            if lag > self.max_lag:
+                self.max_lag = lag
+            self._heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        """Watchdog thread: report each stall once while it is happening."""
+        reported = None
+        while not self._stopped.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.stall_threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            # Counted on the loop thread, which owns the counters; this runs
+            # once the stall is over
+            self._loop.call_soon_threadsafe(self._count_stall)
+            self._report_stall(blocked)
+
+    def _count_stall(self) -> None:
+        """Count a stall reported by the watchdog."""
+        self.stalls += 1
+        event_loop_stalls.inc()
+
+    def _report_stall(self, blocked: float) -> None:
+        """Log the task and stack running on the blocked loop thread."""
+        task = asyncio.current_task(self._loop)
+        frame = sys._current_frames().get(self._thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else "unavailable"
+        logger.warning(
+            f"Event loop blocked for {blocked:.2f}s in task "
+            f"{task.get_name() if task else None} "
+            f"({task.get_coro() if task else 'no task'}):\n{stack}"
+        )
+
+    def stats(self) -> dict:
+        """
+        Get lag statistics.
+
+        Returns:
+            Dictionary with max lag, stall count and measurement count
+        """
+        return {
+            "max_lag": round(self.max_lag, 4),
+            "stalls": self.stalls,
+            "measurements": self.measurements,
+        }
+
+
+# Create singleton instance
+loop_monitor = LoopLagMonitor(
+    interval=settings.loop_monitor_interval,
+    stall_threshold=settings.loop_stall_threshold,
+)
@@ -0,0 +1,377 @@
+"""Prometheus-style metrics for the hot path."""
+
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+
+# Seconds, tuned for latencies from sub-millisecond decisions to OpenAI calls
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value in the exposition format."""
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    """Format a label set, empty when there are no labels."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by the /metrics endpoint."""
+
+    def __init__(self):
+        """Initialize registry."""
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: "_Metric") -> None:
+        """
+        Add a metric to the registry.
+
+        Raises:
+            ValueError: If a metric with the same name is registered
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Default registry rendered by /metrics
+registry = MetricsRegistry()
+
+
+class _Metric:
+    """
+    Base for metric families with optional labels.
+
+    Updates are plain attribute writes without locks: every update happens
+    on the event loop thread, so they cannot interleave.
+    """
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: MetricsRegistry | None = registry,
+    ):
+        """
+        Initialize metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names, values are given to labels()
+            registry: Registry to add the metric to, None to skip
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        Get the child metric for a set of label values.
+
+        Args:
+            *values: Label values in labelnames order
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"Expected labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def samples(self) -> Iterator[str]:
+        """Yield the exposition lines of all children."""
+        for values, child in self._children.items():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(child.get())}"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def get(self) -> float:
+        return self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the unlabeled counter."""
+        self._default.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0
+        self.function: Callable[[], float] | None = None
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a callback on scrape."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the unlabeled gauge."""
+        self._default.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        """Decrease the unlabeled gauge."""
+        self._default.value -= amount
+
+    def set(self, value: float) -> None:
+        """Set the unlabeled gauge."""
+        self._default.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the unlabeled gauge from function at scrape time."""
+        self._default.function = function
+
+
+class _Timer:
+    """Context manager observing the elapsed time into a histogram."""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: "_HistogramChild"):
+        self.histogram = histogram
+        self.started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One count per bucket plus the +Inf bucket, not cumulative
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: MetricsRegistry | None = registry,
+    ):
+        """
+        Initialize histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names, values are given to labels()
+            buckets: Sorted bucket upper bounds, +Inf is implied
+            registry: Registry to add the metric to, None to skip
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record a value in the unlabeled histogram."""
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        """Time a block into the unlabeled histogram."""
+        return _Timer(self._default)
+
+    def samples(self) -> Iterator[str]:
+        """Yield cumulative bucket, sum and count lines of all children."""
+        bucket_labels = (*self.labelnames, "le")
+        for values, child in self._children.items():
+            cumulative = 0
+            bounds = (*self.buckets, math.inf)
+            for upper_bound, count in zip(bounds, child.counts, strict=True):
+                cumulative += count
+                labels = _format_labels(
+                    bucket_labels, (*values, _format_value(upper_bound))
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+# Hot-path latencies
+webhook_duration = Histogram(
+    "webhook_duration_seconds", "Time spent handling a webhook request"
+)
+fact_lookup_duration = Histogram(
+    "fact_lookup_duration_seconds", "Time spent looking up a location fact"
+)
+telegram_request_duration = Histogram(
+    "telegram_request_duration_seconds",
+    "Latency of Telegram Bot API calls",
+    labelnames=("method",),
+)
+rate_limit_decision_duration = Histogram(
+    "rate_limit_decision_duration_seconds", "Time to decide a rate limit check"
+)
+send_queue_delay = Histogram(
+    "send_queue_delay_seconds", "Time a message waited in the send scheduler"
+)
+
+# Outcomes
+rate_limit_rejections = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    labelnames=("layer",),
+)
+overload_shed = Counter(
+    "overload_shed_total",
+    "Lookups answered without OpenAI while overloaded",
+    labelnames=("response",),
+)
+openai_errors = Counter("openai_errors_total", "Failed OpenAI fact requests")
+facts_missing = Counter("facts_missing_total", "Location lookups that produced no fact")
+openai_hedges = Counter(
+    "openai_hedges_total", "Second requests sent for slow OpenAI calls"
+)
+openai_hedge_wins = Counter(
+    "openai_hedge_wins_total", "Hedge requests that answered before the original"
+)
+telegram_retry_after = Counter(
+    "telegram_retry_after_total", "Sends Telegram asked to retry later (429)"
+)
+
+# Load
+webhook_in_flight = Gauge(
+    "webhook_in_flight_requests", "Webhook requests currently being handled"
+)
+openai_in_flight = Gauge(
+    "openai_in_flight_requests", "OpenAI requests currently in flight"
+)
+overloaded = Gauge("overloaded", "1 while serving degraded answers")
+openai_concurrency_limit = Gauge(
+    "openai_concurrency_limit", "Current adaptive OpenAI concurrency limit"
+)
+
+# Event loop health
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of event loop wake-ups beyond their scheduled time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_stalls = Counter(
+    "event_loop_stalls_total", "Times the event loop was blocked past the threshold"
+)
@@ -1,25 +1,178 @@
 """OpenAI client for generating location facts."""
 
+import asyncio
+import importlib
 import json
 import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from typing import TYPE_CHECKING
 
 import httpx
-from openai import AsyncOpenAI
 
+from bot.services.batcher import FactBatcher, Location
+from bot.services.concurrency import AdaptiveConcurrencyLimiter
+from bot.services.fact_cache import FactCache
+from bot.services.fact_store import FactStore
+from bot.services.geo import cell_for
+from bot.services.hedging import Hedger
+from bot.services.http_clients import build_openai_http_client, prewarm
+from bot.services.metrics import fact_lookup_duration, facts_missing, openai_errors
+from bot.services.overload import overload
+from bot.services.rate_limiter import rate_limiter
+from bot.services.refresher import FactRefresher
+from bot.services.singleflight import SingleFlight
 from config.settings import settings
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, RateLimitError
+
 logger = logging.getLogger(__name__)
 
+MAX_FACT_LENGTH = 512
+
+# Structured output schema for batched lookups
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "location_facts",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"facts": {"type": "array", "items": {"type": "string"}}},
+            "required": ["facts"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _trim(fact: str) -> str:
+    """Trim a fact to MAX_FACT_LENGTH characters."""
+    if len(fact) > MAX_FACT_LENGTH:
+        return fact[: MAX_FACT_LENGTH - 3] + "..."
+    return fact
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    """Whether an error is an OpenAI 429."""
+    # The SDK is already imported once a request could have failed
+    from openai import RateLimitError
+
+    return isinstance(error, RateLimitError)
+
+
+def _retry_after(error: "RateLimitError") -> float | None:
+    """Extract the Retry-After delay (seconds) from a 429 response."""
+    headers = error.response.headers if error.response is not None else {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
 
 class OpenAIClient:
     """Client for interacting with OpenAI API."""
 
     def __init__(self):
         """Initialize OpenAI client."""
-        self.client = AsyncOpenAI(
-            api_key=settings.openai_api_key,
-            timeout=httpx.Timeout(settings.openai_timeout),
+        self._client: AsyncOpenAI | None = None
+        self.cache = FactCache() if settings.fact_cache_enabled else None
+        self.store = (
+            FactStore(settings.fact_store_path) if settings.fact_store_enabled else None
         )
+        self.inflight = SingleFlight()
+        self.refresher = (
+            FactRefresher(
+                cache=self.cache,
+                refresh=self.refresh_fact,
+                token_budget=settings.fact_refresh_token_budget,
+                tokens_per_refresh=settings.openai_max_tokens,
+                interval=settings.fact_refresh_interval,
+                refresh_ahead=settings.fact_refresh_ahead,
+                max_per_run=settings.fact_refresh_max_per_run,
+                offpeak_hours=settings.fact_refresh_offpeak_hours,
+                half_life=settings.fact_refresh_heat_half_life,
+                max_tracked=settings.fact_refresh_max_tracked,
+                # Refreshes have no cell of a user request, only the global
+                # upstream layer applies to them
+                acquire=rate_limiter.acquire_upstream,
+            )
+            if settings.fact_refresh_enabled and self.cache is not None
+            else None
+        )
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial_limit=settings.openai_concurrency_initial,
+            min_limit=settings.openai_concurrency_min,
+            max_limit=settings.openai_concurrency_max,
+            target_latency=settings.openai_target_latency,
+            max_queue=settings.openai_queue_max_size,
+        )
+        self.hedger = (
+            Hedger(
+                quantile=settings.openai_hedge_quantile,
+                min_delay=settings.openai_hedge_min_delay,
+                budget_percent=settings.openai_hedge_budget_percent,
+                window=settings.openai_hedge_window,
+                min_samples=settings.openai_hedge_min_samples,
+                busy=self.concurrency.would_wait,
+            )
+            if settings.openai_hedging
+            else None
+        )
+        self.batcher = (
+            FactBatcher(
+                fetch_batch=self._request_facts_batch,
+                fetch_one=self._request_fact,
+                window=settings.openai_batch_window,
+                max_batch=settings.openai_batch_max_size,
+            )
+            if settings.openai_batching
+            else None
+        )
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """
+        SDK client, created on first use.
+
+        Importing the OpenAI SDK is the largest part of the import time of
+        bot.main, so it is deferred until a request (or warm_up) needs it.
+        """
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                timeout=httpx.Timeout(
+                    settings.openai_timeout, connect=settings.openai_connect_timeout
+                ),
+                http_client=build_openai_http_client(),
+            )
+        return self._client
+
+    async def warm_up(self) -> None:
+        """Import the SDK and open pooled connections before the first request."""
+        # Import in a thread so the event loop keeps serving meanwhile
+        await asyncio.to_thread(importlib.import_module, "openai")
+        await prewarm(
+            "OpenAI",
+            lambda: self.client.models.retrieve(settings.openai_model),
+            connections=settings.http_prewarm_connections,
+            timeout=settings.http_prewarm_timeout,
+        )
+
+    async def close(self) -> None:
+        """Close the HTTP connection pool."""
+        if self._client is not None:
+            await self._client.close()
+        if self.store is not None:
+            await self.store.close()
 
     async def get_location_fact(
         self, latitude: float, longitude: float, language: str = "ru"
@@ -35,36 +188,425 @@ class OpenAIClient:
         Returns:
             Interesting fact about the location or None if error
         """
+        with fact_lookup_duration.time():
+            fact = await self._lookup_fact(latitude, longitude, language)
+        if fact is None:
+            facts_missing.inc()
+        return fact
+
+    async def has_fact(self, latitude: float, longitude: float, language: str) -> bool:
+        """
+        Tell whether a lookup would be answered without calling OpenAI.
+
+        True for cached facts (expired ones too while they would be served
+        stale), nearby stored facts and cells whose fact is already being
+        fetched. Not counted as a cache or store hit.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Language for the response ("ru" or "en")
+
+        Returns:
+            True if no upstream call would be made
+        """
+        key = (cell_for(latitude, longitude, settings.fact_cache_cell_size_m), language)
+        if self.inflight.is_running(key):
+            return True
+        if self.cache is not None:
+            expires_in = self.cache.expires_in(key)
+            if expires_in is not None and (
+                expires_in > 0
+                or (self.refresher is not None and expires_in > -self.cache.stale_ttl)
+            ):
+                return True
+        if self.store is not None:
+            return bool(
+                await self.store.within(
+                    latitude, longitude, settings.fact_store_radius_m, language, limit=1
+                )
+            )
+        return False
+
+    async def nearby_fact(
+        self, latitude: float, longitude: float, language: str, radius_m: float
+    ) -> str | None:
+        """
+        Get the nearest known fact without calling OpenAI.
+
+        Checks the cache (expired facts included) and then the persistent
+        store within radius_m.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Language for the response ("ru" or "en")
+            radius_m: Search radius in meters
+
+        Returns:
+            Nearest fact or None
+        """
+        if self.cache is not None:
+            fact = self.cache.nearest(latitude, longitude, language, radius_m)
+            if fact is not None:
+                return fact
+        if self.store is not None:
+            stored = await self.store.nearest(latitude, longitude, language, radius_m)
+            if stored is not None:
+                return stored.fact
+        return None
+
+    async def _lookup_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """Serve a fact from the cache or fetch it, sharing concurrent fetches."""
+        if self.refresher is not None:
+            self.refresher.record(latitude, longitude, language)
+
+        if self.cache is not None:
+            fact = self.cache.get(latitude, longitude, language)
+            if fact is not None:
+                logger.debug(f"Fact cache hit for {latitude}, {longitude}")
+                return fact
+
+            # Serve an expired fact right away and refresh it in the background
+            if self.refresher is not None:
+                fact = self.cache.get_stale(latitude, longitude, language)
+                if fact is not None:
+                    self.refresher.revalidate(latitude, longitude, language)
+                    return fact
+
+        key = (cell_for(latitude, longitude, settings.fact_cache_cell_size_m), language)
         try:
-            system_prompt = (
-                settings.system_prompt_ru
-                if language == "ru"
-                else settings.system_prompt_en
+            # Concurrent lookups for the same cell share one OpenAI call
+            return await self.inflight.do(
+                key, lambda: self._fetch_fact(latitude, longitude, language)
+            )
+        except Exception as e:
+            openai_errors.inc()
+            logger.error(f"OpenAI API error: {e}")
+            return None
+
+    async def _fetch_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """
+        Get a fact from the persistent store or OpenAI and remember it.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Language for the response ("ru" or "en")
+
+        Returns:
+            Fact text (trimmed to 512 characters) or None if empty
+        """
+        fact = await self._stored_fact(latitude, longitude, language)
+        if fact is not None:
+            return fact
+        return await self._generate_fact(latitude, longitude, language)
+
+    async def refresh_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """
+        Generate a new fact for a location, bypassing cache and store.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Language for the response ("ru" or "en")
+
+        Returns:
+            New fact or None if empty
+        """
+        key = (cell_for(latitude, longitude, settings.fact_cache_cell_size_m), language)
+        return await self.inflight.do(
+            key, lambda: self._generate_fact(latitude, longitude, language)
+        )
+
+    async def _generate_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """Request a fact from OpenAI, trim it and remember it."""
+        if self.batcher is not None:
+            fact = await self.batcher.submit(latitude, longitude, language)
+        else:
+            fact = await self._request_fact(latitude, longitude, language)
+
+        # Trim to 512 characters if needed
+        if fact:
+            fact = _trim(fact)
+
+        if fact:
+            await self._remember(latitude, longitude, language, fact)
+
+        return fact
+
+    async def _stored_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """Get a nearby fact from the persistent store and cache it."""
+        if self.store is None:
+            return None
+        stored = await self.store.nearest(
+            latitude, longitude, language, settings.fact_store_radius_m
+        )
+        if stored is None:
+            return None
+        if self.cache is not None:
+            self.cache.set(latitude, longitude, language, stored.fact)
+        return stored.fact
+
+    async def _remember(
+        self, latitude: float, longitude: float, language: str, fact: str
+    ) -> None:
+        """Save a freshly generated fact in the cache and the store."""
+        if self.cache is not None:
+            self.cache.set(latitude, longitude, language, fact)
+        if self.store is not None:
+            await self.store.add(
+                latitude, longitude, language, fact, settings.openai_model
             )
 
-            user_content = json.dumps({"latitude": latitude, "longitude": longitude})
+    async def _request_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> str | None:
+        """Request a single fact with one completion, hedged if enabled."""
 
-            response = await self.client.chat.completions.create(
+        def create():
+            return self._create_completion(
                 model=settings.openai_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content},
-                ],
+                messages=self._messages(latitude, longitude, language),
                 temperature=settings.openai_temperature,
                 max_tokens=settings.openai_max_tokens,
             )
 
-            fact = response.choices[0].message.content
+        if self.hedger is not None:
+            response = await self.hedger.run(create)
+        else:
+            response = await create()
+        return response.choices[0].message.content
 
-            # Trim to 512 characters if needed
-            if fact and len(fact) > 512:
-                fact = fact[:509] + "..."
+    async def _request_facts_batch(
+        self, locations: list[Location], language: str
+    ) -> list[str | None]:
+        """
+        Request facts for several locations with one structured completion.
 
-            return fact
+        Args:
+            locations: (latitude, longitude) pairs
+            language: Language for the response ("ru" or "en")
 
-        except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
-            return None
+        Returns:
+            Facts in the order of locations
+
+        Raises:
+            ValueError: If the response is not the expected JSON array
+        """
+        system_prompt = (
+            settings.system_prompt_ru if language == "ru" else settings.system_prompt_en
+        )
+        user_content = json.dumps(
+            [{"latitude": lat, "longitude": lon} for lat, lon in locations]
+        )
+        response = await self._create_completion(
+            model=settings.openai_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"{system_prompt}\n{settings.batch_prompt_suffix}",
+                },
+                {"role": "user", "content": user_content},
+            ],
+            temperature=settings.openai_temperature,
+            max_tokens=settings.openai_max_tokens * len(locations),
+            response_format=BATCH_RESPONSE_FORMAT,
+        )
+
+        try:
+            facts = json.loads(response.choices[0].message.content)["facts"]
+        except (TypeError, KeyError, json.JSONDecodeError) as e:
+            raise ValueError(f"Malformed batch response: {e}") from e
+        if not isinstance(facts, list) or not all(
+            isinstance(fact, str) for fact in facts
+        ):
+            raise ValueError("Batch response facts is not a list of strings")
+        return facts
+
+    async def stream_location_fact(
+        self, latitude: float, longitude: float, language: str = "ru"
+    ) -> AsyncIterator[str]:
+        """
+        Stream an interesting fact about a location as it is generated.
+
+        Yields the accumulated text after every received chunk, trimmed to
+        512 characters (generation is stopped once the limit is hit). Cached
+        facts, or facts already being fetched for the same cell, are yielded
+        as a single complete text. While streaming, the stream is the
+        in-flight call for its cell: concurrent lookups wait for its final
+        text instead of calling OpenAI again. Errors are logged and end the
+        stream.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Language for the response ("ru" or "en")
+
+        Yields:
+            Fact text received so far
+        """
+        key = (cell_for(latitude, longitude, settings.fact_cache_cell_size_m), language)
+        started = time.perf_counter()
+        cached = self.cache.get(latitude, longitude, language) if self.cache else None
+        if cached is None:
+            cached = await self._stored_fact(latitude, longitude, language)
+        if cached is not None:
+            fact_lookup_duration.observe(time.perf_counter() - started)
+            yield cached
+            return
+
+        flight = self.inflight.claim(key)
+        if flight is None:
+            fact = await self.get_location_fact(latitude, longitude, language)
+            if fact:
+                yield fact
+            return
+
+        fact = None
+        finished = False
+        try:
+            try:
+                text = ""
+                async for text in self._stream_fact(latitude, longitude, language):
+                    yield text
+                fact = text or None
+            except Exception as e:
+                openai_errors.inc()
+                logger.error(f"OpenAI API error: {e}")
+            finished = True
+        finally:
+            # Waiters get the final text, None if the stream failed or was
+            # abandoned
+            flight.set_result(fact)
+            if finished:
+                fact_lookup_duration.observe(time.perf_counter() - started)
+                if fact is None:
+                    facts_missing.inc()
+
+    async def _stream_fact(
+        self, latitude: float, longitude: float, language: str
+    ) -> AsyncIterator[str]:
+        """
+        Stream a fact from OpenAI and remember it once complete.
+
+        The stream is read by a separate task into a queue, so the
+        concurrency slot and its latency cover the upstream read only, not
+        the time the caller spends between items (e.g. sending messages).
+        """
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        reader = asyncio.create_task(
+            self._read_stream(latitude, longitude, language, queue.put_nowait)
+        )
+        reader.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (text := await queue.get()) is not None:
+                yield text
+            text = reader.result()
+        finally:
+            # Stops reading if the caller abandoned the stream
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+        if text:
+            await self._remember(latitude, longitude, language, text)
+
+    async def _read_stream(
+        self,
+        latitude: float,
+        longitude: float,
+        language: str,
+        emit: Callable[[str], None],
+    ) -> str:
+        """Read a streamed completion, emitting the text after every chunk."""
+        text = ""
+        queued_at = time.monotonic()
+        try:
+            async with self.concurrency.slot(settings.openai_queue_timeout) as permit:
+                overload.record_queue_wait(permit.started - queued_at)
+                try:
+                    stream = await self.client.chat.completions.create(
+                        model=settings.openai_model,
+                        messages=self._messages(latitude, longitude, language),
+                        temperature=settings.openai_temperature,
+                        max_tokens=settings.openai_max_tokens,
+                        stream=True,
+                    )
+                except Exception as e:
+                    if _is_rate_limit(e):
+                        permit.mark_throttled(_retry_after(e))
+                    raise
+
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices or not chunk.choices[0].delta.content:
+                            continue
+                        text += chunk.choices[0].delta.content
+                        if len(text) > MAX_FACT_LENGTH:
+                            text = _trim(text)
+                            emit(text)
+                            break
+                        emit(text)
+                finally:
+                    await stream.close()
+        except Exception:
+            overload.record_result(ok=False)
+            raise
+
+        overload.record_result(ok=True)
+        return text
+
+    @staticmethod
+    def _messages(latitude: float, longitude: float, language: str) -> list[dict]:
+        """Build the chat messages for a location prompt."""
+        system_prompt = (
+            settings.system_prompt_ru if language == "ru" else settings.system_prompt_en
+        )
+        user_content = json.dumps({"latitude": latitude, "longitude": longitude})
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ]
+
+    async def _create_completion(self, **kwargs):
+        """
+        Call chat.completions.create within the adaptive concurrency limit.
+
+        Waits in the limiter queue for at most openai_queue_timeout seconds
+        and feeds 429s (with their Retry-After) back into the limiter. The
+        queue wait and the outcome are reported to the overload controller.
+
+        Args:
+            **kwargs: Arguments for chat.completions.create
+
+        Returns:
+            OpenAI completion response
+        """
+        queued_at = time.monotonic()
+        try:
+            async with self.concurrency.slot(settings.openai_queue_timeout) as permit:
+                overload.record_queue_wait(permit.started - queued_at)
+                try:
+                    response = await self.client.chat.completions.create(**kwargs)
+                except Exception as e:
+                    if _is_rate_limit(e):
+                        permit.mark_throttled(_retry_after(e))
+                    raise
+        except Exception:
+            overload.record_result(ok=False)
+            raise
+        overload.record_result(ok=True)
+        return response
 
 
 # Create singleton instance
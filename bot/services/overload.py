@@ -0,0 +1,231 @@
+"""Overload detection for degrading to cached answers instead of queueing."""
+
+import logging
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from bot.services.metrics import overloaded
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Second:
+    """Upstream outcomes and queue waits observed within one second."""
+
+    __slots__ = ("second", "requests", "errors", "waits", "wait_total")
+
+    def __init__(self, second: int):
+        self.second = second
+        self.requests = 0
+        self.errors = 0
+        self.waits = 0
+        self.wait_total = 0.0
+
+
+class OverloadController:
+    """
+    Decide when to answer without calling upstream.
+
+    Three signals are watched: fact lookups in flight, the average time
+    spent queueing (for a worker or an OpenAI slot) and the OpenAI error
+    rate, the latter two over the last window seconds in one-second
+    buckets. Crossing any limit enters degraded mode. It is left only once
+    every signal is below recover_ratio of its limit and min_duration has
+    passed, so the mode does not flap around a threshold.
+
+    While degraded, one lookup per probe_interval is still let through, so
+    upstream recovery shows up in the error rate.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue_wait: float,
+        max_error_rate: float,
+        min_requests: int,
+        window: int,
+        recover_ratio: float,
+        min_duration: float,
+        probe_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize controller.
+
+        Args:
+            max_in_flight: Fact lookups in flight that mean overload
+            max_queue_wait: Average queue wait in seconds that means overload
+            max_error_rate: Share of failed upstream calls that means overload
+            min_requests: Upstream calls in the window before the error
+                rate counts
+            window: Seconds of history for queue wait and error rate
+            recover_ratio: Share of each limit all signals must drop below
+            min_duration: Min seconds in degraded mode
+            probe_interval: Seconds between lookups let through when degraded
+            clock: Monotonic time source
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue_wait = max_queue_wait
+        self.max_error_rate = max_error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.recover_ratio = recover_ratio
+        self.min_duration = min_duration
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._seconds: deque[_Second] = deque()
+
+        self.in_flight = 0
+        self.active = False
+        self.reason: str | None = None
+        self._since = 0.0
+        self._last_probe = 0.0
+
+        self.episodes = 0
+        self.shed = 0
+        self.probes = 0
+
+    def _bucket(self, now: float) -> _Second:
+        """Get the bucket of the current second, dropping old ones."""
+        second = int(now)
+        while self._seconds and self._seconds[0].second <= second - self.window:
+            self._seconds.popleft()
+        if not self._seconds or self._seconds[-1].second != second:
+            self._seconds.append(_Second(second))
+        return self._seconds[-1]
+
+    def record_result(self, ok: bool) -> None:
+        """
+        Record the outcome of an upstream call.
+
+        Args:
+            ok: Whether the call succeeded
+        """
+        bucket = self._bucket(self._clock())
+        bucket.requests += 1
+        if not ok:
+            bucket.errors += 1
+
+    def record_queue_wait(self, seconds: float) -> None:
+        """
+        Record how long a request waited in a queue.
+
+        Args:
+            seconds: Queue wait time
+        """
+        bucket = self._bucket(self._clock())
+        bucket.waits += 1
+        bucket.wait_total += seconds
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a fact lookup as in flight for the duration of the block."""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def signals(self) -> dict:
+        """
+        Get the current signal values.
+
+        Returns:
+            Dictionary with in_flight, queue_wait and error_rate (None
+            while fewer than min_requests calls were made)
+        """
+        self._bucket(self._clock())
+        requests = errors = waits = 0
+        wait_total = 0.0
+        for bucket in self._seconds:
+            requests += bucket.requests
+            errors += bucket.errors
+            waits += bucket.waits
+            wait_total += bucket.wait_total
+        return {
+            "in_flight": self.in_flight,
+            "queue_wait": wait_total / waits if waits else 0.0,
+            "error_rate": errors / requests if requests >= self.min_requests else None,
+        }
+
+    def _over(self, signals: dict, ratio: float) -> str | None:
+        """Name the first signal at or above ratio of its limit."""
+        if signals["in_flight"] >= self.max_in_flight * ratio:
+            return "in_flight"
+        if signals["queue_wait"] >= self.max_queue_wait * ratio:
+            return "queue_wait"
+        error_rate = signals["error_rate"]
+        if error_rate is not None and error_rate >= self.max_error_rate * ratio:
+            return "error_rate"
+        return None
+
+    def should_shed(self) -> bool:
+        """
+        Update the mode and tell whether to answer without upstream.
+
+        Returns:
+            True if the request should get a degraded answer
+        """
+        now = self._clock()
+        signals = self.signals()
+        if not self.active:
+            reason = self._over(signals, 1.0)
+            if reason is None:
+                return False
+            self.active = True
+            self.reason = reason
+            self._since = now
+            self._last_probe = now
+            self.episodes += 1
+            overloaded.set(1)
+            logger.warning(f"Overloaded ({reason}), serving degraded answers")
+        elif (
+            now - self._since >= self.min_duration
+            and self._over(signals, self.recover_ratio) is None
+        ):
+            logger.info(
+                f"Recovered after {now - self._since:.0f}s, calling upstream again"
+            )
+            self.active = False
+            self.reason = None
+            overloaded.set(0)
+            return False
+
+        if now - self._last_probe >= self.probe_interval:
+            self._last_probe = now
+            self.probes += 1
+            return False
+        self.shed += 1
+        return True
+
+    def stats(self) -> dict:
+        """
+        Get overload state.
+
+        Returns:
+            Dictionary with mode, signals and shed counts
+        """
+        return {
+            "active": self.active,
+            "reason": self.reason,
+            **self.signals(),
+            "episodes": self.episodes,
+            "shed": self.shed,
+            "probes": self.probes,
+        }
+
+
+# Create singleton instance
+overload = OverloadController(
+    max_in_flight=settings.overload_max_in_flight,
+    max_queue_wait=settings.overload_max_queue_wait,
+    max_error_rate=settings.overload_max_error_rate,
+    min_requests=settings.overload_min_requests,
+    window=settings.overload_window,
+    recover_ratio=settings.overload_recover_ratio,
+    min_duration=settings.overload_min_duration,
+    probe_interval=settings.overload_probe_interval,
+)
@@ -0,0 +1,254 @@
+"""Long-polling update intake for deployments without a webhook."""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+from telegram import Bot, Update
+from telegram.error import InvalidToken, RetryAfter, TelegramError
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ProcessUpdate = Callable[[Update], Awaitable[None]]
+
+
+def chat_key(update: Update) -> int:
+    """Key whose updates must be processed in order: chat, user or update."""
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return update.update_id
+
+
+class UpdatePoller:
+    """
+    Pull updates with getUpdates and process chats concurrently.
+
+    Every chat has a serial queue that lives across polls, so the updates
+    of one chat run in arrival order and chats never wait for each other.
+    getUpdates confirms every update below the offset it is called with,
+    so the offset only moves past updates that have finished: a crash
+    re-delivers unfinished updates instead of losing them. Updates that
+    are still running come back in later polls and are skipped; since a
+    poll returns at most limit updates from the offset, one slow update
+    holds back at most limit others.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        timeout: int,
+        allowed_updates: list[str],
+        max_backoff: float = 30.0,
+    ):
+        """
+        Initialize poller.
+
+        Args:
+            limit: Max updates per getUpdates call (Telegram allows 1-100)
+            timeout: Long-poll wait in seconds
+            allowed_updates: Update types to receive
+            max_backoff: Max seconds between retries after errors
+        """
+        self.limit = limit
+        self.timeout = timeout
+        self.allowed_updates = allowed_updates
+        self.max_backoff = max_backoff
+        self.offset: int | None = None
+        self._bot: Bot | None = None
+        self._process: ProcessUpdate | None = None
+        self._task: asyncio.Task | None = None
+
+        # Ids received but not finished, ascending since Telegram's are
+        self._unfinished: dict[int, None] = {}
+        self._last_seen: int | None = None
+        self._chat_queues: dict[int, deque[Update]] = {}
+        self._chat_tasks: dict[int, asyncio.Task] = {}
+        self._progress = asyncio.Event()
+
+        self.polls = 0
+        self.updates = 0
+        self.redelivered = 0
+        self.failed = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the polling loop is running."""
+        return self._task is not None
+
+    async def start(self, bot: Bot, process: ProcessUpdate) -> bool:
+        """
+        Start polling unless a webhook is registered.
+
+        A registered webhook is left alone: it may belong to another
+        deployment using the same token, and getUpdates is refused while
+        it is set.
+
+        Args:
+            bot: Initialized bot to poll with
+            process: Coroutine function processing one update
+
+        Returns:
+            True if polling started
+        """
+        if self.running:
+            return True
+        info = await bot.get_webhook_info()
+        if info.url:
+            logger.error(
+                f"Not polling: a webhook is registered at {info.url}. "
+                "Delete it with deleteWebhook to switch this bot to polling"
+            )
+            return False
+        self._bot = bot
+        self._process = process
+        self._task = asyncio.create_task(self._loop(), name="update-poller")
+        logger.info(
+            f"Polling for updates: limit {self.limit}, timeout {self.timeout}s, "
+            f"allowed updates {self.allowed_updates}"
+        )
+        return True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop polling, wait for running updates and confirm finished ones.
+
+        Args:
+            timeout: Seconds to wait for running updates
+        """
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._chat_tasks:
+            await asyncio.wait(list(self._chat_tasks.values()), timeout=timeout)
+        if self.offset is not None:
+            try:
+                await self._bot.get_updates(offset=self.offset, limit=1, timeout=0)
+            except TelegramError as e:
+                logger.warning(f"Could not confirm processed updates: {e}")
+
+    async def _loop(self) -> None:
+        """Fetch and dispatch updates until cancelled."""
+        backoff = min(1.0, self.max_backoff)
+        while True:
+            # Cleared before the call, so progress made during it is seen
+            self._progress.clear()
+            try:
+                updates = await self._bot.get_updates(
+                    offset=self.offset,
+                    limit=self.limit,
+                    timeout=self.timeout,
+                    allowed_updates=self.allowed_updates,
+                )
+            except InvalidToken:
+                logger.error("Polling stopped: the bot token was rejected")
+                raise
+            except RetryAfter as e:
+                self.errors += 1
+                await asyncio.sleep(e.retry_after)
+                continue
+            except TelegramError as e:
+                # Network errors, or Conflict when another poller is running
+                self.errors += 1
+                logger.warning(f"getUpdates failed, retrying in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = min(1.0, self.max_backoff)
+            self.polls += 1
+            if not self.dispatch(updates, self._process) and self._unfinished:
+                # Only updates still running came back, polling again right
+                # away would return them again
+                await self._progress.wait()
+
+    def dispatch(self, updates: tuple[Update, ...], process: ProcessUpdate) -> int:
+        """
+        Queue new updates on their chats' serial queues.
+
+        Args:
+            updates: Updates in the order Telegram returned them
+            process: Coroutine function processing one update
+
+        Returns:
+            Number of updates that were new
+        """
+        new = 0
+        for update in updates:
+            if self._last_seen is not None and update.update_id <= self._last_seen:
+                self.redelivered += 1
+                continue
+            new += 1
+            self._last_seen = update.update_id
+            self._unfinished[update.update_id] = None
+            if self.offset is None:
+                self.offset = update.update_id
+
+            key = chat_key(update)
+            queue = self._chat_queues.get(key)
+            if queue is None:
+                queue = self._chat_queues[key] = deque()
+            queue.append(update)
+            if key not in self._chat_tasks:
+                self._chat_tasks[key] = asyncio.create_task(
+                    self._run_chat(key, queue, process)
+                )
+        self.updates += new
+        return new
+
+    async def _run_chat(
+        self, key: int, queue: deque[Update], process: ProcessUpdate
+    ) -> None:
+        """Process a chat's queued updates in order until it is empty."""
+        while queue:
+            update = queue.popleft()
+            try:
+                await process(update)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error processing update {update.update_id}: {e}")
+            self._finish(update.update_id)
+        del self._chat_queues[key]
+        del self._chat_tasks[key]
+
+    def _finish(self, update_id: int) -> None:
+        """Move the offset past the finished prefix of received updates."""
+        self._unfinished.pop(update_id, None)
+        if self._unfinished:
+            self.offset = next(iter(self._unfinished))
+        else:
+            self.offset = self._last_seen + 1
+        self._progress.set()
+
+    def stats(self) -> dict:
+        """
+        Get polling statistics.
+
+        Returns:
+            Dictionary with poll and update counts, errors and offset
+        """
+        return {
+            "offset": self.offset,
+            "polls": self.polls,
+            "updates": self.updates,
+            "redelivered": self.redelivered,
+            "in_flight": len(self._unfinished),
+            "chats": len(self._chat_tasks),
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+# Create singleton instance
+update_poller = UpdatePoller(
+    limit=settings.polling_limit,
+    timeout=settings.polling_timeout,
+    allowed_updates=settings.polling_allowed_updates,
+)
@@ -0,0 +1,313 @@
+"""Shared storage backends for the rate limiter."""
+
+import asyncio
+import logging
+import math
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class Limit(NamedTuple):
+    """Rate of one limiter layer."""
+
+    max_rate: float
+    time_period: float
+
+
+# (layer name, key) pair checked in one decision
+LimitCheck = tuple[str, Hashable]
+
+
+def key_to_str(key: Hashable) -> str:
+    """
+    Serialize a limiter key for storage outside the process.
+
+    Args:
+        key: User/chat ID, cell tuple or None for global layers
+
+    Returns:
+        Stable string representation
+    """
+    if key is None:
+        return "*"
+    if isinstance(key, tuple):
+        return ":".join(str(part) for part in key)
+    return str(key)
+
+
+class RateLimitBackend(ABC):
+    """Storage for limiter state, shared or in-process."""
+
+    @abstractmethod
+    async def try_acquire(self, checks: list[LimitCheck]) -> str | None:
+        """
+        Atomically check and consume one slot on every (layer, key) pair.
+
+        Args:
+            checks: Layers and keys to check
+
+        Returns:
+            None if allowed, otherwise the name of the first full layer
+        """
+
+    async def close(self) -> None:  # noqa: B027 - optional hook
+        """Release backend resources."""
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Leaky buckets in a SQLite database in WAL mode.
+
+    Shares limits between worker processes on a single host. Each decision
+    is one IMMEDIATE transaction with a batched read and a batched upsert,
+    which takes well under a millisecond on local disk. The connection lives
+    on a dedicated thread, so waiting for another process's lock or a slow
+    disk never blocks the event loop, and decisions run one at a time.
+    """
+
+    # Run the expiry DELETE once per this many decisions
+    EXPIRE_EVERY = 1000
+
+    def __init__(self, path: str, limits: dict[str, Limit]):
+        """
+        Initialize SQLite backend.
+
+        Args:
+            path: Database file path
+            limits: Rate of every layer
+        """
+        self.limits = limits
+        self.max_period = max(
+            (limit.time_period for limit in limits.values()), default=0
+        )
+        self._decisions = 0
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="rate-limit-db")
+        self._conn = self._executor.submit(self._open, path).result()
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        """Open the database and create the table, on the database thread."""
+        conn = sqlite3.connect(path, isolation_level=None, timeout=1.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " layer TEXT NOT NULL, key TEXT NOT NULL,"
+            " level REAL NOT NULL, updated REAL NOT NULL,"
+            " PRIMARY KEY (layer, key)) WITHOUT ROWID"
+        )
+        return conn
+
+    async def try_acquire(self, checks: list[LimitCheck]) -> str | None:
+        """Check and consume all layers in one transaction."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._try_acquire, checks)
+
+    def _try_acquire(self, checks: list[LimitCheck]) -> str | None:
+        """Run one decision, on the database thread."""
+        rows = [(layer, key_to_str(key)) for layer, key in checks]
+        now = time.time()
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("(?, ?)" for _ in rows)
+            params = [value for row in rows for value in row]
+            stored = {
+                (layer, key): (level, updated)
+                for layer, key, level, updated in self._conn.execute(
+                    "SELECT layer, key, level, updated FROM rate_limits"
+                    f" WHERE (layer, key) IN (VALUES {placeholders})",
+                    params,
+                )
+            }
+
+            new_levels = []
+            for layer, key in rows:
+                limit = self.limits[layer]
+                level, updated = stored.get((layer, key), (0.0, now))
+                level = max(
+                    level - (now - updated) * limit.max_rate / limit.time_period, 0.0
+                )
+                if level + 1 > limit.max_rate:
+                    self._conn.execute("ROLLBACK")
+                    return layer
+                new_levels.append((layer, key, level + 1, now))
+
+            self._conn.executemany(
+                "INSERT INTO rate_limits (layer, key, level, updated)"
+                " VALUES (?, ?, ?, ?) ON CONFLICT (layer, key)"
+                " DO UPDATE SET level = excluded.level, updated = excluded.updated",
+                new_levels,
+            )
+
+            self._decisions += 1
+            if self._decisions % self.EXPIRE_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM rate_limits WHERE updated < ?",
+                    (now - self.max_period,),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+        return None
+
+    async def close(self) -> None:
+        """Close the database connection and stop its thread."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis server."""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Fixed-window counters in Redis, shared by all replicas.
+
+    Every decision is a single pipelined MULTI/EXEC round trip of
+    INCR + PEXPIRE per layer. If any counter exceeds its limit the
+    increments are rolled back with a second pipelined DECR round trip,
+    so a rejected request consumes nothing. Only plain commands are used,
+    no Lua, so any Redis-protocol server works.
+    """
+
+    def __init__(self, url: str, limits: dict[str, Limit], prefix: str = "rl"):
+        """
+        Initialize Redis backend.
+
+        Args:
+            url: Server URL, e.g. redis://:password@localhost:6379/0
+            limits: Rate of every layer
+            prefix: Key prefix
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.limits = limits
+        self.prefix = prefix
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        """Open the connection and authenticate if needed."""
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", str(self.db)))
+        if setup:
+            await self._pipeline(setup)
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        """Encode one command as a RESP array of bulk strings."""
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        """Read one RESP reply."""
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def _pipeline(self, commands: list[tuple]) -> list:
+        """Send commands in one write and read all replies."""
+        self._writer.write(b"".join(self._encode(command) for command in commands))
+        await self._writer.drain()
+        replies = [await self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def execute(self, commands: list[tuple]) -> list:
+        """
+        Run a pipeline, (re)connecting if needed.
+
+        Args:
+            commands: Commands to send in one round trip
+
+        Returns:
+            Replies in command order
+        """
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    self._disconnect()
+                    await self._connect()
+                return await self._pipeline(commands)
+            except BaseException:
+                # A failed or cancelled round trip can leave replies unread,
+                # which the next pipeline would take for its own
+                self._disconnect()
+                raise
+
+    def _disconnect(self) -> None:
+        """Close and forget the current connection, if any."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def try_acquire(self, checks: list[LimitCheck]) -> str | None:
+        """Increment all window counters in one MULTI/EXEC round trip."""
+        now = time.time()
+        keys = []
+        commands = [("MULTI",)]
+        for layer, key in checks:
+            period = self.limits[layer].time_period
+            window = math.floor(now / period)
+            redis_key = f"{self.prefix}:{layer}:{key_to_str(key)}:{window}"
+            keys.append((layer, redis_key))
+            commands.append(("INCR", redis_key))
+            commands.append(("PEXPIRE", redis_key, int(period * 1000) + 1000))
+        commands.append(("EXEC",))
+
+        replies = await self.execute(commands)
+        counts = replies[-1][0::2]
+
+        for (layer, _), count in zip(keys, counts, strict=True):
+            if count > self.limits[layer].max_rate:
+                await self.execute([("DECR", redis_key) for _, redis_key in keys])
+                return layer
+        return None
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self._disconnect()
@@ -1,42 +1,310 @@
 """Rate limiting service for the bot."""
 
+import asyncio
 import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
 
-from aiolimiter import AsyncLimiter
-
+from bot.services.metrics import rate_limit_decision_duration, rate_limit_rejections
+from bot.services.rate_limit_backends import (
+    Limit,
+    LimitCheck,
+    RateLimitBackend,
+    RedisBackend,
+    SQLiteBackend,
+)
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Max expired entries removed per write, keeps sweeping amortized O(1)
+_SWEEP_BATCH = 16
+
+
+class Bucket:
+    """Leaky-bucket state of a single key."""
+
+    __slots__ = ("level", "updated")
+
+    def __init__(self, level: float, updated: float):
+        self.level = level
+        self.updated = updated
+
+
+class BucketStore:
+    """
+    Expiry-ordered store of compact leaky-bucket records.
+
+    Records are kept in last-update order, so idle ones (fully drained and
+    therefore equivalent to a missing record) are always at the front and
+    are swept incrementally on every write. Memory is bounded by the number
+    of keys active within one time period, capped at max_entries.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        time_period: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize bucket store.
+
+        Args:
+            max_rate: Requests allowed per time period
+            time_period: Period length in seconds
+            max_entries: Hard cap on stored records
+            clock: Monotonic time source
+        """
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self.max_entries = max_entries
+        self._clock = clock
+        self._buckets: OrderedDict[Hashable, Bucket] = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def _drained_level(self, bucket: Bucket, now: float) -> float:
+        """Return bucket level after leaking since its last update."""
+        elapsed = now - bucket.updated
+        return max(bucket.level - elapsed * self.max_rate / self.time_period, 0.0)
+
+    def level(self, key: Hashable) -> float:
+        """
+        Get the current level of a key without creating a record.
+
+        Args:
+            key: Bucket key
+
+        Returns:
+            Current bucket level (0 when absent)
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        return self._drained_level(bucket, self._clock())
+
+    def has_capacity(self, key: Hashable, amount: float = 1) -> bool:
+        """
+        Check whether amount fits into the bucket of key.
+
+        Args:
+            key: Bucket key
+            amount: Capacity required
+
+        Returns:
+            True if the bucket has room for amount
+        """
+        return self.level(key) + amount <= self.max_rate
+
+    def delay(self, key: Hashable, amount: float = 1) -> float:
+        """
+        Seconds until amount fits into the bucket of key.
+
+        Args:
+            key: Bucket key
+            amount: Capacity required
+
+        Returns:
+            Seconds to wait (0 if capacity is available now)
+        """
+        excess = self.level(key) + amount - self.max_rate
+        return max(excess * self.time_period / self.max_rate, 0.0)
+
+    def bucket(self, key: Hashable) -> Bucket:
+        """
+        Get or create the record of key, drained up to now.
+
+        Args:
+            key: Bucket key
+
+        Returns:
+            Bucket record (moved to the back of the expiry order)
+        """
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = Bucket(0.0, now)
+            self._buckets[key] = bucket
+            self._sweep(now)
+        else:
+            bucket.level = self._drained_level(bucket, now)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def consume(self, key: Hashable, amount: float = 1) -> None:
+        """
+        Add amount to the bucket of key.
+
+        Args:
+            key: Bucket key
+            amount: Capacity to consume
+        """
+        self.bucket(key).level += amount
+
+    def _sweep(self, now: float, limit: int = _SWEEP_BATCH) -> int:
+        """Remove up to limit expired records and enforce max_entries."""
+        removed = 0
+        deadline = now - self.time_period
+        while self._buckets and removed < limit:
+            oldest = next(iter(self._buckets.values()))
+            if oldest.updated > deadline:
+                break
+            self._buckets.popitem(last=False)
+            removed += 1
+        self.expired += removed
+
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+            self.evicted += 1
+        return removed
+
+    def expire(self) -> int:
+        """
+        Remove all expired records.
+
+        Returns:
+            Number of records removed
+        """
+        return self._sweep(self._clock(), limit=len(self._buckets))
+
+    def clear(self) -> None:
+        """Drop all records."""
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._buckets
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._buckets)
+
+    def __delitem__(self, key: Hashable) -> None:
+        del self._buckets[key]
+
+
+class MemoryBackend(RateLimitBackend):
+    """In-process backend, limits are per worker process."""
+
+    def __init__(self, stores: dict[str, BucketStore]):
+        """
+        Initialize memory backend.
+
+        Args:
+            stores: Bucket store of every layer
+        """
+        self.stores = stores
+
+    async def try_acquire(self, checks: list[LimitCheck]) -> str | None:
+        """Check and consume all layers without yielding to the event loop."""
+        for layer, key in checks:
+            if not self.stores[layer].has_capacity(key):
+                return layer
+
+        for layer, key in checks:
+            self.stores[layer].consume(key)
+        return None
+
 
 class RateLimiter:
-    """Rate limiter for user requests."""
+    """
+    Hierarchical rate limiter for user requests.
+
+    Every request is checked against up to four layers at once: per user,
+    per chat, per location cell and a global budget for OpenAI calls.
+    A layer whose request count is 0 is disabled.
+    """
 
     def __init__(self):
         """Initialize rate limiter."""
-        self.limiters: dict[int, AsyncLimiter] = {}
-        self.max_rate = settings.rate_limit_requests
-        self.time_period = settings.rate_limit_period
+        self.limiters = BucketStore(
+            max_rate=settings.rate_limit_requests,
+            time_period=settings.rate_limit_period,
+            max_entries=settings.rate_limit_max_entries,
+        )
+        self.chat_limiters = self._layer(
+            settings.rate_limit_chat_requests, settings.rate_limit_chat_period
+        )
+        self.cell_limiters = self._layer(
+            settings.rate_limit_cell_requests, settings.rate_limit_cell_period
+        )
+        self.global_limiter = self._layer(
+            settings.rate_limit_global_requests, settings.rate_limit_global_period
+        )
+        self.rejections = {"user": 0, "chat": 0, "cell": 0, "global": 0}
+        self.backend = self._create_backend(settings.rate_limit_backend)
+
+    @staticmethod
+    def _layer(max_rate: int, time_period: float) -> BucketStore | None:
+        """Create the store for an optional layer, None when disabled."""
+        if max_rate <= 0:
+            return None
+        return BucketStore(
+            max_rate=max_rate,
+            time_period=time_period,
+            max_entries=settings.rate_limit_max_entries,
+        )
 
-    def get_limiter(self, user_id: int) -> AsyncLimiter:
+    def _create_backend(self, name: str) -> RateLimitBackend:
+        """Create the configured storage backend for try_acquire."""
+        stores = {
+            "user": self.limiters,
+            "chat": self.chat_limiters,
+            "cell": self.cell_limiters,
+            "global": self.global_limiter,
+        }
+        stores = {layer: store for layer, store in stores.items() if store is not None}
+        if name == "memory":
+            return MemoryBackend(stores)
+
+        limits = {
+            layer: Limit(store.max_rate, store.time_period)
+            for layer, store in stores.items()
+        }
+        if name == "sqlite":
+            return SQLiteBackend(settings.rate_limit_sqlite_path, limits)
+        if name == "redis":
+            return RedisBackend(settings.rate_limit_redis_url, limits)
+        raise ValueError(f"Unknown rate limit backend: {name}")
+
+    @property
+    def max_rate(self) -> float:
+        """Requests allowed per user per time period."""
+        return self.limiters.max_rate
+
+    @max_rate.setter
+    def max_rate(self, value: float) -> None:
+        self.limiters.max_rate = value
+
+    @property
+    def time_period(self) -> float:
+        """Rate limit period in seconds."""
+        return self.limiters.time_period
+
+    @time_period.setter
+    def time_period(self, value: float) -> None:
+        self.limiters.time_period = value
+
+    def get_limiter(self, user_id: int) -> Bucket:
         """
-        Get or create limiter for a specific user.
+        Get or create bucket state for a specific user.
 
         Args:
             user_id: Telegram user ID
 
         Returns:
-            AsyncLimiter instance for the user
+            Bucket record for the user
         """
-        if user_id not in self.limiters:
-            self.limiters[user_id] = AsyncLimiter(
-                max_rate=self.max_rate, time_period=self.time_period
-            )
-        return self.limiters[user_id]
+        return self.limiters.bucket(user_id)
 
     async def check_rate_limit(self, user_id: int) -> bool:
         """
-        Check if user can make a request.
+        Check if user can make a request (in-process user layer only).
 
         Args:
             user_id: Telegram user ID
@@ -44,33 +312,142 @@ class RateLimiter:
         Returns:
             True if request is allowed, False otherwise
         """
-        limiter = self.get_limiter(user_id)
-        return limiter.has_capacity()
+        return self.limiters.has_capacity(user_id)
+
+    async def try_acquire(
+        self,
+        user_id: int,
+        chat_id: int | None = None,
+        cell: Hashable | None = None,
+    ) -> bool:
+        """
+        Atomically check and consume capacity on every applicable layer.
+
+        Never waits: either all layers have room and one slot is consumed
+        on each of them, or nothing is consumed and False is returned.
+
+        Args:
+            user_id: Telegram user ID
+            chat_id: Telegram chat ID (chat layer is skipped when None)
+            cell: Location cell (cell layer is skipped when None)
+
+        Returns:
+            True if the request is allowed, False otherwise
+        """
+        checks = self._request_checks(user_id, chat_id) + self._upstream_checks(cell)
+        return await self._acquire(checks) is None
+
+    async def acquire_request(
+        self, user_id: int, chat_id: int | None = None
+    ) -> str | None:
+        """
+        Check and consume the user and chat layers for an incoming request.
+
+        Args:
+            user_id: Telegram user ID
+            chat_id: Telegram chat ID (chat layer is skipped when None)
+
+        Returns:
+            Name of the layer that denied the request, None if allowed
+        """
+        return await self._acquire(self._request_checks(user_id, chat_id))
+
+    async def acquire_upstream(self, cell: Hashable | None = None) -> str | None:
+        """
+        Check and consume the cell and global layers before an OpenAI call.
+
+        These layers cap upstream spend, so requests answered from the cache
+        or the store should not be charged to them.
+
+        Args:
+            cell: Location cell (cell layer is skipped when None)
+
+        Returns:
+            Name of the layer that denied the call, None if allowed
+        """
+        return await self._acquire(self._upstream_checks(cell))
+
+    def _request_checks(self, user_id: int, chat_id: int | None) -> list[LimitCheck]:
+        """Checks of the per-sender layers."""
+        checks: list[LimitCheck] = [("user", user_id)]
+        if chat_id is not None and self.chat_limiters is not None:
+            checks.append(("chat", chat_id))
+        return checks
+
+    def _upstream_checks(self, cell: Hashable | None) -> list[LimitCheck]:
+        """Checks of the upstream budget layers."""
+        checks: list[LimitCheck] = []
+        if cell is not None and self.cell_limiters is not None:
+            checks.append(("cell", cell))
+        if self.global_limiter is not None:
+            checks.append(("global", None))
+        return checks
+
+    async def _acquire(self, checks: list[LimitCheck]) -> str | None:
+        """Consume all checks atomically, return the denying layer if any."""
+        if not checks:
+            return None
+        with rate_limit_decision_duration.time():
+            denied = await self.backend.try_acquire(checks)
+        if denied is not None:
+            self.rejections[denied] += 1
+            rate_limit_rejections.labels(denied).inc()
+            key = dict(checks)[denied]
+            target = f" for {denied} {key}" if key is not None else ""
+            logger.info(f"Rate limit ({denied}) exceeded{target}")
+        return denied
 
     async def acquire(self, user_id: int) -> None:
         """
-        Acquire a slot for the user request.
+        Acquire a slot for the user request, waiting for capacity if needed.
+
+        Uses the in-process user layer only; prefer try_acquire.
 
         Args:
             user_id: Telegram user ID
         """
-        limiter = self.get_limiter(user_id)
-        await limiter.acquire()
+        while (delay := self.limiters.delay(user_id)) > 0:
+            await asyncio.sleep(delay)
+        self.limiters.consume(user_id)
 
     def cleanup_old_limiters(self, active_users: set) -> None:
         """
         Remove limiters for inactive users to free memory.
 
+        Idle users are expired automatically; this forces removal of
+        everyone not in active_users.
+
         Args:
             active_users: Set of currently active user IDs
         """
-        inactive_users = set(self.limiters.keys()) - active_users
+        inactive_users = [u for u in self.limiters if u not in active_users]
         for user_id in inactive_users:
             del self.limiters[user_id]
 
         if inactive_users:
             logger.info(f"Cleaned up {len(inactive_users)} inactive user limiters")
 
+    def stats(self) -> dict:
+        """
+        Get limiter store counters.
+
+        Returns:
+            Dictionary with tracked users and expiry counters
+        """
+        return {
+            "backend": type(self.backend).__name__,
+            "tracked_users": len(self.limiters),
+            "tracked_chats": len(self.chat_limiters or ()),
+            "tracked_cells": len(self.cell_limiters or ()),
+            "expired": self.limiters.expired,
+            "evicted": self.limiters.evicted,
+            "rejections": dict(self.rejections),
+        }
+
+    async def close(self) -> None:
+        """Release backend resources."""
+        await self.backend.close()
+
 
 # Create singleton instance
 rate_limiter = RateLimiter()
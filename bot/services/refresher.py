@@ -0,0 +1,367 @@
+"""Stale-while-revalidate and background refresh of hot location cells."""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections.abc import Awaitable, Callable
+
+from bot.services.fact_cache import CacheKey, FactCache
+
+logger = logging.getLogger(__name__)
+
+Refresh = Callable[[float, float, str], Awaitable[str | None]]
+Acquire = Callable[[], Awaitable[str | None]]
+
+DAY = 24 * 60 * 60
+
+
+def parse_hours(window: str) -> tuple[int, int] | None:
+    """
+    Parse an hour window like "1-6" (UTC, end exclusive, may wrap midnight).
+
+    Args:
+        window: "start-end" or an empty string for no restriction
+
+    Returns:
+        (start, end) hours or None when unrestricted
+    """
+    if not window.strip():
+        return None
+    start, end = (int(hour) for hour in window.split("-"))
+    return start % 24, end % 24
+
+
+def in_window(hours: tuple[int, int] | None, hour: int) -> bool:
+    """Whether an hour falls inside a window from parse_hours."""
+    if hours is None:
+        return True
+    start, end = hours
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def until_next_window_end(hours: tuple[int, int] | None, timestamp: float) -> float:
+    """
+    Seconds until the end of the next window that starts after timestamp.
+
+    A run inside today's window covers everything expiring before
+    tomorrow's window is over, the next time the cell can be refreshed.
+
+    Args:
+        hours: Window from parse_hours, None for unrestricted
+        timestamp: Unix time
+
+    Returns:
+        Seconds until that window ends, 0 when unrestricted
+    """
+    if hours is None:
+        return 0.0
+    start, end = hours
+    now = timestamp % DAY
+    until_start = (start * 3600 - now) % DAY or DAY
+    length = ((end - start) % 24 or 24) * 3600
+    return until_start + length
+
+
+class _Heat:
+    """Exponentially decayed request count of a cell."""
+
+    __slots__ = ("score", "updated", "latitude", "longitude")
+
+    def __init__(self, now: float, latitude: float, longitude: float):
+        self.score = 0.0
+        self.updated = now
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class TokenBudget:
+    """Tokens that may be spent per period, reset at the start of each period."""
+
+    def __init__(self, tokens: int, period: float, clock=time.monotonic):
+        """
+        Initialize budget.
+
+        Args:
+            tokens: Tokens available per period
+            period: Period length in seconds
+            clock: Time source
+        """
+        self.tokens = tokens
+        self.period = period
+        self._clock = clock
+        self._window_start = clock()
+        self.spent = 0
+
+    @property
+    def remaining(self) -> int:
+        """Tokens left in the current period."""
+        now = self._clock()
+        if now - self._window_start >= self.period:
+            self._window_start = now
+            self.spent = 0
+        return self.tokens - self.spent
+
+    def try_spend(self, tokens: int) -> bool:
+        """
+        Spend tokens if the budget allows it.
+
+        Args:
+            tokens: Tokens to spend
+
+        Returns:
+            True if spent, False if it would exceed the budget
+        """
+        if tokens > self.remaining:
+            return False
+        self.spent += tokens
+        return True
+
+
+class FactRefresher:
+    """
+    Keep facts of busy cells fresh.
+
+    Tracks request density per cache key. A stale hit triggers one
+    background revalidation while the stale fact is served. A periodic run
+    during off-peak hours refreshes the hottest cells whose facts would
+    expire before the next off-peak window is over. Every refresh is charged
+    tokens_per_refresh against a daily token budget and, when acquire is
+    given, must pass the upstream rate limit; otherwise stale facts are
+    still served.
+    """
+
+    def __init__(
+        self,
+        cache: FactCache,
+        refresh: Refresh,
+        token_budget: int,
+        tokens_per_refresh: int,
+        interval: float,
+        refresh_ahead: float,
+        max_per_run: int,
+        offpeak_hours: str,
+        half_life: float,
+        max_tracked: int,
+        acquire: Acquire | None = None,
+        clock=time.monotonic,
+    ):
+        """
+        Initialize refresher.
+
+        Args:
+            cache: Fact cache to keep fresh
+            refresh: Fetches and stores a new fact for a location
+            token_budget: Tokens refreshes may spend per day
+            tokens_per_refresh: Tokens charged per refresh
+            interval: Seconds between refresh runs
+            refresh_ahead: Refresh entries expiring within this many seconds,
+                or before the next off-peak window ends if that is later
+            max_per_run: Max refreshes per run
+            offpeak_hours: UTC hour window for runs, see parse_hours
+            half_life: Seconds for a cell's request count to halve
+            max_tracked: Max cells tracked
+            acquire: Reserves upstream capacity for a refresh, returns the
+                denying rate limit layer or None
+            clock: Time source
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.acquire = acquire
+        self.budget = TokenBudget(token_budget, DAY, clock)
+        self.tokens_per_refresh = tokens_per_refresh
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.max_per_run = max_per_run
+        self.offpeak_hours = parse_hours(offpeak_hours)
+        self.decay = math.log(2) / half_life
+        self.max_tracked = max_tracked
+        self._clock = clock
+        self._heat: dict[CacheKey, _Heat] = {}
+        self._refreshing: set[CacheKey] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._runner: asyncio.Task | None = None
+
+        self.revalidations = 0
+        self.refreshes = 0
+        self.skipped_budget = 0
+        self.skipped_rate_limit = 0
+
+    def _score(self, heat: _Heat, now: float) -> float:
+        """Decayed request count at time now."""
+        return heat.score * math.exp(-self.decay * (now - heat.updated))
+
+    def record(self, latitude: float, longitude: float, language: str) -> None:
+        """
+        Count a request for the cell of a location.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+        """
+        key = self.cache.key(latitude, longitude, language)
+        now = self._clock()
+        heat = self._heat.get(key)
+        if heat is None:
+            if len(self._heat) >= self.max_tracked:
+                self._evict_coldest(now)
+            heat = self._heat[key] = _Heat(now, latitude, longitude)
+        heat.score = self._score(heat, now) + 1
+        heat.updated = now
+
+    def _evict_coldest(self, now: float) -> None:
+        """Forget the coldest tenth of tracked cells."""
+        count = max(self.max_tracked // 10, 1)
+        for key in heapq.nsmallest(
+            count, self._heat, key=lambda k: self._score(self._heat[k], now)
+        ):
+            del self._heat[key]
+
+    def hottest(self, count: int) -> list[tuple[CacheKey, float]]:
+        """
+        Get the cells with the most recent requests.
+
+        Args:
+            count: Max cells returned
+
+        Returns:
+            (key, score) pairs, hottest first
+        """
+        now = self._clock()
+        scored = ((key, self._score(heat, now)) for key, heat in self._heat.items())
+        return heapq.nlargest(count, scored, key=lambda item: item[1])
+
+    def revalidate(self, latitude: float, longitude: float, language: str) -> bool:
+        """
+        Refresh a stale fact in the background.
+
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            language: Response language
+
+        Returns:
+            True if a refresh was started
+        """
+        key = self.cache.key(latitude, longitude, language)
+        if not self._start(key, latitude, longitude, language):
+            return False
+        self.revalidations += 1
+        return True
+
+    def _start(
+        self, key: CacheKey, latitude: float, longitude: float, language: str
+    ) -> bool:
+        """Start a refresh task unless one is running or budget is exhausted."""
+        if key in self._refreshing:
+            return False
+        if not self.budget.try_spend(self.tokens_per_refresh):
+            self.skipped_budget += 1
+            return False
+
+        self._refreshing.add(key)
+        task = asyncio.create_task(
+            self._run_refresh(key, latitude, longitude, language)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run_refresh(
+        self, key: CacheKey, latitude: float, longitude: float, language: str
+    ) -> None:
+        """Fetch a new fact, failures keep the old one."""
+        try:
+            if self.acquire is not None and await self.acquire() is not None:
+                self.skipped_rate_limit += 1
+                return
+            await self.refresh(latitude, longitude, language)
+            self.refreshes += 1
+        except Exception as e:
+            logger.warning(f"Refreshing fact for {key} failed: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def run_once(self, timestamp: float | None = None) -> int:
+        """
+        Start refreshes for the hottest cells that expire soon.
+
+        Outside the off-peak window nothing is refreshed. Inside it, cells
+        are refreshed if they would otherwise expire before the next window
+        ends, so facts expiring at peak time are renewed ahead of it.
+
+        Args:
+            timestamp: Current Unix time, defaults to now
+
+        Returns:
+            Number of refreshes started
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if not in_window(self.offpeak_hours, time.gmtime(timestamp).tm_hour):
+            return 0
+
+        horizon = max(
+            self.refresh_ahead, until_next_window_end(self.offpeak_hours, timestamp)
+        )
+        started = 0
+        for key, _ in self.hottest(self.max_tracked):
+            if started >= self.max_per_run:
+                break
+            expires_in = self.cache.expires_in(key)
+            if expires_in is None or expires_in > horizon:
+                continue
+            heat = self._heat[key]
+            if not self._start(key, heat.latitude, heat.longitude, key[1]):
+                if self.budget.remaining < self.tokens_per_refresh:
+                    break
+                continue
+            started += 1
+        if started:
+            logger.info(f"Refreshing {started} hot cells")
+        return started
+
+    async def _loop(self) -> None:
+        """Run refreshes every interval."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Fact refresh run failed: {e}")
+
+    def start(self) -> None:
+        """Start the periodic refresh task."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Stop the periodic task and in-flight refreshes."""
+        tasks = list(self._tasks)
+        if self._runner is not None:
+            tasks.append(self._runner)
+            self._runner = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """
+        Get refresh counters.
+
+        Returns:
+            Dictionary with tracked cells, refresh counts and budget
+        """
+        return {
+            "tracked_cells": len(self._heat),
+            "refreshing": len(self._refreshing),
+            "revalidations": self.revalidations,
+            "refreshes": self.refreshes,
+            "skipped_budget": self.skipped_budget,
+            "skipped_rate_limit": self.skipped_rate_limit,
+            "budget_remaining": self.budget.remaining,
+        }
@@ -0,0 +1,391 @@
+"""Outbound Telegram send scheduler honoring global and per-chat limits."""
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from telegram.error import RetryAfter, TelegramError
+
+from bot.services.metrics import send_queue_delay, telegram_retry_after
+from bot.services.rate_limiter import BucketStore
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Send = Callable[[], Awaitable[Any]]
+
+GLOBAL = "global"
+# Hard cap on per-chat bucket records, idle ones are swept long before
+_MAX_TRACKED_CHATS = 100_000
+
+
+class _Job:
+    """A queued send and the future its caller awaits."""
+
+    __slots__ = ("call", "future", "queued_at", "attempts")
+
+    def __init__(self, call: Send, future: asyncio.Future, queued_at: float):
+        self.call = call
+        self.future = future
+        self.queued_at = queued_at
+        self.attempts = 0
+
+
+class SendScheduler:
+    """
+    Queue bot sends per chat and release them within Telegram's limits.
+
+    A global leaky bucket paces messages across all chats (any one-second
+    window sees at most global_burst + global_rate of them) and a per-chat
+    bucket spaces the messages of one chat. Chats with queued
+    messages are served round-robin, so one busy chat cannot starve the
+    others. A RetryAfter pauses only its chat, for retry_after plus random
+    jitter so paused chats do not all resume at once, and the message is
+    retried at the head of the chat's queue.
+
+    Chat actions are best effort: "typing" is only sent if no message for
+    the chat is queued within typing_delay, it is not repeated while still
+    visible, and it is dropped when the global budget is used up.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: int,
+        chat_interval: float,
+        max_retries: int,
+        retry_jitter: float,
+        typing_delay: float,
+        typing_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            global_rate: Messages per second across all chats
+            global_burst: Messages sent back to back before pacing starts
+            chat_interval: Seconds between messages to one chat
+            max_retries: RetryAfter retries before a send fails
+            retry_jitter: Max random seconds added to RetryAfter waits
+            typing_delay: Seconds to hold a chat action for a faster reply
+            typing_interval: Seconds a chat action stays visible
+            clock: Monotonic time source
+        """
+        self.max_retries = max_retries
+        self.retry_jitter = retry_jitter
+        self.typing_delay = typing_delay
+        self._clock = clock
+        self._global = BucketStore(global_burst, global_burst / global_rate, 1, clock)
+        self._chats = BucketStore(1, chat_interval, _MAX_TRACKED_CHATS, clock)
+        self._typing = BucketStore(1, typing_interval, _MAX_TRACKED_CHATS, clock)
+
+        # A chat is in _queues while it has jobs, and then in exactly one of
+        # _ready (due now, round-robin) or _waiting (heap of due times)
+        self._queues: dict[int, deque[_Job]] = {}
+        self._ready: deque[int] = deque()
+        self._waiting: list[tuple[float, int]] = []
+        self._paused: dict[int, float] = {}
+        self._typing_timers: dict[int, asyncio.TimerHandle] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.skipped = 0
+        self.typing_sent = 0
+        self.typing_dropped = 0
+
+    def _ensure_running(self) -> None:
+        """Start the dispatcher on first use."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(
+                self._dispatch(), name="send-scheduler"
+            )
+
+    async def send(self, chat_id: int, call: Send) -> Any:
+        """
+        Queue a send for a chat and wait for its result.
+
+        Args:
+            chat_id: Chat the message goes to
+            call: Coroutine function performing the Bot API call
+
+        Returns:
+            Result of call
+
+        Raises:
+            RetryAfter: If Telegram still refuses after max_retries
+            TelegramError: If the call fails otherwise
+        """
+        self._ensure_running()
+        self._cancel_typing(chat_id)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            self._ready.append(chat_id)
+        queue.append(_Job(call, future, self._clock()))
+        self._wakeup.set()
+        return await future
+
+    async def try_send(self, chat_id: int, call: Send) -> Any | None:
+        """
+        Send right away if within limits, else skip.
+
+        For updates that a later send supersedes, like intermediate edits
+        of a streamed message.
+
+        Args:
+            chat_id: Chat the message goes to
+            call: Coroutine function performing the Bot API call
+
+        Returns:
+            Result of call, None if skipped or refused with RetryAfter
+        """
+        now = self._clock()
+        if (
+            chat_id in self._queues
+            or self._paused.get(chat_id, 0) > now
+            or not self._global.has_capacity(GLOBAL)
+            or not self._chats.has_capacity(chat_id)
+        ):
+            self.skipped += 1
+            return None
+        self._paused.pop(chat_id, None)
+        self._consume(chat_id)
+        try:
+            result = await call()
+        except RetryAfter as e:
+            telegram_retry_after.inc()
+            self.retries += 1
+            self._paused[chat_id] = self._clock() + e.retry_after
+            return None
+        self.sent += 1
+        return result
+
+    def chat_action(self, chat_id: int, call: Send) -> None:
+        """
+        Show a chat action unless a message will reply first.
+
+        Returns immediately; the action is sent after typing_delay if still
+        useful then.
+
+        Args:
+            chat_id: Chat to show the action in
+            call: Coroutine function performing send_chat_action
+        """
+        if (
+            chat_id in self._typing_timers
+            or chat_id in self._queues
+            or not self._typing.has_capacity(chat_id)
+        ):
+            self.typing_dropped += 1
+            return
+        self._typing_timers[chat_id] = asyncio.get_running_loop().call_later(
+            self.typing_delay, self._fire_typing, chat_id, call
+        )
+
+    def _fire_typing(self, chat_id: int, call: Send) -> None:
+        """Send a held chat action if no message got there first."""
+        self._typing_timers.pop(chat_id, None)
+        if chat_id in self._queues or not self._global.has_capacity(GLOBAL):
+            self.typing_dropped += 1
+            return
+        self._global.consume(GLOBAL)
+        self._typing.consume(chat_id)
+        self.typing_sent += 1
+        task = asyncio.create_task(self._send_action(call))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _send_action(call: Send) -> None:
+        try:
+            await call()
+        except TelegramError as e:
+            logger.debug(f"Chat action failed: {e}")
+
+    def _cancel_typing(self, chat_id: int) -> None:
+        """Drop a held chat action, the message answers instead."""
+        timer = self._typing_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+            self.typing_dropped += 1
+
+    def _consume(self, chat_id: int) -> None:
+        """Charge a message to the global and chat buckets."""
+        self._global.consume(GLOBAL)
+        self._chats.consume(chat_id)
+        # A message hides the chat action, a new one may be shown after it
+        if chat_id in self._typing:
+            del self._typing[chat_id]
+
+    async def _dispatch(self) -> None:
+        """Release queued sends as the buckets allow."""
+        while True:
+            now = self._clock()
+            while self._waiting and self._waiting[0][0] <= now:
+                self._ready.append(heapq.heappop(self._waiting)[1])
+
+            if not self._ready:
+                self._expire_pauses(now)
+                timeout = self._waiting[0][0] - now if self._waiting else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except TimeoutError:
+                    pass
+                continue
+
+            global_delay = self._global.delay(GLOBAL)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+
+            chat_id = self._ready.popleft()
+            queue = self._queues[chat_id]
+            while queue and queue[0].future.done():  # caller gave up
+                queue.popleft()
+            if not queue:
+                del self._queues[chat_id]
+                continue
+
+            due = max(self._paused.get(chat_id, 0), now + self._chats.delay(chat_id))
+            if due > now:
+                heapq.heappush(self._waiting, (due, chat_id))
+                continue
+
+            self._paused.pop(chat_id, None)
+            job = queue.popleft()
+            if queue:
+                self._ready.append(chat_id)
+            else:
+                del self._queues[chat_id]
+            self._consume(chat_id)
+            send_queue_delay.observe(now - job.queued_at)
+            task = asyncio.create_task(self._execute(chat_id, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _expire_pauses(self, now: float) -> None:
+        """Forget RetryAfter pauses that have ended."""
+        for chat_id in [c for c, until in self._paused.items() if until <= now]:
+            del self._paused[chat_id]
+
+    async def _execute(self, chat_id: int, job: _Job) -> None:
+        """Run a send, retrying it later on RetryAfter."""
+        try:
+            result = await job.call()
+        except RetryAfter as e:
+            telegram_retry_after.inc()
+            self.retries += 1
+            if job.attempts >= self.max_retries:
+                self.failed += 1
+                self._settle(job, error=e)
+                return
+            job.attempts += 1
+            self._retry(
+                chat_id, job, e.retry_after + random.uniform(0, self.retry_jitter)
+            )
+        except Exception as e:
+            self.failed += 1
+            self._settle(job, error=e)
+        else:
+            self.sent += 1
+            self._settle(job, result=result)
+
+    def _retry(self, chat_id: int, job: _Job, delay: float) -> None:
+        """Pause a chat and put the job back at the head of its queue."""
+        logger.warning(
+            f"Telegram asked to slow down chat {chat_id}, retry in {delay:.1f}s"
+        )
+        until = self._clock() + delay
+        self._paused[chat_id] = until
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            self._queues[chat_id] = deque([job])
+            heapq.heappush(self._waiting, (until, chat_id))
+        else:
+            # Already scheduled, the pause defers it
+            queue.appendleft(job)
+        self._wakeup.set()
+
+    @staticmethod
+    def _settle(job: _Job, result: Any = None, error: BaseException | None = None):
+        """Resolve a job's future unless its caller gave up."""
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Flush queued sends, then stop the dispatcher.
+
+        Args:
+            timeout: Seconds to wait for queued sends
+        """
+        for timer in self._typing_timers.values():
+            timer.cancel()
+        self._typing_timers.clear()
+        if self._dispatcher is None:
+            return
+
+        deadline = self._clock() + timeout
+        while self._queues and self._clock() < deadline:
+            await asyncio.sleep(0.05)
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        self._dispatcher = None
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+        for queue in self._queues.values():
+            for job in queue:
+                job.future.cancel()
+        self._queues.clear()
+        self._ready.clear()
+        self._waiting.clear()
+
+    def stats(self) -> dict:
+        """
+        Get scheduler statistics.
+
+        Returns:
+            Dictionary with send counts, queue sizes and chat action counts
+        """
+        self._expire_pauses(self._clock())
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "skipped": self.skipped,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "queued_chats": len(self._queues),
+            "paused_chats": len(self._paused),
+            "typing_sent": self.typing_sent,
+            "typing_dropped": self.typing_dropped,
+        }
+
+
+# Create singleton instance
+send_scheduler = SendScheduler(
+    global_rate=settings.send_global_rate,
+    global_burst=settings.send_global_burst,
+    chat_interval=settings.send_chat_interval,
+    max_retries=settings.send_max_retries,
+    retry_jitter=settings.send_retry_jitter,
+    typing_delay=settings.send_typing_delay,
+    typing_interval=settings.send_typing_interval,
+)
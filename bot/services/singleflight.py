@@ -0,0 +1,120 @@
+"""Single-flight coalescing of concurrent identical async calls."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """In-flight call shared by all waiters of one key."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its result."""
+
+    def __init__(self):
+        """Initialize single-flight group."""
+        self._calls: dict[Hashable, _Call] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key, or join the call already in flight for the same key.
+
+        The result or exception of the shared call is delivered to every
+        waiter. Cancelling one waiter does not affect the others; the shared
+        call is only cancelled when its last waiter goes away.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument coroutine function performing the call
+
+        Returns:
+            Result of the shared call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            # A claimed call is ended by its owner, not by its waiters
+            if (
+                call.waiters == 0
+                and not call.task.done()
+                and isinstance(call.task, asyncio.Task)
+            ):
+                logger.debug(f"All waiters for {key} cancelled, cancelling call")
+                self._forget(key, call)
+                call.task.cancel()
+
+    def claim(self, key: Hashable) -> asyncio.Future | None:
+        """
+        Become the in-flight call for key, producing the result yourself.
+
+        For callers that cannot hand over a coroutine, e.g. because they
+        stream the result as it arrives. do() calls for key wait for the
+        returned future, which the caller must resolve.
+
+        Args:
+            key: Coalescing key
+
+        Returns:
+            Future to set the result on, None if a call is already in flight
+        """
+        if key in self._calls:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        call = _Call(future)
+        self._calls[key] = call
+        future.add_done_callback(lambda _: self._forget(key, call))
+        self.started += 1
+        return future
+
+    def is_running(self, key: Hashable) -> bool:
+        """
+        Check whether a call for key is in flight.
+
+        Args:
+            key: Coalescing key
+
+        Returns:
+            True if a shared call can be joined
+        """
+        return key in self._calls
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        """Remove call from the in-flight table if it is still registered."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary with in-flight, started and shared call counts
+        """
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "shared": self.shared,
+        }
@@ -0,0 +1,95 @@
+"""Startup phase timing and webhook registration helpers."""
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from telegram import Bot
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Record how long each startup phase takes, relative to process start."""
+
+    def __init__(self, started: float | None = None):
+        """
+        Initialize timer.
+
+        Args:
+            started: time.perf_counter() value the process started at
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.phases: dict[str, float] = {}
+        self.ready_after: float | None = None
+        self.first_update_after: float | None = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a startup phase."""
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - phase_started
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record a phase measured elsewhere."""
+        self.phases[name] = seconds
+
+    def mark_ready(self) -> None:
+        """Mark the app as ready to serve updates and log the phase report."""
+        self.ready_after = time.perf_counter() - self.started
+        phases = ", ".join(
+            f"{name}={sec * 1000:.0f}ms" for name, sec in self.phases.items()
+        )
+        logger.info(f"Ready to serve after {self.ready_after * 1000:.0f}ms ({phases})")
+
+    def mark_first_update(self) -> None:
+        """Mark the first served update, only the first call counts."""
+        if self.first_update_after is None:
+            self.first_update_after = time.perf_counter() - self.started
+            logger.info(
+                f"First update served {self.first_update_after * 1000:.0f}ms "
+                "after process start"
+            )
+
+    def stats(self) -> dict:
+        """
+        Get startup timings.
+
+        Returns:
+            Dictionary with phase durations and milestones in milliseconds
+        """
+
+        def ms(seconds: float | None) -> float | None:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "phases_ms": {name: ms(sec) for name, sec in self.phases.items()},
+            "ready_ms": ms(self.ready_after),
+            "first_update_ms": ms(self.first_update_after),
+        }
+
+
+async def ensure_webhook(bot: Bot, url: str) -> bool:
+    """
+    Register the webhook unless Telegram already has the same URL.
+
+    Args:
+        bot: Initialized Telegram bot
+        url: Full webhook URL
+
+    Returns:
+        True if set_webhook was called, False if it was already registered
+    """
+    info = await bot.get_webhook_info()
+    logger.info(f"Webhook info: {info}")
+    if info.url == url:
+        logger.info(f"Webhook already set to: {url}")
+        return False
+
+    await bot.set_webhook(url)
+    logger.info(f"Webhook set to: {url}")
+    return True
@@ -0,0 +1,155 @@
+"""Bounded background queue for processing Telegram updates."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from bot.services.overload import overload
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "shed")
+
+
+class UpdateQueue:
+    """Bounded asyncio queue drained by a fixed pool of worker tasks."""
+
+    def __init__(self):
+        """Initialize update queue."""
+        self.max_size = settings.update_queue_max_size
+        self.num_workers = settings.update_queue_workers
+        self.overflow_policy = settings.update_queue_overflow_policy
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {self.overflow_policy}")
+
+        self._queue: asyncio.Queue[tuple[float, Any]] = asyncio.Queue(self.max_size)
+        self._workers: list[asyncio.Task] = []
+        self._handler: Callable[[Any], Awaitable[None]] | None = None
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.shed = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Whether workers are currently running."""
+        return bool(self._workers)
+
+    def start(self, handler: Callable[[Any], Awaitable[None]]) -> None:
+        """
+        Start the worker pool.
+
+        Args:
+            handler: Coroutine function called for every dequeued item
+        """
+        self._handler = handler
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"update-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info(
+            f"Update queue started: {self.num_workers} workers, "
+            f"max size {self.max_size}, overflow policy {self.overflow_policy}"
+        )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Drain the queue and stop the workers.
+
+        Args:
+            timeout: Seconds to wait for queued items before cancelling
+        """
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except TimeoutError:
+            logger.warning(
+                f"Update queue not drained in {timeout}s, "
+                f"{self._queue.qsize()} items discarded"
+            )
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def put(self, item: Any) -> bool:
+        """
+        Enqueue an item according to the overflow policy.
+
+        Args:
+            item: Item to process
+
+        Returns:
+            True if the item was enqueued, False if it was shed
+        """
+        entry = (time.monotonic(), item)
+
+        if self.overflow_policy == "block":
+            await self._queue.put(entry)
+        elif self._queue.full():
+            if self.overflow_policy == "shed":
+                self.shed += 1
+                logger.warning("Update queue full, shedding new update")
+                return False
+            # drop_oldest
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+            logger.warning("Update queue full, dropped oldest update")
+            self._queue.put_nowait(entry)
+        else:
+            self._queue.put_nowait(entry)
+
+        self.enqueued += 1
+        return True
+
+    async def _worker(self) -> None:
+        """Process queued items until cancelled."""
+        while True:
+            enqueued_at, item = await self._queue.get()
+            wait_time = time.monotonic() - enqueued_at
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+            overload.record_queue_wait(wait_time)
+            try:
+                await self._handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error processing queued update: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        """
+        Get queue depth, throughput counters and wait times.
+
+        Returns:
+            Dictionary with queue statistics (wait times in seconds)
+        """
+        dequeued = self.processed + self.failed
+        return {
+            "depth": self._queue.qsize(),
+            "max_size": self.max_size,
+            "workers": len(self._workers),
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "shed": self.shed,
+            "wait_time_avg": self.wait_time_total / dequeued if dequeued else 0.0,
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+# Create singleton instance
+update_queue = UpdateQueue()
@@ -0,0 +1,449 @@
+"""
+Sharded multi-process mode: route updates to worker processes by chat.
+
+The web process only parses enough of each webhook payload to find the
+chat and hands the raw bytes to one of shard_workers processes picked by
+a consistent hash ring. Each worker runs its own event loop and Telegram
+application, so Update.de_json and handler dispatch scale across cores.
+All updates of a chat land on the same worker, which keeps chat state
+(chat rate limit buckets, send pacing, streaming edits, ordering) local
+without a shared store. In private chats the chat is the user, so their
+per-user buckets are local too; a user writing in several groups may hit
+several workers, each with its own user bucket unless a shared rate limit
+backend is used. Changing the worker count moves only about 1/N of the
+chats.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from multiprocessing.process import BaseProcess
+
+from telegram import Update
+from telegram.ext import Application
+
+from bot.services import ingest
+from bot.services.overload import overload
+from bot.services.poller import chat_key
+from config.logging_config import setup_logging, shutdown_logging
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Tells a worker to finish its updates and exit
+_STOP = None
+
+
+def _hash(value: str) -> int:
+    """Stable 64-bit hash, unlike hash() it is the same in every process."""
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes via virtual nodes."""
+
+    def __init__(self, nodes: Iterable[int], virtual_nodes: int = 100):
+        """
+        Initialize hash ring.
+
+        Args:
+            nodes: Node identifiers
+            virtual_nodes: Ring points per node, more spread keys more evenly
+        """
+        self.virtual_nodes = virtual_nodes
+        self._points: list[int] = []
+        self._nodes: list[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> set[int]:
+        """Nodes on the ring."""
+        return set(self._nodes)
+
+    def add(self, node: int) -> None:
+        """Add a node's points to the ring."""
+        for replica in range(self.virtual_nodes):
+            point = _hash(f"{node}:{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._nodes.insert(index, node)
+
+    def remove(self, node: int) -> None:
+        """Remove a node's points from the ring."""
+        kept = [
+            (p, n) for p, n in zip(self._points, self._nodes, strict=True) if n != node
+        ]
+        self._points = [point for point, _ in kept]
+        self._nodes = [node for _, node in kept]
+
+    def node_for(self, key: int | str) -> int:
+        """
+        Get the node owning a key.
+
+        Args:
+            key: Routing key
+
+        Returns:
+            Node identifier
+
+        Raises:
+            LookupError: If the ring has no nodes
+        """
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        index = bisect.bisect(self._points, _hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def routing_key(data: dict) -> int:
+    """
+    Get the key an update is routed by.
+
+    The raw-payload counterpart of poller.chat_key: the chat ID (also of
+    the message a callback query belongs to), else the sender's user ID,
+    else the update ID.
+
+    Args:
+        data: Raw update payload
+
+    Returns:
+        Routing key
+    """
+    for value in data.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+        sender = value.get("from") or value.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return sender["id"]
+    return data.get("update_id", 0)
+
+
+def split_shared_limits(num_workers: int) -> None:
+    """
+    Give each worker an equal share of limits that span all chats.
+
+    User and chat limits are not divided: a chat's updates all reach one
+    worker. Cell and global rate limits only need splitting with the in-process
+    backend; the SQLite and Redis backends already share their buckets.
+    Telegram's global send limit and the refresh token budget always do.
+
+    Args:
+        num_workers: Number of worker processes
+    """
+    if settings.rate_limit_backend == "memory":
+        if settings.rate_limit_cell_requests > 0:
+            settings.rate_limit_cell_requests = max(
+                settings.rate_limit_cell_requests // num_workers, 1
+            )
+        if settings.rate_limit_global_requests > 0:
+            settings.rate_limit_global_requests = max(
+                settings.rate_limit_global_requests // num_workers, 1
+            )
+    # Telegram's global send limit applies to the bot token, not the process
+    settings.send_global_rate /= num_workers
+    settings.fact_refresh_token_budget //= num_workers
+
+
+async def consume(updates: multiprocessing.Queue, application: Application) -> int:
+    """
+    Process raw updates from the router until the stop sentinel.
+
+    A reader thread does the blocking queue reads, so the event loop only
+    sees one call_soon_threadsafe per update. Every chat has a serial queue,
+    so its updates run in order, and at most update_queue_workers updates
+    run at a time. The reader stops taking updates while
+    update_queue_max_size are unfinished: the worker's queue then fills up
+    and the router drops at shard_queue_size instead of the worker buffering
+    without bound.
+
+    Args:
+        updates: Queue the router puts raw update bytes on
+        application: Initialized application processing the updates
+
+    Returns:
+        Number of processed updates
+    """
+    loop = asyncio.get_running_loop()
+    received: asyncio.Queue[bytes | None] = asyncio.Queue()
+    # Released by the event loop as updates finish
+    pending = threading.Semaphore(settings.update_queue_max_size)
+    workers = asyncio.Semaphore(settings.update_queue_workers)
+
+    def read() -> None:
+        while True:
+            pending.acquire()
+            body = updates.get()
+            loop.call_soon_threadsafe(received.put_nowait, body)
+            if body is _STOP:
+                return
+
+    threading.Thread(target=read, name="shard-reader", daemon=True).start()
+
+    chat_queues: dict[int, deque[tuple[float, Update]]] = {}
+    chat_tasks: dict[int, asyncio.Task] = {}
+
+    async def run_chat(key: int, chat_queue: deque[tuple[float, Update]]) -> None:
+        while chat_queue:
+            received_at, update = chat_queue.popleft()
+            try:
+                async with workers:
+                    overload.record_queue_wait(time.monotonic() - received_at)
+                    await application.process_update(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id}: {e}")
+            finally:
+                pending.release()
+        del chat_queues[key]
+        del chat_tasks[key]
+
+    processed = 0
+    while (body := await received.get()) is not _STOP:
+        try:
+            update = Update.de_json(ingest.loads(body), application.bot)
+        except Exception as e:
+            pending.release()
+            logger.error(f"Error parsing routed update: {e}")
+            continue
+        key = chat_key(update)
+        chat_queue = chat_queues.get(key)
+        if chat_queue is None:
+            chat_queue = chat_queues[key] = deque()
+        chat_queue.append((time.monotonic(), update))
+        if key not in chat_tasks:
+            chat_tasks[key] = asyncio.create_task(run_chat(key, chat_queue))
+        processed += 1
+
+    await asyncio.gather(*chat_tasks.values(), return_exceptions=True)
+    return processed
+
+
+async def run_worker(shard_id: int, updates: multiprocessing.Queue) -> None:
+    """
+    Run a shard worker's bot until the router stops it.
+
+    Args:
+        shard_id: Worker number
+        updates: Queue of raw updates routed to this worker
+    """
+    # Imported here so the shard's share of the limits applies when the
+    # service singletons are built
+    from bot.application import build_application
+    from bot.services.openai_client import openai_client
+    from bot.services.rate_limiter import rate_limiter
+    from bot.services.send_scheduler import send_scheduler
+
+    application = build_application()
+    await application.initialize()
+    await application.start()
+    if openai_client.refresher is not None:
+        openai_client.refresher.start()
+    await openai_client.warm_up()
+    logger.info(f"Shard worker {shard_id} ready")
+
+    try:
+        processed = await consume(updates, application)
+        logger.info(f"Shard worker {shard_id} stopping after {processed} updates")
+    finally:
+        await send_scheduler.stop()
+        await application.stop()
+        await application.shutdown()
+        await rate_limiter.close()
+        if openai_client.refresher is not None:
+            await openai_client.refresher.stop()
+        await openai_client.close()
+
+
+def worker_main(shard_id: int, num_workers: int, updates: multiprocessing.Queue):
+    """
+    Entry point of a shard worker process.
+
+    Args:
+        shard_id: Worker number
+        num_workers: Total number of workers
+        updates: Queue of raw updates routed to this worker
+    """
+    # Ctrl+C reaches the whole process group; the router stops us instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    split_shared_limits(num_workers)
+    setup_logging()
+    try:
+        asyncio.run(run_worker(shard_id, updates))
+    finally:
+        shutdown_logging()
+
+
+class ShardRouter:
+    """Start shard worker processes and route raw updates to them."""
+
+    def __init__(
+        self,
+        num_workers: int,
+        queue_size: int,
+        virtual_nodes: int = 100,
+        target: Callable = worker_main,
+        args: tuple = (),
+    ):
+        """
+        Initialize router.
+
+        Args:
+            num_workers: Number of worker processes
+            queue_size: Max updates buffered per worker
+            virtual_nodes: Hash ring points per worker
+            target: Worker entry point, called as
+                target(shard_id, num_workers, updates, *args)
+            args: Extra arguments for target
+        """
+        self.num_workers = num_workers
+        self.ring = HashRing(range(num_workers), virtual_nodes)
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue(queue_size) for _ in range(num_workers)]
+        self._processes: list[BaseProcess | None] = [None] * num_workers
+        self._target = target
+        self._args = args
+        self._supervisor: asyncio.Task | None = None
+
+        self.routed = [0] * num_workers
+        self.dropped = [0] * num_workers
+        self.restarts = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether worker processes are started."""
+        return any(process is not None for process in self._processes)
+
+    def _spawn(self, shard_id: int) -> None:
+        """Start the process of one shard."""
+        process = self._context.Process(
+            target=self._target,
+            args=(shard_id, self.num_workers, self._queues[shard_id], *self._args),
+            name=f"shard-{shard_id}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard_id] = process
+
+    def start(self, supervise_interval: float = 1.0) -> None:
+        """
+        Start the worker processes and restart them when they die.
+
+        Args:
+            supervise_interval: Seconds between liveness checks
+        """
+        for shard_id in range(self.num_workers):
+            self._spawn(shard_id)
+        self._supervisor = asyncio.create_task(self._supervise(supervise_interval))
+        logger.info(f"Started {self.num_workers} shard workers")
+
+    async def _supervise(self, interval: float) -> None:
+        """Restart workers that exited; their queued updates are kept."""
+        while True:
+            await asyncio.sleep(interval)
+            for shard_id, process in enumerate(self._processes):
+                if process is not None and not process.is_alive():
+                    logger.error(
+                        f"Shard worker {shard_id} exited with code "
+                        f"{process.exitcode}, restarting"
+                    )
+                    self.restarts += 1
+                    self._spawn(shard_id)
+
+    def route(self, key: int | str, body: bytes) -> bool:
+        """
+        Hand a raw update to the worker owning its key.
+
+        Never blocks: the queue's feeder thread does the pipe write.
+
+        Args:
+            key: Routing key, see routing_key
+            body: Raw update payload
+
+        Returns:
+            True if queued, False if the worker's queue was full
+        """
+        shard_id = self.ring.node_for(key)
+        try:
+            self._queues[shard_id].put_nowait(body)
+        except queue.Full:
+            self.dropped[shard_id] += 1
+            logger.warning(f"Shard {shard_id} queue full, dropping update")
+            return False
+        self.routed[shard_id] += 1
+        return True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Let workers finish queued updates, then stop them.
+
+        Args:
+            timeout: Seconds to wait before terminating workers
+        """
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+            self._supervisor = None
+        if self.running:
+            await asyncio.to_thread(self._join, timeout)
+
+    def _join(self, timeout: float) -> None:
+        """Send the stop sentinel and wait for the processes to exit."""
+        deadline = time.monotonic() + timeout
+        for updates in self._queues:
+            try:
+                updates.put(_STOP, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                pass
+        for shard_id, process in enumerate(self._processes):
+            if process is None:
+                continue
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Shard worker {shard_id} did not stop, terminating")
+                process.terminate()
+                process.join()
+            self._processes[shard_id] = None
+
+    def _depth(self, shard_id: int) -> int | None:
+        """Updates waiting for a worker, None where the OS cannot tell."""
+        try:
+            return self._queues[shard_id].qsize()
+        except NotImplementedError:  # macOS
+            return None
+
+    def stats(self) -> dict:
+        """
+        Get routing statistics.
+
+        Returns:
+            Dictionary with worker liveness, restarts and per-shard counters
+        """
+        return {
+            "workers": self.num_workers,
+            "alive": sum(
+                1
+                for process in self._processes
+                if process is not None and process.is_alive()
+            ),
+            "restarts": self.restarts,
+            "shards": [
+                {
+                    "routed": self.routed[shard_id],
+                    "dropped": self.dropped[shard_id],
+                    "depth": self._depth(shard_id),
+                }
+                for shard_id in range(self.num_workers)
+            ],
+        }
@@ -0,0 +1,151 @@
+"""Non-blocking, structured and sampled logging setup."""
+
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from config.settings import settings
+
+# Extra attributes copied into structured log lines when present
+STRUCTURED_FIELDS = ("category", "update_id", "user_id", "chat_id", "latency_ms")
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize the record with its structured extra fields."""
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of high-frequency records per category.
+
+    Records carry their category in extra={"category": ...}. Records
+    without a category, or at WARNING and above, are never sampled out.
+    Sampling is deterministic: with rate 0.1 every 10th record is kept.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        """
+        Initialize filter.
+
+        Args:
+            rates: Fraction of records to keep per category
+        """
+        super().__init__()
+        self.every = {
+            category: max(round(1 / rate), 1) if rate > 0 else 0
+            for category, rate in rates.items()
+        }
+        self._seen: dict[str, int] = {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Decide whether the record is kept."""
+        category = getattr(record, "category", None)
+        if category is None or record.levelno >= logging.WARNING:
+            return True
+        every = self.every.get(category)
+        if every is None:
+            return True
+
+        seen = self._seen.get(category, 0)
+        self._seen[category] = seen + 1
+        if every and seen % every == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put the record on the queue without waiting."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: DroppingQueueHandler | None = None
+_sampler: SamplingFilter | None = None
+_listener: QueueListener | None = None
+
+
+def setup_logging() -> None:
+    """
+    Route all logging through a bounded queue to a background writer thread.
+
+    The event loop only formats the record and puts it on the queue; the
+    stdout write happens in the listener thread. Records are dropped (and
+    counted) when the queue is full rather than stalling the loop.
+    """
+    global _handler, _sampler, _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _handler = DroppingQueueHandler(log_queue)
+    _sampler = SamplingFilter(settings.log_sample_rates)
+    _handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(getattr(logging, settings.log_level, logging.INFO))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    """
+    Get logging pipeline counters.
+
+    Returns:
+        Dictionary with queue depth, dropped and sampled-out records
+    """
+    if _handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queue_depth": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "sampled_out": _sampler.sampled_out,
+    }
@@ -17,21 +17,163 @@ class Settings(BaseSettings):
     # Telegram Bot
     telegram_bot_token: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     webhook_url: str | None = os.getenv("WEBHOOK_URL", None)
+    telegram_base_url: str = "https://api.telegram.org/bot"
+    telegram_connection_pool_size: int = 64
+    telegram_keepalive_expiry: float = 60.0  # seconds
+    telegram_http2: bool = False  # requires httpx[http2]
+    telegram_connect_timeout: float = 5.0  # seconds
+    telegram_read_timeout: float = 10.0  # seconds
+    telegram_write_timeout: float = 10.0  # seconds
+    telegram_pool_timeout: float = 5.0  # seconds to wait for a free connection
 
     # OpenAI
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = "gpt-4o-mini"
+    openai_base_url: str | None = None  # None uses the SDK default
     openai_max_tokens: int = 200
     openai_temperature: float = 1.0
-    openai_timeout: int = 30  # seconds
+    openai_timeout: int = 30  # seconds, read timeout
+    openai_connect_timeout: float = 5.0  # seconds
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 32
+    openai_keepalive_expiry: float = 60.0  # seconds
+    openai_http2: bool = False  # requires httpx[http2]
+    # Streaming: send the first sentence early, then edit the message
+    openai_streaming: bool = False
+    stream_edit_interval: float = 1.5  # seconds between message edits per chat
+    # Micro-batching: combine lookups arriving within a window into one call
+    openai_batching: bool = False
+    openai_batch_window: float = 0.02  # seconds
+    openai_batch_max_size: int = 8
+    # Adaptive concurrency limit for in-flight OpenAI calls
+    openai_concurrency_initial: int = 8
+    openai_concurrency_min: int = 1
+    openai_concurrency_max: int = 64
+    openai_target_latency: float = 8.0  # seconds, slower calls shrink the limit
+    openai_queue_max_size: int = 500
+    openai_queue_timeout: float = 10.0  # seconds to wait for a slot
+
+    # Hedged requests: repeat a slow fact request, use the first answer
+    openai_hedging: bool = False
+    openai_hedge_quantile: float = 0.95  # hedge calls slower than this quantile
+    openai_hedge_min_delay: float = 1.0  # seconds, never hedge sooner
+    openai_hedge_budget_percent: float = 5.0  # max extra requests, % of requests
+    openai_hedge_window: int = 200  # recent latencies the quantile is taken over
+    openai_hedge_min_samples: int = 20  # latencies needed before hedging
 
     # Rate limiting
     rate_limit_requests: int = 1
     rate_limit_period: int = 5  # seconds
+    rate_limit_max_entries: int = 1_000_000  # hard cap on tracked keys per layer
+    # Additional layers checked in the same decision, 0 requests disables a layer
+    rate_limit_chat_requests: int = 20
+    rate_limit_chat_period: int = 60  # seconds
+    rate_limit_cell_requests: int = 60
+    rate_limit_cell_period: int = 60  # seconds
+    rate_limit_global_requests: int = 500  # OpenAI budget for the whole bot
+    rate_limit_global_period: int = 60  # seconds
+    # "memory" (per process), "sqlite" (shared on one host) or "redis" (shared)
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: str = "rate_limits.sqlite3"
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+
+    # Fact cache
+    fact_cache_enabled: bool = True
+    fact_cache_max_size: int = 10_000
+    fact_cache_ttl: int = 24 * 60 * 60  # seconds
+    fact_cache_cell_size_m: float = 500.0  # meters
+    # Expired facts served while refreshing (needs fact_refresh_enabled)
+    fact_cache_stale_ttl: int = 7 * 24 * 60 * 60  # seconds
+
+    # Background refresh of hot cells
+    fact_refresh_enabled: bool = False
+    fact_refresh_interval: float = 60.0  # seconds between refresh runs
+    fact_refresh_ahead: float = 60 * 60  # refresh entries expiring within
+    fact_refresh_max_per_run: int = 50
+    fact_refresh_token_budget: int = 200_000  # tokens per day
+    fact_refresh_offpeak_hours: str = "1-6"  # UTC "start-end", empty for always
+    fact_refresh_heat_half_life: float = 60 * 60  # seconds
+    fact_refresh_max_tracked: int = 10_000  # cells tracked for heat
+
+    # Persistent fact store (SQLite), consulted between the cache and OpenAI
+    fact_store_enabled: bool = False
+    fact_store_path: str = "facts.sqlite3"
+    fact_store_radius_m: float = 500.0  # serve stored facts this close
+
+    # Connections opened per client at startup, 0 disables pre-warming
+    http_prewarm_connections: int = 4
+    http_prewarm_timeout: float = 5.0  # seconds
+
+    # Diagnostics
+    admin_token: str | None = None  # enables /debug endpoints when set
+    profiler_max_duration: float = 30.0  # seconds
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval: float = 0.1  # seconds between lag measurements
+    loop_stall_threshold: float = 0.5  # seconds blocked before logging a stall
+
+    # Cold start: register the webhook and pre-warm in the background
+    fast_startup: bool = False
+
+    # Webhook processing
+    webhook_async_processing: bool = False  # ack immediately, process in workers
+    update_queue_max_size: int = 1000
+    update_queue_workers: int = 8
+    update_queue_overflow_policy: str = "block"  # "block", "drop_oldest" or "shed"
+
+    # Outbound sends, Telegram allows ~30 messages/s overall and ~1/s per chat
+    send_global_rate: float = 25.0  # messages/s, burst + rate stays under 30
+    send_global_burst: int = 5  # messages sent back to back before pacing
+    send_chat_interval: float = 1.0  # seconds between messages to one chat
+    send_max_retries: int = 3  # RetryAfter retries per message
+    send_retry_jitter: float = 0.5  # max seconds added to RetryAfter waits
+    send_typing_delay: float = 0.3  # show "typing" only if no reply by then
+    send_typing_interval: float = 5.0  # seconds a chat action stays visible
+
+    # Live locations: look up a new fact only after the user really moved
+    live_location_enabled: bool = True
+    live_min_distance_m: float = 250.0  # meters from the last looked up point
+    live_jitter_m: float = 50.0  # meters moved before a new cell counts
+    live_min_interval: float = 30.0  # seconds between lookups of one session
+    live_max_accuracy_m: float = 100.0  # less accurate updates are ignored
+    live_session_ttl: float = 3600.0  # seconds without updates
+    live_max_sessions: int = 100_000
+
+    # Long polling, opt-in, used when webhook_url is unset and no webhook is set
+    polling_enabled: bool = False
+    polling_limit: int = 100  # updates per getUpdates call, Telegram max is 100
+    polling_timeout: int = 30  # seconds a getUpdates call waits for updates
+    polling_allowed_updates: list[str] = ["message", "edited_message"]
+
+    # Overload: answer from nearby cached facts instead of waiting on OpenAI
+    overload_enabled: bool = True
+    overload_max_in_flight: int = 200  # fact lookups waiting on OpenAI
+    overload_max_queue_wait: float = 5.0  # seconds, average wait for a worker/slot
+    overload_max_error_rate: float = 0.5  # share of failed OpenAI calls
+    overload_min_requests: int = 10  # calls in the window before errors count
+    overload_window: int = 30  # seconds of queue wait and error history
+    overload_recover_ratio: float = 0.5  # recover below this share of each limit
+    overload_min_duration: float = 10.0  # seconds degraded before recovering
+    overload_probe_interval: float = 1.0  # seconds between lookups let through
+    overload_fallback_radius_m: float = 2000.0  # search radius for cached facts
+
+    # Sharded mode: route updates to worker processes by chat
+    shard_workers: int = 0  # 0 processes updates in the web process
+    shard_queue_size: int = 10_000  # updates buffered per worker
+    shard_virtual_nodes: int = 100  # hash ring points per worker
 
     # Application
     environment: str = os.getenv("ENVIRONMENT", "development")
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = "json"  # "json" lines or "text"
+    log_queue_size: int = 10_000  # records beyond this are dropped
+    # Fraction of INFO records kept per high-frequency category
+    log_sample_rates: dict[str, float] = {
+        "processing_update": 0.01,
+        "received_location": 0.01,
+        "fact_sent": 0.1,
+    }
+    log_webhook_payloads: bool = False  # log full update payloads (sampled)
+    log_webhook_payload_sample_rate: float = 0.01
 
     # Server
     host: str = "0.0.0.0"
@@ -46,6 +188,9 @@ class Settings(BaseSettings):
 Find an interesting, unusual or little-known fact about any place within 500 meters of these coordinates.
 Reply with one or two sentences, no more than 512 characters. Don't use markdown or links."""
 
+    batch_prompt_suffix: str = """The user sends a JSON array of coordinates instead of a single point.
+Reply with a JSON object {"facts": [...]} holding exactly one fact per coordinate, in the same order."""
+
     class Config:
         """Pydantic configuration."""
 
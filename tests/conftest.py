@@ -24,3 +24,19 @@ def mock_context():
     context.bot = MagicMock()
     context.bot.send_chat_action = AsyncMock()
     return context
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Create a fake clock, advanced by adding to clock.now."""
+    return FakeClock()
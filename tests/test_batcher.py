@@ -0,0 +1,106 @@
+"""Tests for micro-batching of fact lookups."""
+
+import asyncio
+
+import pytest
+
+from bot.services.batcher import FactBatcher
+
+
+class FakeFetchers:
+    """Record batch and single fetches."""
+
+    def __init__(self, batch_result=None, batch_error=None):
+        self.batches = []
+        self.singles = []
+        self.batch_result = batch_result
+        self.batch_error = batch_error
+
+    async def fetch_batch(self, locations, language):
+        self.batches.append((list(locations), language))
+        if self.batch_error:
+            raise self.batch_error
+        if self.batch_result is not None:
+            return self.batch_result
+        return [f"{language}:{lat}" for lat, _ in locations]
+
+    async def fetch_one(self, latitude, longitude, language):
+        self.singles.append((latitude, longitude, language))
+        return f"single:{latitude}"
+
+
+def make_batcher(fetchers, window=0.01, max_batch=3):
+    """Create batcher wired to fake fetchers."""
+    return FactBatcher(fetchers.fetch_batch, fetchers.fetch_one, window, max_batch)
+
+
+@pytest.mark.asyncio
+async def test_lookups_within_window_are_batched():
+    """Test that concurrent lookups become one batch request."""
+    fetchers = FakeFetchers()
+    batcher = make_batcher(fetchers)
+
+    facts = await asyncio.gather(
+        batcher.submit(1.0, 1.0, "ru"), batcher.submit(2.0, 2.0, "ru")
+    )
+
+    assert facts == ["ru:1.0", "ru:2.0"]
+    assert len(fetchers.batches) == 1
+    assert batcher.stats()["avg_batch_size"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_flushed_at_max_size():
+    """Test that a full batch is sent without waiting for the window."""
+    fetchers = FakeFetchers()
+    batcher = make_batcher(fetchers, window=10, max_batch=2)
+
+    facts = await asyncio.wait_for(
+        asyncio.gather(batcher.submit(1.0, 1.0, "ru"), batcher.submit(2.0, 2.0, "ru")),
+        1,
+    )
+
+    assert facts == ["ru:1.0", "ru:2.0"]
+
+
+@pytest.mark.asyncio
+async def test_languages_are_batched_separately():
+    """Test that each language gets its own batch."""
+    fetchers = FakeFetchers()
+    batcher = make_batcher(fetchers)
+
+    await asyncio.gather(
+        batcher.submit(1.0, 1.0, "ru"),
+        batcher.submit(2.0, 2.0, "en"),
+        batcher.submit(3.0, 3.0, "ru"),
+    )
+
+    assert sorted(language for _, language in fetchers.batches) == ["ru"]
+    assert fetchers.singles == [(2.0, 2.0, "en")]
+
+
+@pytest.mark.asyncio
+async def test_single_lookup_skips_batch_request():
+    """Test that a lone lookup uses the plain single request."""
+    fetchers = FakeFetchers()
+    batcher = make_batcher(fetchers)
+
+    assert await batcher.submit(1.0, 1.0, "ru") == "single:1.0"
+    assert fetchers.batches == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "fetchers",
+    [FakeFetchers(batch_result=["only one"]), FakeFetchers(batch_error=ValueError())],
+)
+async def test_malformed_batch_falls_back(fetchers):
+    """Test fallback to single requests on bad batch results."""
+    batcher = make_batcher(fetchers)
+
+    facts = await asyncio.gather(
+        batcher.submit(1.0, 1.0, "ru"), batcher.submit(2.0, 2.0, "ru")
+    )
+
+    assert facts == ["single:1.0", "single:2.0"]
+    assert batcher.fallbacks == 1
@@ -0,0 +1,152 @@
+"""Tests for adaptive concurrency limiter."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from bot.services.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+    Permit,
+)
+
+
+def make_limiter(**overrides):
+    """Create limiter with small test defaults."""
+    options = {
+        "initial_limit": 2,
+        "min_limit": 1,
+        "max_limit": 4,
+        "target_latency": 1.0,
+        "max_queue": 2,
+    }
+    options.update(overrides)
+    return AdaptiveConcurrencyLimiter(**options)
+
+
+@pytest.mark.asyncio
+async def test_excess_calls_wait_for_a_slot():
+    """Test that calls beyond the limit queue until a slot frees up."""
+    limiter = make_limiter()
+    first = Permit()
+    await limiter.acquire()
+    assert not limiter.would_wait()
+    await limiter.acquire()
+    assert limiter.would_wait()
+
+    waiter = asyncio.create_task(limiter.acquire(timeout=1))
+    await asyncio.sleep(0)
+    assert limiter.stats()["queued"] == 1
+    assert not waiter.done()
+
+    limiter.release(first)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 2
+    assert limiter.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_call_rejected_after_deadline():
+    """Test that a queued call fails once its deadline passes."""
+    limiter = make_limiter(initial_limit=1)
+    await limiter.acquire()
+
+    with pytest.raises(ConcurrencyLimitExceeded):
+        await limiter.acquire(timeout=0.01)
+
+    assert limiter.rejections == 1
+    assert limiter.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_handed_over_as_deadline_passes_is_returned():
+    """Test that a timed-out waiter does not keep a slot it was just given."""
+    limiter = make_limiter(initial_limit=1)
+    await limiter.acquire()
+
+    async def release_then_time_out(waiter, timeout):
+        # The holder releases and the slot goes to the waiter, then the
+        # deadline fires before the waiter resumes
+        limiter.release(Permit())
+        assert waiter.done()
+        raise TimeoutError
+
+    with patch("bot.services.concurrency.asyncio.wait_for", release_then_time_out):
+        with pytest.raises(ConcurrencyLimitExceeded):
+            await limiter.acquire(timeout=0.01)
+
+    assert limiter.in_flight == 0
+    await asyncio.wait_for(limiter.acquire(timeout=0.01), 1)
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    """Test that calls beyond max_queue are rejected without waiting."""
+    limiter = make_limiter(initial_limit=1, max_queue=1)
+    await limiter.acquire()
+    queued = asyncio.create_task(limiter.acquire(timeout=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConcurrencyLimitExceeded):
+        await limiter.acquire(timeout=1)
+
+    queued.cancel()
+
+
+@pytest.mark.asyncio
+async def test_fast_successes_increase_limit():
+    """Test additive increase on calls within target latency."""
+    limiter = make_limiter()
+
+    for _ in range(4):
+        async with limiter.slot():
+            pass
+
+    assert limiter.limit > 2
+
+
+@pytest.mark.asyncio
+async def test_slow_calls_decrease_limit():
+    """Test backoff when calls exceed target latency."""
+    limiter = make_limiter(initial_limit=4)
+    now = [0.0]
+
+    with patch("bot.services.concurrency.time.monotonic", lambda: now[0]):
+        async with limiter.slot():
+            now[0] = 5.0
+
+    assert limiter.limit == pytest.approx(3.6)
+
+
+@pytest.mark.asyncio
+async def test_throttling_halves_limit_and_pauses():
+    """Test that 429s halve the limit and Retry-After blocks new calls."""
+    limiter = make_limiter(initial_limit=4)
+
+    with pytest.raises(RuntimeError):
+        async with limiter.slot() as permit:
+            permit.mark_throttled(retry_after=0.05)
+            raise RuntimeError("429")
+
+    assert limiter.limit == 2
+    waiter = asyncio.create_task(limiter.acquire(timeout=1))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_other_errors_do_not_change_limit():
+    """Test that non-throttling failures leave the limit alone."""
+    limiter = make_limiter()
+
+    with pytest.raises(ValueError):
+        async with limiter.slot():
+            raise ValueError("boom")
+
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
@@ -0,0 +1,119 @@
+"""Tests for geospatial fact cache."""
+
+from unittest.mock import patch
+
+import pytest
+
+from bot.services.fact_cache import FactCache
+
+
+@pytest.fixture
+def fact_cache():
+    """Create fact cache instance for testing."""
+    with patch("bot.services.fact_cache.settings") as mock_settings:
+        mock_settings.fact_cache_max_size = 3
+        mock_settings.fact_cache_ttl = 60
+        mock_settings.fact_cache_stale_ttl = 0
+        mock_settings.fact_cache_cell_size_m = 500.0
+
+        cache = FactCache()
+        return cache
+
+
+def test_cache_hit_for_point_in_same_cell(fact_cache):
+    """Test that points a few meters apart share a cache entry."""
+    fact_cache.set(55.7558, 37.6173, "ru", "Fact")
+
+    assert fact_cache.get(55.75585, 37.61735, "ru") == "Fact"
+    assert fact_cache.hits == 1
+    assert fact_cache.misses == 0
+
+
+def test_cache_miss_for_distant_point(fact_cache):
+    """Test that a point several kilometers away misses."""
+    fact_cache.set(55.7558, 37.6173, "ru", "Fact")
+
+    assert fact_cache.get(55.80, 37.70, "ru") is None
+    assert fact_cache.misses == 1
+
+
+def test_cache_is_keyed_by_language(fact_cache):
+    """Test that languages have separate entries."""
+    fact_cache.set(55.7558, 37.6173, "ru", "Факт")
+
+    assert fact_cache.get(55.7558, 37.6173, "en") is None
+    assert fact_cache.get(55.7558, 37.6173, "ru") == "Факт"
+
+
+def test_cache_expires_entries(fact_cache):
+    """Test that entries are dropped after TTL."""
+    with patch("bot.services.fact_cache.time.monotonic", return_value=1000.0):
+        fact_cache.set(55.7558, 37.6173, "ru", "Fact")
+
+    with patch("bot.services.fact_cache.time.monotonic", return_value=1061.0):
+        assert fact_cache.get(55.7558, 37.6173, "ru") is None
+
+    assert fact_cache.expirations == 1
+    assert len(fact_cache) == 0
+
+
+def test_cache_evicts_least_recently_used(fact_cache):
+    """Test that the least recently used cell is evicted when full."""
+    fact_cache.set(10.0, 10.0, "ru", "A")
+    fact_cache.set(20.0, 20.0, "ru", "B")
+    fact_cache.set(30.0, 30.0, "ru", "C")
+
+    # Touch A so B becomes the oldest entry
+    fact_cache.get(10.0, 10.0, "ru")
+    fact_cache.set(40.0, 40.0, "ru", "D")
+
+    assert len(fact_cache) == 3
+    assert fact_cache.evictions == 1
+    assert fact_cache.get(20.0, 20.0, "ru") is None
+    assert fact_cache.get(10.0, 10.0, "ru") == "A"
+
+
+def test_cache_stats(fact_cache):
+    """Test that stats report counters and hit ratio."""
+    fact_cache.set(55.7558, 37.6173, "ru", "Fact")
+    fact_cache.get(55.7558, 37.6173, "ru")
+    fact_cache.get(0.0, 0.0, "ru")
+
+    stats = fact_cache.stats()
+
+    assert stats["size"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_stale_entries_served_only_by_get_stale(fact_cache):
+    """Test the stale window after expiry."""
+    fact_cache.stale_ttl = 60
+    with patch("bot.services.fact_cache.time.monotonic", return_value=1000.0):
+        fact_cache.set(55.7558, 37.6173, "ru", "Fact")
+
+    with patch("bot.services.fact_cache.time.monotonic", return_value=1090.0):
+        assert fact_cache.get(55.7558, 37.6173, "ru") is None
+        assert fact_cache.get_stale(55.7558, 37.6173, "ru") == "Fact"
+        assert fact_cache.expires_in(fact_cache.key(55.7558, 37.6173, "ru")) == -30
+
+    with patch("bot.services.fact_cache.time.monotonic", return_value=1121.0):
+        assert fact_cache.get_stale(55.7558, 37.6173, "ru") is None
+        assert fact_cache.get(55.7558, 37.6173, "ru") is None
+
+    assert fact_cache.stale_hits == 1
+    assert fact_cache.expirations == 1
+    assert len(fact_cache) == 0
+
+
+def test_nearest_finds_closest_cell_within_radius(fact_cache):
+    """Test the wider-radius lookup used when upstream is overloaded."""
+    # About 1.1 km and 3.3 km north
+    fact_cache.set(55.7658, 37.6173, "ru", "Near")
+    fact_cache.set(55.7858, 37.6173, "ru", "Far")
+
+    assert fact_cache.nearest(55.7558, 37.6173, "ru", 2000) == "Near"
+    assert fact_cache.nearest(55.7558, 37.6173, "ru", 500) is None
+    assert fact_cache.nearest(55.7558, 37.6173, "en", 2000) is None
+    assert fact_cache.hits == fact_cache.misses == 0
@@ -0,0 +1,156 @@
+"""Tests for the persistent fact store."""
+
+import asyncio
+import io
+import sqlite3
+import time
+
+import pytest
+
+from bot.services.fact_store import FactStore
+
+RED_SQUARE = (55.7539, 37.6208)
+# ~300 m north and ~2 km north of Red Square
+NEAR = (55.7566, 37.6208)
+FAR = (55.7719, 37.6208)
+
+
+@pytest.fixture
+async def store(tmp_path):
+    """Create a fact store in a temporary database."""
+    store = FactStore(str(tmp_path / "facts.sqlite3"))
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_within_returns_nearest_first(store):
+    """Test radius filtering and distance ordering."""
+    await store.add(*FAR, "ru", "Far fact", "gpt-4o-mini")
+    await store.add(*NEAR, "ru", "Near fact", "gpt-4o-mini")
+    await store.add(*RED_SQUARE, "ru", "Exact fact", "gpt-4o-mini")
+
+    found = await store.within(*RED_SQUARE, radius_m=500)
+
+    assert [fact.fact for fact in found] == ["Exact fact", "Near fact"]
+    assert found[1].distance_m == pytest.approx(300, abs=10)
+
+
+@pytest.mark.asyncio
+async def test_nearest_filters_language(store):
+    """Test that nearest only returns facts in the requested language."""
+    await store.add(*RED_SQUARE, "en", "English fact", "gpt-4o-mini")
+
+    assert await store.nearest(*NEAR, "ru", radius_m=500) is None
+    assert (await store.nearest(*NEAR, "en", radius_m=500)).fact == "English fact"
+    assert await store.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_lookup_uses_rtree_index(store):
+    """Test that radius queries go through the R-tree, not a scan."""
+    conn = sqlite3.connect(store.path)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM facts_index"
+        " WHERE min_lat >= 0 AND max_lat <= 1 AND min_lon >= 0 AND max_lon <= 1"
+    ).fetchall()
+    conn.close()
+
+    assert "VIRTUAL TABLE INDEX" in plan[0][-1]
+
+
+@pytest.mark.asyncio
+async def test_export_import_roundtrip(store, tmp_path):
+    """Test bulk export to and import from JSON lines."""
+    await store.add(*RED_SQUARE, "ru", "Факт", "gpt-4o-mini", created_at=1.0)
+    await store.add(*FAR, "en", "Fact", "gpt-4o", created_at=2.0)
+    exported = io.StringIO()
+
+    assert await store.export_jsonl(exported) == 2
+
+    copy = FactStore(str(tmp_path / "copy.sqlite3"))
+    try:
+        assert (
+            await copy.import_jsonl(io.StringIO(exported.getvalue()), batch_size=1) == 2
+        )
+        restored = await copy.nearest(*RED_SQUARE, "ru", radius_m=10)
+        assert restored.fact == "Факт"
+        assert restored.model == "gpt-4o-mini"
+        assert restored.created_at == 1.0
+        assert await copy.count() == 2
+    finally:
+        await copy.close()
+
+
+@pytest.mark.asyncio
+async def test_facts_survive_reopen(tmp_path):
+    """Test that facts persist across store instances."""
+    path = str(tmp_path / "facts.sqlite3")
+    first = FactStore(path)
+    await first.add(*RED_SQUARE, "ru", "Persistent fact", "gpt-4o-mini")
+    await first.close()
+
+    second = FactStore(path)
+    try:
+        assert (
+            await second.nearest(*RED_SQUARE, "ru", radius_m=10)
+        ).fact == "Persistent fact"
+    finally:
+        await second.close()
+
+
+@pytest.mark.asyncio
+async def test_new_fact_replaces_the_one_for_the_same_place(store):
+    """Test that storing a fact for a known place does not grow the table."""
+    await store.add(*RED_SQUARE, "ru", "Old fact", "gpt-4o-mini", created_at=1.0)
+    await store.add(55.75392, 37.62081, "ru", "New fact", "gpt-4o", created_at=2.0)
+    await store.add(*RED_SQUARE, "ru", "Older fact", "gpt-4o-mini", created_at=0.5)
+    await store.add(*RED_SQUARE, "en", "English fact", "gpt-4o-mini")
+
+    assert await store.count() == 2
+    assert (await store.nearest(*RED_SQUARE, "ru", radius_m=500)).fact == "New fact"
+    assert len(await store.within(*RED_SQUARE, radius_m=500)) == 2
+
+
+@pytest.mark.asyncio
+async def test_reopen_drops_superseded_duplicates(tmp_path):
+    """Test that duplicates stored by older versions are cleaned up."""
+    path = str(tmp_path / "facts.sqlite3")
+    await FactStore(path).close()
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("DROP INDEX facts_place")
+    for row_id, fact, created_at in ((1, "New fact", 2.0), (2, "Old fact", 1.0)):
+        conn.execute(
+            "INSERT INTO facts VALUES (?, ?, ?, 'ru', 'gpt-4o-mini', ?, ?)",
+            (row_id, *RED_SQUARE, fact, created_at),
+        )
+        conn.execute(
+            "INSERT INTO facts_index VALUES (?, ?, ?, ?, ?)",
+            (row_id, RED_SQUARE[0], RED_SQUARE[0], RED_SQUARE[1], RED_SQUARE[1]),
+        )
+
+    store = FactStore(path)
+    assert await store.count() == 1
+    assert (await store.nearest(*RED_SQUARE, "ru", radius_m=500)).fact == "New fact"
+    assert conn.execute("SELECT COUNT(*) FROM facts_index").fetchone()[0] == 1
+    conn.close()
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_locked_database_does_not_block_the_event_loop(store):
+    """Test that waiting for another process's write lock happens off the loop."""
+    other = sqlite3.connect(store.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        write = asyncio.create_task(store.add(*RED_SQUARE, "ru", "Fact", "gpt-4o-mini"))
+        started = time.monotonic()
+        await asyncio.sleep(0.1)
+        assert time.monotonic() - started < 0.5
+        assert not write.done()
+    finally:
+        other.execute("COMMIT")
+        other.close()
+
+    await write
+    assert await store.count() == 1
@@ -0,0 +1,39 @@
+"""Tests for geospatial helpers."""
+
+import pytest
+
+from bot.services.geo import bounding_box, cell_center, cell_for, haversine_m
+
+
+def test_haversine_known_distance():
+    """Test distance between two points one degree of latitude apart."""
+    assert haversine_m(0.0, 0.0, 1.0, 0.0) == pytest.approx(111_195, rel=1e-3)
+
+
+@pytest.mark.parametrize("latitude", [0.0, 55.7558, -33.86, 78.2])
+def test_cell_size_is_roughly_square(latitude):
+    """Test that cells keep their size at any latitude."""
+    cell = cell_for(latitude, 20.0, 500.0)
+    center_lat, center_lon = cell_center(cell, 500.0)
+    east = cell_center((cell[0], cell[1] + 1), 500.0)
+    north_lat, _ = cell_center((cell[0] + 1, cell[1]), 500.0)
+
+    assert haversine_m(center_lat, center_lon, *east) == pytest.approx(500, rel=0.02)
+    assert haversine_m(center_lat, 0.0, north_lat, 0.0) == pytest.approx(500, rel=0.02)
+
+
+def test_cell_center_maps_back_to_cell():
+    """Test that a cell center falls inside the same cell."""
+    cell = cell_for(55.7558, 37.6173, 500.0)
+
+    assert cell_for(*cell_center(cell, 500.0), 500.0) == cell
+
+
+def test_bounding_box_contains_radius():
+    """Test that the box edges are radius_m away from the center."""
+    south, west, north, east = bounding_box(55.75, 37.62, 500)
+
+    assert haversine_m(55.75, 37.62, north, 37.62) == pytest.approx(500, rel=0.01)
+    assert haversine_m(55.75, 37.62, south, 37.62) == pytest.approx(500, rel=0.01)
+    assert haversine_m(55.75, 37.62, 55.75, east) == pytest.approx(500, rel=0.01)
+    assert haversine_m(55.75, 37.62, 55.75, west) == pytest.approx(500, rel=0.01)
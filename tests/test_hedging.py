@@ -0,0 +1,149 @@
+"""Tests for hedged requests."""
+
+import asyncio
+
+import pytest
+
+from bot.services.hedging import Hedger
+
+
+def make_hedger(**overrides):
+    """Create hedger instance with a 20 ms delay once warmed up."""
+    options = {
+        "quantile": 0.9,
+        "min_delay": 0.02,
+        "budget_percent": 100,
+        "window": 10,
+        "min_samples": 3,
+    }
+    options.update(overrides)
+    hedger = Hedger(**options)
+    for _ in range(3):
+        hedger.record(0.001)
+    return hedger
+
+
+def attempts(*plans):
+    """Build a call whose n-th attempt sleeps, then returns or raises."""
+    started = []
+
+    async def call():
+        delay, outcome = plans[len(started)]
+        started.append(delay)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, started
+
+
+def test_threshold_follows_latency_quantile():
+    """Test the adaptive delay, its floor and the warm-up."""
+    hedger = Hedger(
+        quantile=0.9, min_delay=0.5, budget_percent=5, window=10, min_samples=5
+    )
+    for latency in (1, 2, 3, 4):
+        hedger.record(latency)
+    assert hedger.threshold() is None
+
+    for latency in (5, 6, 7, 8, 9, 10):
+        hedger.record(latency)
+    assert hedger.threshold() == 9
+
+    # Only the last window latencies count
+    for _ in range(10):
+        hedger.record(0.1)
+    assert hedger.threshold() == 0.5
+
+
+@pytest.mark.asyncio
+async def test_fast_request_is_not_hedged():
+    """Test that requests under the delay run once."""
+    hedger = make_hedger()
+    call, started = attempts((0, "primary"))
+
+    assert await hedger.run(call) == "primary"
+    assert len(started) == 1
+    assert hedger.stats()["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_and_loser_is_cancelled():
+    """Test that the first answer is used and the slow one cancelled."""
+    hedger = make_hedger()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    calls = iter([slow, lambda: asyncio.sleep(0, "hedge")])
+
+    result = await asyncio.wait_for(hedger.run(lambda: next(calls)()), 1)
+
+    assert result == "hedge"
+    assert cancelled.is_set()
+    stats = hedger.stats()
+    assert stats["hedged"] == 1
+    assert stats["wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_attempt_falls_back_to_the_other():
+    """Test that one failure does not fail the request."""
+    hedger = make_hedger()
+    call, _ = attempts((0.05, RuntimeError("primary failed")), (0.05, "hedge"))
+    assert await hedger.run(call) == "hedge"
+
+    call, _ = attempts((0.05, RuntimeError("primary")), (0, ValueError("hedge")))
+    with pytest.raises(RuntimeError, match="primary"):
+        await hedger.run(call)
+
+
+@pytest.mark.asyncio
+async def test_budget_caps_hedges():
+    """Test that hedges stay within the configured share of requests."""
+    hedger = make_hedger(budget_percent=50, quantile=0.5, window=100)
+    # Keeps the delay at its floor despite the slow requests below
+    for _ in range(20):
+        hedger.record(0.001)
+
+    for _ in range(4):
+        call, _ = attempts((0.1, "primary"), (0.1, "hedge"))
+        await hedger.run(call)
+
+    stats = hedger.stats()
+    assert stats["requests"] == 4
+    assert stats["hedged"] == 2
+    assert stats["over_budget"] == 2
+
+
+@pytest.mark.asyncio
+async def test_latency_is_measured_from_the_original_start():
+    """Test that a won hedge records the primary's elapsed time."""
+    hedger = make_hedger()
+    call, _ = attempts((10, "primary"), (0.05, "hedge"))
+
+    assert await asyncio.wait_for(hedger.run(call), 1) == "hedge"
+
+    # Delay before the hedge plus the hedge's own time, not just 0.05 s
+    assert hedger._latencies[-1] >= 0.07
+
+
+@pytest.mark.asyncio
+async def test_busy_upstream_is_not_hedged_or_recorded():
+    """Test that queued calls neither hedge nor skew the latency window."""
+    hedger = make_hedger(busy=lambda: True)
+    call, started = attempts((0.05, "primary"))
+
+    assert await hedger.run(call) == "primary"
+
+    assert len(started) == 1
+    assert len(hedger._latencies) == 3
+    stats = hedger.stats()
+    assert stats["hedged"] == 0
+    assert stats["skipped_busy"] == 1
@@ -0,0 +1,82 @@
+"""Tests for tuned HTTP connection pools."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from bot.services.http_clients import (
+    build_openai_http_client,
+    build_telegram_request,
+    prewarm,
+)
+
+
+@pytest.fixture
+def mock_settings():
+    """Patch settings with pool configuration."""
+    with patch("bot.services.http_clients.settings") as mock_settings:
+        mock_settings.openai_max_connections = 50
+        mock_settings.openai_max_keepalive_connections = 10
+        mock_settings.openai_keepalive_expiry = 90.0
+        mock_settings.openai_timeout = 30
+        mock_settings.openai_connect_timeout = 3.0
+        mock_settings.openai_http2 = False
+        mock_settings.telegram_connection_pool_size = 16
+        mock_settings.telegram_keepalive_expiry = 45.0
+        mock_settings.telegram_http2 = False
+        mock_settings.telegram_connect_timeout = 2.0
+        mock_settings.telegram_read_timeout = 7.0
+        mock_settings.telegram_write_timeout = 7.0
+        mock_settings.telegram_pool_timeout = 1.0
+        yield mock_settings
+
+
+def test_openai_client_uses_configured_pool(mock_settings):
+    """Test that limits and timeouts come from settings."""
+    client = build_openai_http_client()
+    pool = client._transport._pool
+
+    assert pool._max_connections == 50
+    assert pool._max_keepalive_connections == 10
+    assert pool._keepalive_expiry == 90.0
+    assert client.timeout.connect == 3.0
+    assert client.timeout.read == 30
+
+
+def test_telegram_request_uses_configured_pool(mock_settings):
+    """Test that the Telegram request honours pool size and keep-alive."""
+    request = build_telegram_request()
+    pool = request._client._transport._pool
+
+    assert pool._max_connections == 16
+    assert pool._keepalive_expiry == 45.0
+    assert request.read_timeout == 7.0
+
+
+def test_http2_falls_back_without_h2(mock_settings):
+    """Test that HTTP/2 is disabled when h2 is not installed."""
+    mock_settings.openai_http2 = True
+
+    with patch("bot.services.http_clients.http2_available", return_value=False):
+        client = build_openai_http_client()
+
+    assert client._transport._pool._http2 is False
+
+
+@pytest.mark.asyncio
+async def test_prewarm_counts_successes_and_ignores_errors():
+    """Test that pre-warming is best effort."""
+    call = AsyncMock(side_effect=[None, Exception("boom"), None])
+
+    assert await prewarm("test", call, connections=3, timeout=1) == 2
+
+
+@pytest.mark.asyncio
+async def test_prewarm_times_out():
+    """Test that slow pre-warming does not block startup forever."""
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    assert await prewarm("test", slow, connections=2, timeout=0.01) == 0
@@ -0,0 +1,51 @@
+"""Tests for the webhook ingest fast path."""
+
+from unittest.mock import patch
+
+import pytest
+
+from bot.services import ingest
+
+
+def test_loads_parses_raw_bytes():
+    """Test that payloads are parsed straight from bytes."""
+    assert ingest.loads(b'{"update_id": 1}') == {"update_id": 1}
+
+
+@pytest.mark.parametrize(
+    ("data", "handled"),
+    [
+        ({"update_id": 1, "message": {"location": {"latitude": 1}}}, True),
+        ({"update_id": 1, "message": {"text": "/start"}}, True),
+        ({"update_id": 1, "message": {"text": "hello"}}, False),
+        ({"update_id": 1, "message": {"sticker": {}}}, False),
+        ({"update_id": 1, "edited_message": {"location": {"latitude": 1}}}, True),
+        ({"update_id": 1, "edited_message": {"text": "/start"}}, False),
+        ({"update_id": 1, "channel_post": {"text": "/start"}}, False),
+        ({"update_id": 1, "my_chat_member": {}}, False),
+    ],
+)
+def test_is_handled_update(data, handled):
+    """Test raw-payload classification of updates."""
+    assert ingest.is_handled_update(data) is handled
+
+
+def test_payload_logging_is_opt_in():
+    """Test that payloads are not logged by default."""
+    with patch("bot.services.ingest.settings") as mock_settings:
+        mock_settings.log_webhook_payloads = False
+        mock_settings.log_webhook_payload_sample_rate = 1.0
+
+        assert not ingest.should_log_payload()
+
+
+def test_payload_logging_is_sampled():
+    """Test that enabled payload logging follows the sample rate."""
+    with patch("bot.services.ingest.settings") as mock_settings:
+        mock_settings.log_webhook_payloads = True
+        mock_settings.log_webhook_payload_sample_rate = 0.25
+
+        with patch("bot.services.ingest.random.random", return_value=0.2):
+            assert ingest.should_log_payload()
+        with patch("bot.services.ingest.random.random", return_value=0.3):
+            assert not ingest.should_log_payload()
@@ -0,0 +1,234 @@
+"""Tests for live location tracking."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telegram import Bot, Update
+from telegram.ext import Application
+
+from bot.application import add_handlers
+from bot.handlers.live_location import handle_live_location
+from bot.handlers.location import handle_location
+from bot.services.geo import cell_center, cell_for
+from bot.services.live_location import LiveLocationTracker
+from bot.services.overload import OverloadController
+from bot.services.send_scheduler import SendScheduler
+
+KEY = (1, 10)
+LAT, LON = 55.7558, 37.6173
+# Roughly 111 m of latitude
+STEP = 0.001
+
+
+def make_tracker(clock, **overrides):
+    """Create tracker instance."""
+    options = {
+        "min_distance_m": 250.0,
+        "jitter_m": 50.0,
+        "min_interval": 30.0,
+        "max_accuracy_m": 100.0,
+        "session_ttl": 600.0,
+        "max_sessions": 100,
+        "cell_size_m": 500.0,
+    }
+    options.update(overrides)
+    return LiveLocationTracker(**options, clock=clock)
+
+
+def test_lookup_after_moving_min_distance(clock):
+    """Test that only a real move, not time alone, triggers a lookup."""
+    tracker = make_tracker(clock, cell_size_m=100_000.0)
+    tracker.start(KEY, LAT, LON)
+
+    clock.now += 60
+    assert not tracker.should_look_up(KEY, LAT + STEP, LON)
+    assert tracker.should_look_up(KEY, LAT + 3 * STEP, LON)
+
+    tracker.looked_up(KEY, LAT + 3 * STEP, LON)
+    clock.now += 60
+    # Measured from the last lookup, not the last update
+    assert not tracker.should_look_up(KEY, LAT + 4 * STEP, LON)
+    assert tracker.stats()["lookups"] == 2
+
+
+def test_debounces_jitter(clock):
+    """Test the min interval, accuracy limit and accuracy radius."""
+    tracker = make_tracker(clock)
+    tracker.start(KEY, LAT, LON)
+    far = LAT + 5 * STEP
+
+    clock.now += 10
+    assert not tracker.should_look_up(KEY, far, LON)
+
+    clock.now += 30
+    assert not tracker.should_look_up(KEY, far, LON, accuracy_m=1000)
+    assert tracker.should_look_up(KEY, far, LON, accuracy_m=20)
+    # Within what the device says it is unsure about
+    assert not tracker.should_look_up(KEY, LAT + STEP, LON, accuracy_m=90)
+    assert tracker.stats()["inaccurate"] == 1
+
+
+def test_new_cell_triggers_lookup_beyond_jitter(clock):
+    """Test that crossing into a new cell counts once past jitter_m."""
+    tracker = make_tracker(clock)
+    cell = cell_for(LAT, LON, 500.0)
+    center_lat, center_lon = cell_center(cell, 500.0)
+    # Just inside the cell's northern edge, the next cell 60 m away
+    edge = center_lat + 250 / 111_320
+    tracker.start(KEY, edge - 30 / 111_320, center_lon)
+    clock.now += 60
+
+    assert not tracker.should_look_up(KEY, edge + 5 / 111_320, center_lon)
+    assert tracker.should_look_up(KEY, edge + 40 / 111_320, center_lon)
+
+
+def test_unknown_session_starts_without_lookup_and_sessions_are_bounded(clock):
+    """Test sessions found mid-stream, expiry and eviction."""
+    tracker = make_tracker(clock, max_sessions=3)
+
+    assert not tracker.should_look_up(KEY, LAT, LON)
+    assert KEY in tracker
+
+    tracker.stop(KEY)
+    assert KEY not in tracker
+
+    for message_id in range(5):
+        tracker.start((1, message_id), LAT, LON)
+    assert len(tracker) == 3
+    assert tracker.stats()["evicted"] == 2
+
+    clock.now += 601
+    tracker.start((2, 1), LAT, LON)
+    assert len(tracker) == 1
+    assert tracker.stats()["expired"] == 3
+
+
+def test_repeated_fact_is_not_new(clock):
+    """Test that a session is not sent the same fact twice in a row."""
+    tracker = make_tracker(clock)
+    tracker.start(KEY, LAT, LON)
+
+    assert tracker.is_new_fact(KEY, "Fact")
+    assert not tracker.is_new_fact(KEY, "Fact")
+    assert tracker.is_new_fact(KEY, "Other fact")
+
+
+@pytest.fixture
+async def live_env(clock):
+    """Patch the live location handler's services."""
+    tracker = make_tracker(clock)
+    scheduler = SendScheduler(
+        global_rate=30.0,
+        global_burst=5,
+        chat_interval=0.01,
+        max_retries=1,
+        retry_jitter=0.0,
+        typing_delay=0.05,
+        typing_interval=5.0,
+    )
+    module = "bot.handlers.live_location"
+    with (
+        patch(f"{module}.live_tracker", tracker),
+        patch(f"{module}.send_scheduler", scheduler),
+        patch(
+            f"{module}.overload",
+            OverloadController(100, 5.0, 0.5, 10, 30, 0.5, 10.0, 1.0),
+        ),
+        patch(f"{module}.rate_limiter") as limiter,
+        patch(f"{module}.openai_client") as client,
+    ):
+        limiter.acquire_request = AsyncMock(return_value=None)
+        limiter.acquire_upstream = AsyncMock(return_value=None)
+        client.has_fact = AsyncMock(return_value=False)
+        client.get_location_fact = AsyncMock(return_value="Fact")
+        yield clock, tracker, limiter, client
+    await scheduler.stop()
+
+
+def live_update(latitude, live_period=600, accuracy=None):
+    """Create a mock update editing a live location."""
+    update = MagicMock()
+    update.edited_message.chat_id = KEY[0]
+    update.edited_message.message_id = KEY[1]
+    update.edited_message.location = MagicMock(
+        latitude=latitude,
+        longitude=LON,
+        live_period=live_period,
+        horizontal_accuracy=accuracy,
+    )
+    update.edited_message.reply_text = AsyncMock()
+    return update
+
+
+@pytest.mark.asyncio
+async def test_live_updates_look_up_only_after_moving(live_env, mock_context):
+    """Test that position pings cost a lookup only after real movement."""
+    clock, tracker, limiter, client = live_env
+    tracker.start(KEY, LAT, LON)
+
+    clock.now += 60
+    near = live_update(LAT + STEP)
+    await handle_live_location(near, mock_context)
+    client.get_location_fact.assert_not_awaited()
+    near.edited_message.reply_text.assert_not_awaited()
+
+    far = live_update(LAT + 3 * STEP)
+    await handle_live_location(far, mock_context)
+    client.get_location_fact.assert_awaited_once()
+    far.edited_message.reply_text.assert_awaited_once_with("📍 Fact")
+
+    # Same fact further on, nothing new to say
+    clock.now += 60
+    further = live_update(LAT + 6 * STEP)
+    await handle_live_location(further, mock_context)
+    assert client.get_location_fact.await_count == 2
+    further.edited_message.reply_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_update_is_retried_later(live_env, mock_context):
+    """Test that a rejected lookup keeps the old reference point."""
+    clock, tracker, limiter, client = live_env
+    tracker.start(KEY, LAT, LON)
+    clock.now += 60
+
+    limiter.acquire_upstream.return_value = "global"
+    await handle_live_location(live_update(LAT + 3 * STEP), mock_context)
+    client.get_location_fact.assert_not_awaited()
+
+    limiter.acquire_upstream.return_value = None
+    await handle_live_location(live_update(LAT + 3 * STEP), mock_context)
+    client.get_location_fact.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stopped_sharing_ends_session(live_env, mock_context):
+    """Test that the final edit without live_period drops the session."""
+    _, tracker, _, _ = live_env
+    tracker.start(KEY, LAT, LON)
+
+    await handle_live_location(live_update(LAT, live_period=None), mock_context)
+
+    assert KEY not in tracker
+
+
+def test_edited_locations_routed_to_live_handler():
+    """Test that new and edited location messages reach different handlers."""
+    application = Application.builder().token("123456:test-token").build()
+    add_handlers(application)
+    handlers = application.handlers[0]
+    bot = Bot("123456:test-token")
+    message = {
+        "message_id": 10,
+        "date": 1_700_000_000,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "User"},
+        "location": {"latitude": LAT, "longitude": LON, "live_period": 600},
+    }
+
+    def handler_for(update_type):
+        update = Update.de_json({"update_id": 1, update_type: message}, bot)
+        return next(h.callback for h in handlers if h.check_update(update))
+
+    assert handler_for("message") is handle_location
+    assert handler_for("edited_message") is handle_live_location
@@ -0,0 +1,278 @@
+"""Tests for location handler."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from bot.handlers.location import BUSY_MESSAGE, RATE_LIMIT_MESSAGES, handle_location
+from bot.services.overload import OverloadController
+from bot.services.send_scheduler import SendScheduler
+from config.settings import settings
+
+
+def fake_stream(*chunks):
+    """Create a stream_location_fact replacement yielding accumulated text."""
+
+    async def stream(**kwargs):
+        text = ""
+        for chunk in chunks:
+            text += chunk
+            yield text
+
+    return stream
+
+
+@pytest.fixture(autouse=True)
+async def scheduler():
+    """Route handler sends through a fresh scheduler with short limits."""
+    fresh = SendScheduler(
+        global_rate=30.0,
+        global_burst=5,
+        chat_interval=0.01,
+        max_retries=1,
+        retry_jitter=0.0,
+        typing_delay=0.05,
+        typing_interval=5.0,
+    )
+    with patch("bot.handlers.location.send_scheduler", fresh):
+        yield fresh
+    await fresh.stop()
+
+
+@pytest.fixture(autouse=True)
+def overload():
+    """Give the handler a fresh overload controller."""
+    fresh = OverloadController(
+        max_in_flight=100,
+        max_queue_wait=5.0,
+        max_error_rate=0.5,
+        min_requests=4,
+        window=30,
+        recover_ratio=0.5,
+        min_duration=10.0,
+        probe_interval=60.0,
+    )
+    with patch("bot.handlers.location.overload", fresh):
+        yield fresh
+
+
+@pytest.fixture
+def location_update(mock_update):
+    """Create a mock update carrying a location message."""
+    mock_update.message.location = MagicMock(
+        latitude=55.7558, longitude=37.6173, live_period=None
+    )
+    mock_update.message.reply_text = AsyncMock()
+    return mock_update
+
+
+@pytest.mark.asyncio
+async def test_handle_location_replies_with_fact(location_update, mock_context):
+    """Test that an allowed request is answered with a fact."""
+    with (
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.get_location_fact = AsyncMock(return_value="Fact")
+
+        await handle_location(location_update, mock_context)
+
+        mock_limiter.acquire_request.assert_awaited_once_with(12345, chat_id=12345)
+        mock_limiter.acquire_upstream.assert_awaited_once()
+        assert mock_limiter.acquire_upstream.call_args.args[0] is not None
+        location_update.message.reply_text.assert_awaited_once_with("📍 Fact")
+
+
+@pytest.mark.asyncio
+async def test_known_fact_is_not_charged_to_upstream_limits(
+    location_update, mock_context
+):
+    """Test that cell and global limits are skipped when no OpenAI call is needed."""
+    with (
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value="global")
+        mock_client.has_fact = AsyncMock(return_value=True)
+        mock_client.get_location_fact = AsyncMock(return_value="Fact")
+
+        await handle_location(location_update, mock_context)
+
+        mock_limiter.acquire_upstream.assert_not_called()
+        location_update.message.reply_text.assert_awaited_once_with("📍 Fact")
+
+
+@pytest.mark.asyncio
+async def test_handle_location_rejected_by_rate_limit(location_update, mock_context):
+    """Test that a rejected request never reaches OpenAI."""
+    with (
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value="user")
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.get_location_fact = AsyncMock()
+
+        await handle_location(location_update, mock_context)
+
+        mock_client.get_location_fact.assert_not_called()
+        mock_limiter.acquire_upstream.assert_not_called()
+        reply = location_update.message.reply_text.call_args.args[0]
+        assert reply.startswith("⏳")
+        assert "одной локации в 5 секунд" in reply
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_reply_names_the_denying_layer(location_update, mock_context):
+    """Test that chat, cell and global rejections get their own messages."""
+    with (
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value="chat")
+        mock_limiter.acquire_upstream = AsyncMock(return_value="cell")
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.get_location_fact = AsyncMock()
+
+        await handle_location(location_update, mock_context)
+        mock_limiter.acquire_request.return_value = None
+        await handle_location(location_update, mock_context)
+
+        mock_client.get_location_fact.assert_not_called()
+        replies = [
+            call.args[0] for call in location_update.message.reply_text.call_args_list
+        ]
+        assert replies == [RATE_LIMIT_MESSAGES["chat"], RATE_LIMIT_MESSAGES["cell"]]
+
+
+@pytest.mark.asyncio
+async def test_streaming_sends_first_sentence_then_edits(location_update, mock_context):
+    """Test that streaming replies early and edits in the full fact."""
+    reply = MagicMock()
+    reply.edit_text = AsyncMock()
+    location_update.message.reply_text = AsyncMock(return_value=reply)
+
+    with (
+        patch.object(settings, "openai_streaming", True),
+        patch.object(settings, "stream_edit_interval", 0),
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.stream_location_fact = fake_stream(
+            "Здесь стоял", " дом. Его снесли", " в 1930 году."
+        )
+
+        await handle_location(location_update, mock_context)
+
+        location_update.message.reply_text.assert_awaited_once_with(
+            "📍 Здесь стоял дом."
+        )
+        reply.edit_text.assert_awaited_with(
+            "📍 Здесь стоял дом. Его снесли в 1930 году."
+        )
+
+
+@pytest.mark.asyncio
+async def test_streaming_without_sentence_end_sends_whole_text(
+    location_update, mock_context
+):
+    """Test that a fact with no sentence break is sent once at the end."""
+    with (
+        patch.object(settings, "openai_streaming", True),
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.stream_location_fact = fake_stream("Короткий", " факт")
+
+        await handle_location(location_update, mock_context)
+
+        location_update.message.reply_text.assert_awaited_once_with("📍 Короткий факт")
+
+
+@pytest.mark.asyncio
+async def test_streaming_failure_sends_not_found(location_update, mock_context):
+    """Test that an empty stream results in the not-found message."""
+    with (
+        patch.object(settings, "openai_streaming", True),
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.stream_location_fact = fake_stream()
+
+        await handle_location(location_update, mock_context)
+
+        reply = location_update.message.reply_text.call_args.args[0]
+        assert reply.startswith("😔")
+
+
+@pytest.mark.asyncio
+async def test_typing_only_shown_for_slow_facts(
+    location_update, mock_context, scheduler
+):
+    """Test that a fast reply replaces the typing action."""
+    with (
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.get_location_fact = AsyncMock(return_value="Fact")
+
+        await handle_location(location_update, mock_context)
+        mock_context.bot.send_chat_action.assert_not_awaited()
+
+        async def slow_fact(**kwargs):
+            await asyncio.sleep(0.1)
+            return "Fact"
+
+        mock_client.get_location_fact = slow_fact
+        await handle_location(location_update, mock_context)
+        mock_context.bot.send_chat_action.assert_awaited_once_with(
+            chat_id=12345, action="typing"
+        )
+
+
+@pytest.mark.asyncio
+async def test_overload_answers_from_nearby_fact_or_busy(
+    location_update, mock_context, overload
+):
+    """Test that overloaded requests are answered without calling OpenAI."""
+    for _ in range(4):
+        overload.record_result(ok=False)
+
+    with (
+        patch("bot.handlers.location.rate_limiter") as mock_limiter,
+        patch("bot.handlers.location.openai_client") as mock_client,
+    ):
+        mock_limiter.acquire_request = AsyncMock(return_value=None)
+        mock_limiter.acquire_upstream = AsyncMock(return_value=None)
+        mock_client.has_fact = AsyncMock(return_value=False)
+        mock_client.get_location_fact = AsyncMock(return_value="Fact")
+        mock_client.nearby_fact = AsyncMock(return_value="Nearby fact")
+
+        await handle_location(location_update, mock_context)
+        location_update.message.reply_text.assert_awaited_once_with("📍 Nearby fact")
+
+        mock_client.nearby_fact.return_value = None
+        await handle_location(location_update, mock_context)
+        location_update.message.reply_text.assert_awaited_with(BUSY_MESSAGE)
+
+        mock_client.get_location_fact.assert_not_awaited()
+        mock_context.bot.send_chat_action.assert_not_awaited()
+    assert overload.stats()["shed"] == 2
@@ -0,0 +1,64 @@
+"""Tests for the logging pipeline."""
+
+import json
+import logging
+import queue
+
+from config.logging_config import DroppingQueueHandler, JsonFormatter, SamplingFilter
+
+
+def make_record(message="Received location", level=logging.INFO, **extra):
+    """Build a log record with extra attributes."""
+    record = logging.LogRecord("test", level, __file__, 1, message, None, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_includes_structured_fields():
+    """Test that extra fields end up in the JSON line."""
+    record = make_record(update_id=7, user_id=42, latency_ms=120)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Received location"
+    assert entry["level"] == "INFO"
+    assert entry["update_id"] == 7
+    assert entry["user_id"] == 42
+    assert entry["latency_ms"] == 120
+    assert "chat_id" not in entry
+
+
+def test_sampling_filter_keeps_fraction_per_category():
+    """Test that every Nth record of a sampled category is kept."""
+    sampler = SamplingFilter({"received_location": 0.1})
+
+    kept = sum(
+        sampler.filter(make_record(category="received_location")) for _ in range(100)
+    )
+
+    assert kept == 10
+    assert sampler.sampled_out == 90
+
+
+def test_sampling_filter_passes_unsampled_records():
+    """Test that warnings, unknown and missing categories are never sampled."""
+    sampler = SamplingFilter({"received_location": 0.0})
+
+    assert not sampler.filter(make_record(category="received_location"))
+    assert sampler.filter(
+        make_record(level=logging.WARNING, category="received_location")
+    )
+    assert sampler.filter(make_record(category="other"))
+    assert sampler.filter(make_record())
+
+
+def test_queue_handler_drops_when_full():
+    """Test that a full queue drops records instead of blocking."""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+
+    for _ in range(5):
+        handler.handle(make_record())
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
@@ -0,0 +1,41 @@
+"""Tests for the event loop lag monitor."""
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+from bot.services.loop_monitor import LoopLagMonitor
+
+
+@pytest.mark.asyncio
+async def test_measures_lag():
+    """Test that wake-ups are measured."""
+    monitor = LoopLagMonitor(interval=0.01, stall_threshold=1.0)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+    assert monitor.measurements > 0
+    assert not monitor.running
+
+
+@pytest.mark.asyncio
+async def test_reports_stall_once_with_stack(caplog):
+    """Test that a blocked loop is logged once, with the blocking code."""
+    monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.1)
+    monitor.start()
+    await asyncio.sleep(0.03)
+
+    def blocking_call():
+        time.sleep(0.4)
+
+    with caplog.at_level(logging.WARNING, logger="bot.services.loop_monitor"):
+        blocking_call()
+        await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert monitor.stalls == 1
+    assert monitor.max_lag >= 0.3
+    assert "blocking_call" in caplog.text
@@ -0,0 +1,87 @@
+"""Tests for metrics."""
+
+import pytest
+
+from bot.services.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    """Create an empty registry."""
+    return MetricsRegistry()
+
+
+def test_counter_and_labels(registry):
+    """Test counter rendering with and without labels."""
+    requests = Counter("requests_total", "Requests", registry=registry)
+    rejections = Counter(
+        "rejections_total", "Rejections", labelnames=("layer",), registry=registry
+    )
+
+    requests.inc()
+    requests.inc(2)
+    rejections.labels("user").inc()
+    rejections.labels("chat").inc()
+    rejections.labels("user").inc()
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert "requests_total 3" in text
+    assert 'rejections_total{layer="user"} 2' in text
+    assert 'rejections_total{layer="chat"} 1' in text
+
+
+def test_gauge_value_and_function(registry):
+    """Test gauge updates and scrape-time callbacks."""
+    in_flight = Gauge("in_flight", "In flight", registry=registry)
+    limit = Gauge("limit", "Limit", registry=registry)
+
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    limit.set_function(lambda: 7.5)
+
+    text = registry.render()
+    assert "in_flight 1" in text
+    assert "limit 7.5" in text
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Test histogram bucket, sum and count lines."""
+    latency = Histogram(
+        "latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry
+    )
+
+    latency.observe(0.05)
+    latency.observe(0.1)
+    latency.observe(0.5)
+    latency.observe(3.0)
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_sum 3.65" in text
+    assert "latency_seconds_count 4" in text
+
+
+def test_histogram_timer_with_labels(registry):
+    """Test timing a block into a labeled histogram."""
+    latency = Histogram(
+        "api_seconds", "API latency", labelnames=("method",), registry=registry
+    )
+
+    with latency.labels("sendMessage").time():
+        pass
+
+    assert 'api_seconds_count{method="sendMessage"} 1' in registry.render()
+
+
+def test_duplicate_names_and_wrong_labels_are_rejected(registry):
+    """Test registry and label validation."""
+    counter = Counter("dup_total", "Dup", labelnames=("a",), registry=registry)
+
+    with pytest.raises(ValueError):
+        Counter("dup_total", "Dup", registry=registry)
+    with pytest.raises(ValueError):
+        counter.labels("x", "y")
@@ -1,10 +1,19 @@
 """Tests for OpenAI client."""
 
+import asyncio
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
+from openai import RateLimitError
 
+from bot.services import metrics
+from bot.services.batcher import FactBatcher
+from bot.services.fact_store import FactStore
+from bot.services.hedging import Hedger
 from bot.services.openai_client import OpenAIClient
+from bot.services.refresher import FactRefresher
 
 
 @pytest.fixture
@@ -12,15 +21,31 @@ def openai_client():
     """Create OpenAI client instance for testing."""
     with patch("bot.services.openai_client.settings") as mock_settings:
         mock_settings.openai_api_key = "test-key"
+        mock_settings.openai_base_url = None
         mock_settings.openai_timeout = 30
+        mock_settings.openai_connect_timeout = 5.0
         mock_settings.openai_model = "gpt-4o-mini"
         mock_settings.openai_temperature = 1.0
         mock_settings.openai_max_tokens = 200
         mock_settings.system_prompt_ru = "Test prompt RU"
         mock_settings.system_prompt_en = "Test prompt EN"
+        mock_settings.fact_cache_enabled = True
+        mock_settings.fact_cache_cell_size_m = 500.0
+        mock_settings.fact_store_enabled = False
+        mock_settings.fact_refresh_enabled = False
+        mock_settings.fact_store_radius_m = 500.0
+        mock_settings.openai_concurrency_initial = 2
+        mock_settings.openai_concurrency_min = 1
+        mock_settings.openai_concurrency_max = 8
+        mock_settings.openai_target_latency = 5.0
+        mock_settings.openai_queue_max_size = 10
+        mock_settings.openai_queue_timeout = 1.0
+        mock_settings.openai_batching = False
+        mock_settings.openai_hedging = False
+        mock_settings.batch_prompt_suffix = "Batch suffix"
 
         client = OpenAIClient()
-        return client
+        yield client
 
 
 @pytest.mark.asyncio
@@ -104,3 +129,467 @@ async def test_get_location_fact_language_selection(openai_client):
         await openai_client.get_location_fact(55.7558, 37.6173, language="en")
         call_args = mock_create.call_args[1]
         assert call_args["messages"][0]["content"] == "Test prompt EN"
+
+
+@pytest.mark.asyncio
+async def test_get_location_fact_served_from_cache_for_nearby_point(openai_client):
+    """Test that a nearby location in the same cell reuses the cached fact."""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Cached fact"
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = mock_response
+
+        first = await openai_client.get_location_fact(55.7558, 37.6173)
+        second = await openai_client.get_location_fact(55.7559, 37.6174)
+
+        assert first == second == "Cached fact"
+        mock_create.assert_called_once()
+        assert openai_client.cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_get_location_fact_does_not_cache_errors(openai_client):
+    """Test that failed lookups are retried instead of cached."""
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.side_effect = Exception("API Error")
+
+        await openai_client.get_location_fact(55.7558, 37.6173)
+        await openai_client.get_location_fact(55.7558, 37.6173)
+
+        assert mock_create.call_count == 2
+        assert len(openai_client.cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_for_same_cell_share_one_call(openai_client):
+    """Test that concurrent requests for one cell are coalesced."""
+    openai_client.cache = None
+    release = asyncio.Event()
+
+    async def slow_create(**kwargs):
+        await release.wait()
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Shared fact"
+        return response
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", side_effect=slow_create
+    ) as mock_create:
+        tasks = [
+            asyncio.create_task(openai_client.get_location_fact(55.7558, 37.6173))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        facts = await asyncio.gather(*tasks)
+
+        assert facts == ["Shared fact"] * 5
+        assert mock_create.call_count == 1
+        assert openai_client.inflight.shared == 4
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_error_shrinks_concurrency_and_pauses(openai_client):
+    """Test that a 429 with Retry-After is fed back into the limiter."""
+    openai_client.cache = None
+    response = httpx.Response(
+        429,
+        headers={"retry-after": "2"},
+        request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"),
+    )
+    error = RateLimitError("Too many requests", response=response, body=None)
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.side_effect = error
+
+        fact = await openai_client.get_location_fact(55.7558, 37.6173)
+
+        assert fact is None
+        stats = openai_client.concurrency.stats()
+        assert stats["limit"] == 1
+        assert stats["throttled"] == 1
+        assert stats["paused_for"] > 1.5
+
+
+def make_stream(*chunks):
+    """Create a mock OpenAI stream yielding content deltas."""
+    stream = MagicMock()
+    stream.close = AsyncMock()
+
+    async def iterate():
+        for content in chunks:
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = content
+            yield chunk
+
+    stream.__aiter__ = lambda self: iterate()
+    return stream
+
+
+@pytest.mark.asyncio
+async def test_stream_location_fact_yields_accumulated_text(openai_client):
+    """Test that streaming yields growing text and caches the result."""
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = make_stream("First. ", None, "Second.")
+
+        texts = [
+            text async for text in openai_client.stream_location_fact(55.7558, 37.6173)
+        ]
+
+        assert texts == ["First. ", "First. Second."]
+        assert mock_create.call_args[1]["stream"] is True
+        assert openai_client.cache.get(55.7558, 37.6173, "ru") == "First. Second."
+
+
+@pytest.mark.asyncio
+async def test_stream_location_fact_enforces_length_limit(openai_client):
+    """Test that the stream is cut at 512 characters."""
+    stream = make_stream(*(["A" * 100] * 10))
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = stream
+
+        texts = [
+            text async for text in openai_client.stream_location_fact(55.7558, 37.6173)
+        ]
+
+        assert len(texts[-1]) == 512
+        assert texts[-1].endswith("...")
+        assert len(texts) == 6
+        stream.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_slot_while_caller_is_suspended(openai_client):
+    """Test that a slow consumer does not hold the upstream concurrency slot."""
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = make_stream("First. ", "Second.")
+
+        stream = openai_client.stream_location_fact(55.7558, 37.6173)
+        assert await anext(stream) == "First. "
+        # The reader finishes the upstream call while the caller is away
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert openai_client.concurrency.in_flight == 0
+
+        assert [text async for text in stream] == ["First. Second."]
+
+
+@pytest.mark.asyncio
+async def test_stream_location_fact_serves_cached_fact(openai_client):
+    """Test that a cached fact is yielded without calling OpenAI."""
+    openai_client.cache.set(55.7558, 37.6173, "ru", "Cached fact")
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        texts = [
+            text async for text in openai_client.stream_location_fact(55.7558, 37.6173)
+        ]
+
+        assert texts == ["Cached fact"]
+        mock_create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_location_fact_error_ends_stream(openai_client):
+    """Test that API errors end the stream without raising."""
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.side_effect = Exception("API Error")
+
+        texts = [
+            text async for text in openai_client.stream_location_fact(55.7558, 37.6173)
+        ]
+
+        assert texts == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_wait_for_stream(openai_client):
+    """Test that lookups of a cell being streamed share the stream's result."""
+    gate = asyncio.Event()
+    chunks = make_stream("First. ", "Second.")
+    stream = make_stream()
+
+    async def gated():
+        await gate.wait()
+        async for chunk in chunks:
+            yield chunk
+
+    stream.__aiter__ = lambda self: gated()
+    lookups = metrics.fact_lookup_duration._default.count
+    missing = metrics.facts_missing._default.value
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = stream
+
+        async def consume_stream():
+            return [
+                text
+                async for text in openai_client.stream_location_fact(55.7558, 37.6173)
+            ]
+
+        streaming = asyncio.create_task(consume_stream())
+        await asyncio.sleep(0.01)
+        other_stream = asyncio.create_task(consume_stream())
+        lookup = asyncio.create_task(openai_client.get_location_fact(55.7558, 37.6173))
+        await asyncio.sleep(0.01)
+        gate.set()
+
+        assert await streaming == ["First. ", "First. Second."]
+        assert await other_stream == ["First. Second."]
+        assert await lookup == "First. Second."
+        mock_create.assert_awaited_once()
+
+    await asyncio.sleep(0)
+    assert metrics.fact_lookup_duration._default.count == lookups + 3
+    assert metrics.facts_missing._default.value == missing
+    assert openai_client.inflight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_counts_missing_fact(openai_client):
+    """Test that a failed stream resolves waiters and records the miss."""
+    missing = metrics.facts_missing._default.value
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.side_effect = Exception("API Error")
+
+        texts = [
+            text async for text in openai_client.stream_location_fact(55.7558, 37.6173)
+        ]
+
+    assert texts == []
+    assert metrics.facts_missing._default.value == missing + 1
+    await asyncio.sleep(0)
+    assert openai_client.inflight.stats()["in_flight"] == 0
+
+
+def enable_batching(client):
+    """Attach a batcher with a short window to the client."""
+    client.cache = None
+    client.batcher = FactBatcher(
+        fetch_batch=client._request_facts_batch,
+        fetch_one=client._request_fact,
+        window=0.01,
+        max_batch=8,
+    )
+
+
+@pytest.mark.asyncio
+async def test_batched_lookups_use_one_structured_completion(openai_client):
+    """Test that concurrent lookups in different cells share one request."""
+    enable_batching(openai_client)
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = '{"facts": ["A", "B", "C"]}'
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = mock_response
+
+        facts = await asyncio.gather(
+            openai_client.get_location_fact(10.0, 10.0),
+            openai_client.get_location_fact(20.0, 20.0),
+            openai_client.get_location_fact(30.0, 30.0),
+        )
+
+        assert facts == ["A", "B", "C"]
+        mock_create.assert_called_once()
+        call_args = mock_create.call_args[1]
+        assert call_args["response_format"]["type"] == "json_schema"
+        assert call_args["messages"][0]["content"].endswith("Batch suffix")
+        assert call_args["max_tokens"] == 600
+
+
+@pytest.mark.asyncio
+async def test_malformed_batch_falls_back_to_single_requests(openai_client):
+    """Test that a malformed batch response is retried per location."""
+    enable_batching(openai_client)
+    batch_response = MagicMock()
+    batch_response.choices = [MagicMock()]
+    batch_response.choices[0].message.content = '{"facts": ["only one"]}'
+    single_response = MagicMock()
+    single_response.choices = [MagicMock()]
+    single_response.choices[0].message.content = "Single"
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.side_effect = [batch_response, single_response, single_response]
+
+        facts = await asyncio.gather(
+            openai_client.get_location_fact(10.0, 10.0),
+            openai_client.get_location_fact(20.0, 20.0),
+        )
+
+        assert facts == ["Single", "Single"]
+        assert mock_create.call_count == 3
+        assert openai_client.batcher.fallbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections_concurrently(openai_client):
+    """Test that warm-up issues one cheap call per pooled connection."""
+    with (
+        patch.object(
+            openai_client.client.models, "retrieve", new_callable=AsyncMock
+        ) as mock_retrieve,
+        patch("bot.services.openai_client.settings") as mock_settings,
+    ):
+        mock_settings.http_prewarm_connections = 3
+        mock_settings.http_prewarm_timeout = 1.0
+        mock_settings.openai_model = "gpt-4o-mini"
+
+        await openai_client.warm_up()
+
+        assert mock_retrieve.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_sdk_client_created_lazily(openai_client):
+    """Test that the SDK client is only built on first use."""
+    assert openai_client._client is None
+    await openai_client.close()
+    assert openai_client._client is None
+
+    assert openai_client.client is openai_client.client
+    await openai_client.close()
+
+
+@pytest.mark.asyncio
+async def test_fact_store_serves_nearby_facts_and_keeps_new_ones(
+    openai_client, tmp_path
+):
+    """Test that stored facts skip OpenAI and new facts are persisted."""
+    openai_client.store = FactStore(str(tmp_path / "facts.sqlite3"))
+    await openai_client.store.add(55.7539, 37.6208, "ru", "Stored fact", "gpt-4o-mini")
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Generated fact"
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = mock_response
+
+        stored = await openai_client.get_location_fact(55.7545, 37.6208)
+        generated = await openai_client.get_location_fact(59.9398, 30.3146)
+
+        assert stored == "Stored fact"
+        assert generated == "Generated fact"
+        assert mock_create.call_count == 1
+        assert await openai_client.store.nearest(59.9398, 30.3146, "ru", 10)
+
+    await openai_client.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_fact_served_while_revalidating(openai_client):
+    """Test stale-while-revalidate on an expired cache entry."""
+    openai_client.refresher = FactRefresher(
+        cache=openai_client.cache,
+        refresh=openai_client.refresh_fact,
+        token_budget=1000,
+        tokens_per_refresh=200,
+        interval=60,
+        refresh_ahead=600,
+        max_per_run=10,
+        offpeak_hours="",
+        half_life=3600,
+        max_tracked=100,
+    )
+    expired = time.monotonic() - openai_client.cache.ttl - 1
+    with patch("bot.services.fact_cache.time.monotonic", return_value=expired):
+        openai_client.cache.set(55.7558, 37.6173, "ru", "Old fact")
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "New fact"
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        mock_create.return_value = mock_response
+
+        assert await openai_client.get_location_fact(55.7558, 37.6173) == "Old fact"
+        await asyncio.gather(*openai_client.refresher._tasks)
+        assert await openai_client.get_location_fact(55.7558, 37.6173) == "New fact"
+        assert mock_create.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_fact_request_is_hedged(openai_client):
+    """Test that a request slower than the hedge delay is repeated."""
+    openai_client.hedger = Hedger(
+        quantile=0.9, min_delay=0.01, budget_percent=100, window=10, min_samples=1
+    )
+    openai_client.hedger.record(0.01)
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Fast fact"
+    calls = 0
+
+    async def create(**kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(10)
+        return mock_response
+
+    with patch.object(openai_client.client.chat.completions, "create", create):
+        fact = await openai_client.get_location_fact(55.7558, 37.6173)
+
+    assert fact == "Fast fact"
+    assert calls == 2
+    assert openai_client.hedger.stats()["wins"] == 1
+    # The abandoned call gave its slot back
+    assert openai_client.concurrency.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_nearby_fact_never_calls_openai(openai_client, tmp_path):
+    """Test the degraded lookup in the cache and then the store."""
+    openai_client.store = FactStore(str(tmp_path / "facts.sqlite3"))
+    await openai_client.store.add(55.7758, 37.6173, "ru", "Stored fact", "gpt-4o-mini")
+
+    with patch.object(
+        openai_client.client.chat.completions, "create", new_callable=AsyncMock
+    ) as mock_create:
+        assert (
+            await openai_client.nearby_fact(55.7558, 37.6173, "ru", 3000)
+            == "Stored fact"
+        )
+        assert await openai_client.nearby_fact(55.7558, 37.6173, "ru", 1000) is None
+
+        openai_client.cache.set(55.7608, 37.6173, "ru", "Cached fact")
+        assert (
+            await openai_client.nearby_fact(55.7558, 37.6173, "ru", 1000)
+            == "Cached fact"
+        )
+
+        mock_create.assert_not_called()
+    await openai_client.store.close()
@@ -0,0 +1,93 @@
+"""Tests for the overload controller."""
+
+import pytest
+
+from bot.services.overload import OverloadController
+
+
+@pytest.fixture
+def controller(clock):
+    """Create controller instance with small limits."""
+    return OverloadController(
+        max_in_flight=4,
+        max_queue_wait=2.0,
+        max_error_rate=0.5,
+        min_requests=4,
+        window=10,
+        recover_ratio=0.5,
+        min_duration=5.0,
+        probe_interval=1.0,
+        clock=clock,
+    )
+
+
+def test_in_flight_limit_and_hysteresis(controller, clock):
+    """Test entering on in-flight count and recovering only well below it."""
+    with controller.track():
+        assert controller.in_flight == 1
+    assert controller.in_flight == 0
+
+    controller.in_flight = 3
+    assert not controller.should_shed()
+
+    controller.in_flight = 4
+    assert controller.should_shed()
+    assert controller.stats()["reason"] == "in_flight"
+
+    # Below the limit, but not below half of it
+    controller.in_flight = 3
+    clock.now += 0.5
+    assert controller.should_shed()
+
+    controller.in_flight = 1
+    assert controller.should_shed(), "min_duration not over yet"
+
+    clock.now += 5
+    assert not controller.should_shed()
+    assert not controller.active
+    assert controller.stats()["episodes"] == 1
+
+
+def test_error_rate_needs_min_requests_and_expires(controller, clock):
+    """Test the error rate signal over the sliding window."""
+    for _ in range(3):
+        controller.record_result(ok=False)
+    assert controller.signals()["error_rate"] is None
+    assert not controller.should_shed()
+
+    controller.record_result(ok=True)
+    assert controller.signals()["error_rate"] == 0.75
+    assert controller.should_shed()
+
+    # Errors age out of the window, no new calls needed to recover
+    clock.now += 10
+    assert controller.signals()["error_rate"] is None
+    assert not controller.should_shed()
+
+
+def test_queue_wait_signal(controller, clock):
+    """Test that long average queue waits mean overload."""
+    controller.record_queue_wait(1.0)
+    assert not controller.should_shed()
+
+    controller.record_queue_wait(4.0)
+    assert controller.signals()["queue_wait"] == 2.5
+    assert controller.should_shed()
+    assert controller.reason == "queue_wait"
+
+
+def test_probes_let_some_requests_through(controller, clock):
+    """Test that one request per probe_interval still reaches upstream."""
+    for _ in range(4):
+        controller.record_result(ok=False)
+
+    decisions = [controller.should_shed() for _ in range(3)]
+    assert decisions == [True, True, True]
+
+    clock.now += 1
+    assert not controller.should_shed()
+    assert controller.should_shed()
+
+    stats = controller.stats()
+    assert stats["probes"] == 1
+    assert stats["shed"] == 4
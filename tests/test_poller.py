@@ -0,0 +1,183 @@
+"""Tests for long-polling update intake."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from telegram import Bot, Update
+from telegram.error import NetworkError
+
+from bot.services.poller import UpdatePoller
+
+BOT = Bot("123456:test-token")
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    """Build a location update from a chat."""
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1_700_000_000,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+                "location": {"latitude": 55.75, "longitude": 37.62},
+            },
+        },
+        BOT,
+    )
+
+
+def make_poller():
+    """Create poller instance."""
+    return UpdatePoller(
+        limit=100,
+        timeout=30,
+        allowed_updates=["message"],
+        max_backoff=0.01,
+    )
+
+
+def make_bot(*batches, webhook_url=""):
+    """Bot mock returning the given batches, then waiting like a long poll."""
+    bot = MagicMock()
+    bot.get_webhook_info = AsyncMock(return_value=MagicMock(url=webhook_url))
+    bot.delete_webhook = AsyncMock()
+    calls = []
+
+    async def get_updates(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= len(batches):
+            batch = batches[len(calls) - 1]
+            if isinstance(batch, Exception):
+                raise batch
+            return batch
+        if kwargs["timeout"] == 0:
+            return ()
+        await asyncio.sleep(3600)
+
+    bot.get_updates = get_updates
+    return bot, calls
+
+
+async def wait_for(condition, timeout=2.0):
+    """Wait until condition() is true."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_chats_run_concurrently_each_in_order():
+    """Test per-chat ordering with concurrent chats, also across polls."""
+    poller = make_poller()
+    handled = []
+    running = 0
+    peak = 0
+
+    async def process(update):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Earlier updates take longer, so only ordering keeps them first
+        await asyncio.sleep(0.02 if update.update_id % 2 else 0.01)
+        handled.append((update.effective_chat.id, update.update_id))
+        running -= 1
+
+    poller.dispatch(tuple(make_update(i, chat_id=i % 3) for i in range(6)), process)
+    poller.dispatch(tuple(make_update(i, chat_id=i % 3) for i in range(6, 9)), process)
+    await wait_for(lambda: len(handled) == 9)
+
+    for chat_id in range(3):
+        ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert ids == sorted(ids)
+    assert peak == 3
+    assert poller.offset == 9
+    assert poller.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_offset_only_passes_finished_updates():
+    """Test that a slow update holds the offset but not other chats."""
+    poller = make_poller()
+    release = asyncio.Event()
+    finished = []
+
+    async def process(update):
+        if update.update_id == 1:
+            await release.wait()
+        finished.append(update.update_id)
+
+    poller.dispatch((make_update(1, 1), make_update(2, 2)), process)
+    await wait_for(lambda: finished == [2])
+    assert poller.offset == 1
+
+    # A poll from the held offset returns the running update again
+    assert poller.dispatch((make_update(1, 1), make_update(3, 2)), process) == 1
+    await wait_for(lambda: finished == [2, 3])
+    assert poller.offset == 1
+    assert poller.stats()["redelivered"] == 1
+
+    release.set()
+    await wait_for(lambda: poller.offset == 4)
+
+
+@pytest.mark.asyncio
+async def test_polls_confirm_only_processed_updates():
+    """Test the offsets getUpdates is called with."""
+    poller = make_poller()
+    bot, calls = make_bot((make_update(10, 1), make_update(11, 2)))
+    processed = []
+
+    async def process(update):
+        await asyncio.sleep(0.01)
+        processed.append(update.update_id)
+
+    assert await poller.start(bot, process)
+    await wait_for(lambda: len(calls) == 2)
+    await poller.stop()
+
+    bot.delete_webhook.assert_not_awaited()
+    assert sorted(processed) == [10, 11]
+    assert calls[0]["offset"] is None
+    assert calls[0]["limit"] == 100
+    assert calls[0]["allowed_updates"] == ["message"]
+    # Polled again right away, without confirming the running updates
+    assert calls[1]["offset"] == 10
+    # Final confirmation on stop
+    assert calls[-1] == {"offset": 12, "limit": 1, "timeout": 0}
+    assert not poller.running
+
+
+@pytest.mark.asyncio
+async def test_registered_webhook_is_left_alone():
+    """Test that polling is refused instead of deleting a webhook."""
+    poller = make_poller()
+    bot, calls = make_bot(webhook_url="https://example.com/webhook")
+
+    assert not await poller.start(bot, AsyncMock())
+
+    assert not poller.running
+    bot.delete_webhook.assert_not_awaited()
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_errors_are_retried_with_backoff():
+    """Test that failed polls and failing handlers do not stop polling."""
+    poller = make_poller()
+    bot, calls = make_bot(NetworkError("down"), (make_update(1, 1),))
+
+    async def process(update):
+        raise RuntimeError("handler failed")
+
+    await poller.start(bot, process)
+    await wait_for(lambda: len(calls) == 3)
+    await poller.stop()
+
+    stats = poller.stats()
+    assert stats["errors"] == 1
+    assert stats["failed"] == 1
+    assert stats["offset"] == 2
@@ -0,0 +1,109 @@
+"""Tests for the pre-generation CLI helpers."""
+
+import asyncio
+import io
+from unittest.mock import patch
+
+import pytest
+
+from bot.pregenerate import (
+    Checkpoint,
+    cells_from_csv,
+    main,
+    pregenerate,
+    tile_bbox,
+)
+from bot.services.geo import cell_center, cell_for
+
+
+def test_tile_bbox_covers_area_once():
+    """Test that every point of the box falls into a listed cell."""
+    cells = tile_bbox(55.74, 37.60, 55.76, 37.64, 500)
+
+    assert len(cells) == len(set(cells))
+    for latitude in (55.741, 55.75, 55.759):
+        for longitude in (37.601, 37.62, 37.639):
+            assert cell_for(latitude, longitude, 500) in cells
+    # ~2.2 km x ~2.5 km in 500 m cells
+    assert 20 <= len(cells) <= 42
+
+
+def test_cells_from_csv_skips_header_and_duplicates():
+    """Test CSV parsing."""
+    file = io.StringIO(
+        "latitude,longitude,name\n55.7539,37.6208,a\n55.7540,37.6209,b\n\n59.94,30.31,c\n"
+    )
+
+    cells = cells_from_csv(file, 500)
+
+    assert cells == [cell_for(55.7539, 37.6208, 500), cell_for(59.94, 30.31, 500)]
+
+
+@pytest.mark.asyncio
+async def test_pregenerate_resumes_from_checkpoint(tmp_path):
+    """Test that finished cells are skipped and failures are retried later."""
+    path = str(tmp_path / "checkpoint")
+    cells = tile_bbox(55.74, 37.60, 55.75, 37.61, 500)
+    calls = []
+
+    async def generate(latitude, longitude, language):
+        calls.append((latitude, longitude, language))
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return "Fact"
+
+    checkpoint = Checkpoint(path)
+    first = await pregenerate(cells, ["ru"], generate, checkpoint, 500, 1, 0)
+    checkpoint.close()
+
+    assert first["generated"] == len(cells) - 1
+    assert first["failed"] == 1
+    assert calls[0][:2] == cell_center(cells[0], 500)
+
+    calls.clear()
+    checkpoint = Checkpoint(path)
+    second = await pregenerate(cells, ["ru"], generate, checkpoint, 500, 1, 0)
+    checkpoint.close()
+
+    assert second["skipped"] == len(cells) - 1
+    assert second["generated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pregenerate_bounds_concurrency(tmp_path):
+    """Test that at most concurrency requests run at once."""
+    running = 0
+    peak = 0
+
+    async def generate(latitude, longitude, language):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "Fact"
+
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"))
+    cells = tile_bbox(55.74, 37.60, 55.76, 37.64, 500)
+    counts = await pregenerate(cells, ["ru", "en"], generate, checkpoint, 500, 3, 0)
+    checkpoint.close()
+
+    assert counts["generated"] == 2 * len(cells)
+    assert peak == 3
+
+
+def test_main_requires_fact_store_enabled(tmp_path, capsys):
+    """Test that the CLI refuses to write facts the bot would not read."""
+    argv = ["pregenerate", "--bbox", "55.70,37.55,55.71,37.56"]
+    with (
+        patch("sys.argv", argv + ["--db", str(tmp_path / "facts.db")]),
+        patch("bot.pregenerate.settings.fact_store_enabled", False),
+        patch("bot.pregenerate._run") as run,
+        pytest.raises(SystemExit) as exc,
+    ):
+        main()
+
+    assert exc.value.code == 2
+    assert "FACT_STORE_ENABLED" in capsys.readouterr().err
+    run.assert_not_called()
+    assert not (tmp_path / "facts.db").exists()
@@ -0,0 +1,74 @@
+"""Tests for the sampling profiler."""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from bot.services.profiler import (
+    ProfilerBusyError,
+    SamplingProfiler,
+    collect_stacks,
+    format_collapsed,
+)
+
+
+def busy_work(stop: threading.Event) -> None:
+    """Spin until stopped."""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_collect_stacks_samples_target_thread():
+    """Test that the sampled thread's functions appear in the stacks."""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_work, args=(stop,))
+    worker.start()
+    try:
+        stacks = collect_stacks(worker.ident, duration=0.1, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert sum(stacks.values()) > 0
+    assert any("test_profiler.py:busy_work" in stack for stack in stacks)
+    assert all(stack.startswith("threading.py:") for stack in stacks)
+
+
+def test_format_collapsed_orders_by_count():
+    """Test the collapsed stack output format."""
+    stacks = {"a.py:main;a.py:slow": 3, "a.py:main;a.py:fast": 1}
+
+    output = format_collapsed(Counter(stacks))
+
+    assert output == "a.py:main;a.py:slow 3\na.py:main;a.py:fast 1\n"
+
+
+@pytest.mark.asyncio
+async def test_profile_captures_blocking_code_on_the_loop():
+    """Test profiling the event loop thread while it is blocked."""
+    profiler = SamplingProfiler()
+
+    async def block_loop():
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+
+    profile, _ = await asyncio.gather(profiler.profile(0.2), block_loop())
+
+    assert "block_loop" in profile
+    assert profiler.profiles == 1
+    assert not profiler.running
+
+
+@pytest.mark.asyncio
+async def test_concurrent_profiles_are_rejected():
+    """Test that only one profile runs at a time."""
+    profiler = SamplingProfiler()
+    first = asyncio.create_task(profiler.profile(0.1))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ProfilerBusyError):
+        await profiler.profile(0.1)
+    await first
@@ -0,0 +1,143 @@
+"""Tests for shared rate limiter backends."""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from benchmarks.fake_redis import FakeRedisServer
+from bot.services.rate_limit_backends import Limit, RedisBackend, SQLiteBackend
+
+LIMITS = {"user": Limit(1, 5), "chat": Limit(3, 60), "global": Limit(5, 60)}
+
+
+@pytest.fixture
+async def sqlite_backends(tmp_path):
+    """Create two SQLite backends sharing one database file."""
+    path = str(tmp_path / "limits.sqlite3")
+    first, second = SQLiteBackend(path, LIMITS), SQLiteBackend(path, LIMITS)
+    yield first, second
+    await first.close()
+    await second.close()
+
+
+@pytest.fixture
+async def redis_backends():
+    """Create two Redis backends connected to one stand-in server."""
+    async with FakeRedisServer() as server:
+        first = RedisBackend(server.url, LIMITS)
+        second = RedisBackend(server.url, LIMITS)
+        yield first, second
+        await first.close()
+        await second.close()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backends(request):
+    """Parametrize tests over every shared backend."""
+    return request.getfixturevalue(f"{request.param}_backends")
+
+
+@pytest.mark.asyncio
+async def test_limit_is_shared_between_instances(backends):
+    """Test that a slot taken by one worker is seen by another."""
+    first, second = backends
+
+    assert await first.try_acquire([("user", 1)]) is None
+    assert await second.try_acquire([("user", 1)]) == "user"
+    assert await second.try_acquire([("user", 2)]) is None
+
+
+@pytest.mark.asyncio
+async def test_rejection_returns_first_full_layer(backends):
+    """Test that the denied layer is reported."""
+    first, _ = backends
+
+    for user_id in range(3):
+        assert await first.try_acquire([("user", user_id), ("chat", -100)]) is None
+
+    assert await first.try_acquire([("user", 10), ("chat", -100)]) == "chat"
+
+
+@pytest.mark.asyncio
+async def test_rejection_consumes_nothing(backends):
+    """Test that a rejected decision leaves all layers untouched."""
+    first, second = backends
+    for user_id in range(3):
+        await first.try_acquire([("user", user_id), ("chat", -100)])
+
+    assert await second.try_acquire([("user", 99), ("chat", -100)]) == "chat"
+    assert await second.try_acquire([("user", 99), ("chat", -200)]) is None
+
+
+@pytest.mark.asyncio
+async def test_global_layer_with_cell_keys(backends):
+    """Test tuple and None keys across layers."""
+    first, second = backends
+    results = [
+        await (first if i % 2 else second).try_acquire([("user", i), ("global", None)])
+        for i in range(7)
+    ]
+
+    assert results.count(None) == 5
+    assert results.count("global") == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_uses_one_round_trip_per_decision():
+    """Test that allowed decisions are pipelined into a single MULTI/EXEC."""
+    async with FakeRedisServer() as server:
+        backend = RedisBackend(server.url, LIMITS)
+        await backend.try_acquire([("user", 1), ("chat", 1), ("global", None)])
+        await backend.close()
+        await asyncio.sleep(0)
+
+        # MULTI + (INCR + PEXPIRE) * 3 + EXEC
+        assert server.commands_received == 8
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_waits_for_lock_off_the_event_loop(tmp_path):
+    """Test that a decision waiting for another writer does not block the loop."""
+    path = str(tmp_path / "limits.sqlite3")
+    backend = SQLiteBackend(path, LIMITS)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        decision = asyncio.create_task(backend.try_acquire([("user", 1)]))
+        started = time.monotonic()
+        await asyncio.sleep(0.1)
+        assert time.monotonic() - started < 0.5
+        assert not decision.done()
+    finally:
+        other.execute("COMMIT")
+        other.close()
+
+    assert await decision is None
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_reconnects_after_cancelled_round_trip():
+    """Test that replies left unread by a cancellation are not misread later."""
+    async with FakeRedisServer() as server:
+        backend = RedisBackend(server.url, LIMITS)
+        await backend.try_acquire([("user", 1)])
+        writer = backend._writer
+        read_reply = backend._read_reply
+
+        async def cancelled():
+            backend._read_reply = read_reply
+            raise asyncio.CancelledError
+
+        backend._read_reply = cancelled
+        with pytest.raises(asyncio.CancelledError):
+            await backend.try_acquire([("user", 2)])
+        assert writer.is_closing()
+
+        # Replies on the new connection belong to the new commands
+        assert await backend.try_acquire([("user", 1)]) == "user"
+        assert await backend.try_acquire([("user", 3)]) is None
+        assert backend._writer is not writer
+        await backend.close()
@@ -5,7 +5,8 @@ from unittest.mock import patch
 
 import pytest
 
-from bot.services.rate_limiter import RateLimiter
+from bot.services import metrics
+from bot.services.rate_limiter import BucketStore, RateLimiter
 
 
 @pytest.fixture
@@ -14,6 +15,14 @@ def rate_limiter():
     with patch("bot.services.rate_limiter.settings") as mock_settings:
         mock_settings.rate_limit_requests = 1
         mock_settings.rate_limit_period = 5
+        mock_settings.rate_limit_max_entries = 1000
+        mock_settings.rate_limit_chat_requests = 3
+        mock_settings.rate_limit_chat_period = 60
+        mock_settings.rate_limit_cell_requests = 0
+        mock_settings.rate_limit_cell_period = 60
+        mock_settings.rate_limit_global_requests = 5
+        mock_settings.rate_limit_global_period = 60
+        mock_settings.rate_limit_backend = "memory"
 
         limiter = RateLimiter()
         return limiter
@@ -108,3 +117,148 @@ def test_cleanup_old_limiters(rate_limiter):
     assert 1 not in rate_limiter.limiters
     assert 3 not in rate_limiter.limiters
     assert 5 not in rate_limiter.limiters
+
+
+def test_idle_buckets_expire_automatically(clock):
+    """Test that idle users are swept without an explicit cleanup call."""
+    store = BucketStore(max_rate=1, time_period=5, max_entries=1000, clock=clock)
+
+    for user_id in range(10):
+        store.consume(user_id)
+    assert len(store) == 10
+
+    clock.now += 6
+    store.consume(100)
+
+    assert len(store) == 1
+    assert 100 in store
+    assert store.expired == 10
+
+
+def test_active_buckets_are_not_expired(clock):
+    """Test that recently used users keep their state."""
+    store = BucketStore(max_rate=1, time_period=5, max_entries=1000, clock=clock)
+    store.consume(1)
+
+    clock.now += 3
+    store.consume(2)
+
+    assert 1 in store
+    assert store.has_capacity(1) is False
+
+
+def test_store_is_capped_at_max_entries():
+    """Test that the store never grows beyond max_entries."""
+    store = BucketStore(max_rate=1, time_period=5, max_entries=3)
+
+    for user_id in range(10):
+        store.consume(user_id)
+
+    assert len(store) == 3
+    assert store.evicted == 7
+
+
+def test_has_capacity_does_not_allocate(rate_limiter):
+    """Test that checking a new user does not create a record."""
+    rate_limiter.limiters.has_capacity(42)
+
+    assert len(rate_limiter.limiters) == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_capacity(rate_limiter):
+    """Test that acquire blocks until the bucket drains."""
+    rate_limiter.time_period = 0.05
+    await rate_limiter.acquire(1)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await rate_limiter.acquire(1)
+
+    assert loop.time() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_try_acquire_allows_once_then_rejects(rate_limiter):
+    """Test that try_acquire consumes the slot without blocking."""
+    assert await rate_limiter.try_acquire(12345) is True
+    assert await rate_limiter.try_acquire(12345) is False
+    assert rate_limiter.rejections["user"] == 1
+
+
+@pytest.mark.asyncio
+async def test_try_acquire_is_atomic_under_concurrency(rate_limiter):
+    """Test that concurrent requests from one user get exactly one slot."""
+    results = await asyncio.gather(
+        *(rate_limiter.try_acquire(12345) for _ in range(10))
+    )
+
+    assert results.count(True) == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_layer_limits_many_users_in_one_chat(rate_limiter):
+    """Test that a busy group chat is limited independently of users."""
+    results = [
+        await rate_limiter.try_acquire(user_id, chat_id=-100) for user_id in range(5)
+    ]
+
+    assert results == [True, True, True, False, False]
+    assert rate_limiter.rejections["chat"] == 2
+
+
+@pytest.mark.asyncio
+async def test_try_acquire_records_metrics(rate_limiter):
+    """Test that decisions and rejections are exported as metrics."""
+    decisions = metrics.rate_limit_decision_duration._default.count
+    rejections = metrics.rate_limit_rejections.labels("user").value
+
+    await rate_limiter.try_acquire(777)
+    await rate_limiter.try_acquire(777)
+
+    assert metrics.rate_limit_decision_duration._default.count == decisions + 2
+    assert metrics.rate_limit_rejections.labels("user").value == rejections + 1
+
+
+@pytest.mark.asyncio
+async def test_global_layer_caps_total_requests(rate_limiter):
+    """Test that the global budget applies across all users and chats."""
+    results = [
+        await rate_limiter.try_acquire(user_id, chat_id=user_id) for user_id in range(7)
+    ]
+
+    assert results.count(True) == 5
+    assert rate_limiter.rejections["global"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_consumes_nothing(rate_limiter):
+    """Test that a rejection on one layer leaves the other layers untouched."""
+    for user_id in range(3):
+        await rate_limiter.try_acquire(user_id, chat_id=-100)
+
+    # Chat is full: user 99 is rejected and must not be charged
+    assert await rate_limiter.try_acquire(99, chat_id=-100) is False
+    assert 99 not in rate_limiter.limiters
+    assert await rate_limiter.try_acquire(99, chat_id=-200) is True
+
+
+@pytest.mark.asyncio
+async def test_disabled_layer_is_skipped(rate_limiter):
+    """Test that a layer configured with 0 requests is not applied."""
+    assert rate_limiter.cell_limiters is None
+    assert await rate_limiter.try_acquire(1, cell=(1, 1)) is True
+    assert await rate_limiter.try_acquire(2, cell=(1, 1)) is True
+
+
+@pytest.mark.asyncio
+async def test_request_and_upstream_layers_are_charged_separately(rate_limiter):
+    """Test that only upstream calls count against the global budget."""
+    for user_id in range(3):
+        assert await rate_limiter.acquire_request(user_id, chat_id=user_id) is None
+    assert await rate_limiter.acquire_request(0, chat_id=0) == "user"
+
+    results = [await rate_limiter.acquire_upstream() for _ in range(6)]
+
+    assert results == [None] * 5 + ["global"]
+    assert rate_limiter.rejections["global"] == 1
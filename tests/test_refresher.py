@@ -0,0 +1,208 @@
+"""Tests for the fact refresher."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from bot.services.fact_cache import FactCache
+from bot.services.refresher import (
+    FactRefresher,
+    TokenBudget,
+    in_window,
+    parse_hours,
+    until_next_window_end,
+)
+
+HOT = (55.7539, 37.6208)
+WARM = (59.9398, 30.3146)
+COLD = (43.5855, 39.7231)
+
+
+@pytest.fixture
+def cache():
+    """Create a fact cache with a one hour TTL."""
+    with patch("bot.services.fact_cache.settings") as mock_settings:
+        mock_settings.fact_cache_max_size = 100
+        mock_settings.fact_cache_ttl = 3600
+        mock_settings.fact_cache_stale_ttl = 86400
+        mock_settings.fact_cache_cell_size_m = 500.0
+        return FactCache()
+
+
+def make_refresher(cache, refresh, clock, token_budget=1000, **kwargs):
+    """Create a refresher with test defaults."""
+    options = {
+        "token_budget": token_budget,
+        "tokens_per_refresh": 100,
+        "interval": 60,
+        "refresh_ahead": 600,
+        "max_per_run": 10,
+        "offpeak_hours": "",
+        "half_life": 3600,
+        "max_tracked": 100,
+        **kwargs,
+    }
+    return FactRefresher(cache=cache, refresh=refresh, clock=clock, **options)
+
+
+def test_parse_hours_and_window():
+    """Test hour windows, including ones wrapping midnight."""
+    assert parse_hours("") is None
+    assert in_window(None, 15)
+    assert in_window(parse_hours("1-6"), 1)
+    assert not in_window(parse_hours("1-6"), 6)
+    assert in_window(parse_hours("22-4"), 23)
+    assert in_window(parse_hours("22-4"), 3)
+    assert not in_window(parse_hours("22-4"), 12)
+
+
+def test_token_budget_resets_every_period(clock):
+    """Test that spend is capped per period."""
+    budget = TokenBudget(250, period=60, clock=clock)
+
+    assert budget.try_spend(100)
+    assert budget.try_spend(100)
+    assert not budget.try_spend(100)
+
+    clock.now += 60
+    assert budget.try_spend(100)
+
+
+def test_hottest_ranks_by_decayed_count(cache, clock):
+    """Test that a few recent requests outrank many requests long ago."""
+    refresher = make_refresher(cache, AsyncMock(), clock)
+
+    for _ in range(10):
+        refresher.record(*COLD, "ru")
+    clock.now += 4 * 3600
+    for _ in range(3):
+        refresher.record(*HOT, "ru")
+    refresher.record(*WARM, "ru")
+
+    ranked = [key for key, _ in refresher.hottest(3)]
+    # COLD decayed from 10 to 10 / 2**4 after four half-lives
+    assert ranked == [
+        cache.key(*HOT, "ru"),
+        cache.key(*WARM, "ru"),
+        cache.key(*COLD, "ru"),
+    ]
+
+
+def test_tracking_is_bounded(cache, clock):
+    """Test that the coldest cells are forgotten when the limit is hit."""
+    refresher = make_refresher(cache, AsyncMock(), clock, max_tracked=10)
+
+    for i in range(25):
+        refresher.record(50 + i * 0.1, 30.0, "ru")
+
+    assert len(refresher._heat) <= 10
+
+
+@pytest.mark.asyncio
+async def test_run_once_refreshes_hot_cells_expiring_soon(cache, clock):
+    """Test that only tracked cells close to expiry are refreshed."""
+    refresh = AsyncMock(return_value="New fact")
+    refresher = make_refresher(cache, refresh, clock)
+    with patch("bot.services.fact_cache.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        cache.set(*HOT, "ru", "Old fact")
+        monotonic.return_value = 3000.0
+        cache.set(*WARM, "ru", "Fresh fact")
+        refresher.record(*HOT, "ru")
+        refresher.record(*WARM, "ru")
+        refresher.record(*COLD, "ru")
+
+        monotonic.return_value = 3500.0
+        assert refresher.run_once() == 1
+    await asyncio.gather(*refresher._tasks)
+
+    refresh.assert_awaited_once_with(*HOT, "ru")
+    assert refresher.refreshes == 1
+
+
+@pytest.mark.asyncio
+async def test_run_once_respects_offpeak_window_and_budget(cache, clock):
+    """Test that runs are skipped outside the window and capped by budget."""
+    refresh = AsyncMock(return_value="New fact")
+    refresher = make_refresher(
+        cache, refresh, clock, token_budget=150, offpeak_hours="1-6"
+    )
+    with patch("bot.services.fact_cache.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        cache.set(*HOT, "ru", "Old fact")
+        cache.set(*WARM, "ru", "Old fact")
+        refresher.record(*HOT, "ru")
+        refresher.record(*WARM, "ru")
+
+        monotonic.return_value = 3500.0
+        assert refresher.run_once(timestamp=12 * 3600) == 0
+        assert refresher.run_once(timestamp=3 * 3600) == 1
+    await asyncio.gather(*refresher._tasks)
+    assert refresh.await_count == 1
+
+
+def test_until_next_window_end():
+    """Test the horizon covers the whole next off-peak window."""
+    hour = 3600
+    assert until_next_window_end(None, 3 * hour) == 0
+    assert until_next_window_end((1, 6), 3 * hour) == 22 * hour + 5 * hour
+    assert until_next_window_end((1, 6), 1 * hour) == 24 * hour + 5 * hour
+    assert until_next_window_end((22, 2), 23 * hour) == 23 * hour + 4 * hour
+
+
+@pytest.mark.asyncio
+async def test_run_once_refreshes_facts_expiring_at_peak_time(cache, clock):
+    """Test that off-peak runs renew facts expiring before the next window."""
+    refresh = AsyncMock(return_value="New fact")
+    refresher = make_refresher(cache, refresh, clock, offpeak_hours="1-6")
+    with patch("bot.services.fact_cache.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        cache.set(*HOT, "ru", "Old fact")
+        refresher.record(*HOT, "ru")
+
+        # At 05:30 UTC the fact expires at 06:30, beyond refresh_ahead but
+        # after the window closes
+        assert refresher.run_once(timestamp=5.5 * 3600) == 1
+    await asyncio.gather(*refresher._tasks)
+    refresh.assert_awaited_once_with(*HOT, "ru")
+
+
+@pytest.mark.asyncio
+async def test_refresh_skipped_when_upstream_rate_limited(cache, clock):
+    """Test that background refreshes are charged to the upstream rate limit."""
+    refresh = AsyncMock(return_value="New fact")
+    acquire = AsyncMock(return_value="global")
+    refresher = make_refresher(cache, refresh, clock, acquire=acquire)
+    with patch("bot.services.fact_cache.time.monotonic") as monotonic:
+        monotonic.return_value = 0.0
+        cache.set(*HOT, "ru", "Old fact")
+        refresher.record(*HOT, "ru")
+        monotonic.return_value = 3500.0
+        assert refresher.run_once() == 1
+    await asyncio.gather(*refresher._tasks)
+
+    acquire.assert_awaited_once_with()
+    refresh.assert_not_awaited()
+    assert refresher.stats()["skipped_rate_limit"] == 1
+    assert refresher.refreshes == 0
+
+
+@pytest.mark.asyncio
+async def test_revalidate_runs_once_per_cell(cache, clock):
+    """Test that concurrent stale hits start a single refresh."""
+    gate = asyncio.Event()
+
+    async def refresh(latitude, longitude, language):
+        await gate.wait()
+        return "New fact"
+
+    refresher = make_refresher(cache, refresh, clock)
+
+    assert refresher.revalidate(*HOT, "ru") is True
+    assert refresher.revalidate(*HOT, "ru") is False
+    gate.set()
+    await asyncio.gather(*refresher._tasks)
+
+    assert refresher.stats()["revalidations"] == 1
+    assert refresher.stats()["refreshing"] == 0
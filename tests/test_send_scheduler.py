@@ -0,0 +1,165 @@
+"""Tests for the outbound send scheduler."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from bot.services.send_scheduler import SendScheduler
+
+
+@pytest.fixture
+async def scheduler():
+    """Create scheduler instance with short periods."""
+    instance = SendScheduler(
+        global_rate=50.0,
+        global_burst=5,
+        chat_interval=0.05,
+        max_retries=2,
+        retry_jitter=0.0,
+        typing_delay=0.02,
+        typing_interval=5.0,
+    )
+    yield instance
+    await instance.stop()
+
+
+def recorder(log: list):
+    """Build send calls that record (label, time) when they run."""
+
+    def make(label):
+        async def call():
+            log.append((label, time.monotonic()))
+            return label
+
+        return call
+
+    return make
+
+
+@pytest.mark.asyncio
+async def test_global_limit_spreads_sends(scheduler):
+    """Test that sends beyond the global burst wait for the bucket."""
+    log = []
+    make = recorder(log)
+    started = time.monotonic()
+
+    results = await asyncio.gather(
+        *(scheduler.send(chat_id, make(chat_id)) for chat_id in range(10))
+    )
+
+    assert results == list(range(10))
+    # 5 fit the bucket, 5 more drain at 50/s
+    assert log[-1][1] - started >= 0.08
+    assert scheduler.stats()["sent"] == 10
+
+
+@pytest.mark.asyncio
+async def test_chat_messages_are_spaced_and_ordered(scheduler):
+    """Test per-chat spacing and order."""
+    log = []
+    make = recorder(log)
+
+    await asyncio.gather(*(scheduler.send(1, make(i)) for i in range(3)))
+
+    assert [label for label, _ in log] == [0, 1, 2]
+    gaps = [b[1] - a[1] for a, b in zip(log, log[1:], strict=False)]
+    assert min(gaps) >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_busy_chat_does_not_starve_others(scheduler):
+    """Test round-robin service between chats."""
+    log = []
+    make = recorder(log)
+
+    busy = [scheduler.send(1, make(("busy", i))) for i in range(4)]
+    quiet = scheduler.send(2, make(("quiet", 0)))
+    await asyncio.gather(*busy, quiet)
+
+    order = [label for label, _ in log]
+    assert order.index(("quiet", 0)) < order.index(("busy", 1))
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_chat_and_retries(scheduler):
+    """Test that RetryAfter is retried and the final error surfaces."""
+    call = AsyncMock(side_effect=[RetryAfter(0), "sent"])
+    assert await scheduler.send(1, call) == "sent"
+    assert call.await_count == 2
+
+    failing = AsyncMock(side_effect=RetryAfter(0))
+    with pytest.raises(RetryAfter):
+        await scheduler.send(2, failing)
+    assert failing.await_count == 3
+
+    with pytest.raises(BadRequest):
+        await scheduler.send(3, AsyncMock(side_effect=BadRequest("bad")))
+
+    stats = scheduler.stats()
+    assert stats["retries"] == 4
+    assert stats["failed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_typing_dropped_when_reply_is_imminent(scheduler):
+    """Test that a queued message supersedes a held chat action."""
+    action = AsyncMock()
+
+    scheduler.chat_action(1, action)
+    await scheduler.send(1, AsyncMock())
+    await asyncio.sleep(0.05)
+    action.assert_not_awaited()
+
+    scheduler.chat_action(2, action)
+    scheduler.chat_action(2, action)
+    await asyncio.sleep(0.05)
+    action.assert_awaited_once()
+
+    # Still visible, not repeated
+    scheduler.chat_action(2, action)
+    await asyncio.sleep(0.05)
+    action.assert_awaited_once()
+
+    stats = scheduler.stats()
+    assert stats["typing_sent"] == 1
+    assert stats["typing_dropped"] == 3
+
+
+@pytest.mark.asyncio
+async def test_try_send_skips_when_over_limit(scheduler):
+    """Test that best-effort sends never queue."""
+    call = AsyncMock(return_value="edited")
+
+    assert await scheduler.try_send(1, call) == "edited"
+    assert await scheduler.try_send(1, call) is None
+    await asyncio.sleep(0.06)
+    assert await scheduler.try_send(1, call) == "edited"
+
+    assert call.await_count == 2
+    assert scheduler.stats()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_pauses_are_forgotten(clock):
+    """Test that RetryAfter pauses of chats that never send again are pruned."""
+    scheduler = SendScheduler(
+        global_rate=50.0,
+        global_burst=5,
+        chat_interval=0.05,
+        max_retries=2,
+        retry_jitter=0.0,
+        typing_delay=0.02,
+        typing_interval=5.0,
+        clock=clock,
+    )
+    refused = AsyncMock(side_effect=RetryAfter(3))
+
+    assert await scheduler.try_send(1, refused) is None
+    assert await scheduler.try_send(2, refused) is None
+    assert scheduler.stats()["paused_chats"] == 2
+
+    clock.now += 3
+    assert scheduler.stats()["paused_chats"] == 0
@@ -0,0 +1,194 @@
+"""Tests for sharded update routing."""
+
+import asyncio
+import json
+import multiprocessing
+import queue
+from collections import Counter
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from bot.sharding import (
+    HashRing,
+    ShardRouter,
+    consume,
+    routing_key,
+    split_shared_limits,
+)
+from config.settings import settings
+
+
+def echo_worker(shard_id, num_workers, updates, results):
+    """Worker target reporting every routed update with its shard."""
+    while (body := updates.get()) is not None:
+        results.put((shard_id, body))
+
+
+def test_hash_ring_spreads_keys_evenly():
+    """Test that every node gets a fair share of keys."""
+    ring = HashRing(range(4))
+
+    counts = Counter(ring.node_for(user_id) for user_id in range(10_000))
+
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > 1500
+
+
+def test_hash_ring_adding_node_moves_few_keys():
+    """Test that growing the ring only moves keys to the new node."""
+    ring = HashRing(range(4))
+    before = {key: ring.node_for(key) for key in range(10_000)}
+
+    ring.add(4)
+    moved = {key for key in before if ring.node_for(key) != before[key]}
+
+    assert all(ring.node_for(key) == 4 for key in moved)
+    assert 1000 < len(moved) < 3000
+
+    ring.remove(4)
+    assert all(ring.node_for(key) == node for key, node in before.items())
+
+
+def test_hash_ring_empty():
+    """Test that an empty ring cannot route."""
+    with pytest.raises(LookupError):
+        HashRing([]).node_for(1)
+
+
+def test_routing_key():
+    """Test routing by chat, then sender, then update ID."""
+    message = {"chat": {"id": -100}, "from": {"id": 42}, "location": {}}
+    assert routing_key({"update_id": 1, "message": message}) == -100
+    assert routing_key({"update_id": 1, "edited_message": message}) == -100
+    assert routing_key({"update_id": 1, "channel_post": {"chat": {"id": -5}}}) == -5
+    callback = {"id": "1", "from": {"id": 42}, "message": message}
+    assert routing_key({"update_id": 1, "callback_query": callback}) == -100
+    inline = {"id": "1", "from": {"id": 42}, "query": ""}
+    assert routing_key({"update_id": 1, "inline_query": inline}) == 42
+    assert routing_key({"update_id": 7}) == 7
+
+
+def test_split_shared_limits():
+    """Test that only limits spanning all users are divided."""
+    with patch("bot.sharding.settings") as mock_settings:
+        mock_settings.rate_limit_backend = "memory"
+        mock_settings.rate_limit_cell_requests = 60
+        mock_settings.rate_limit_global_requests = 0
+        mock_settings.rate_limit_requests = 1
+        mock_settings.fact_refresh_token_budget = 200_000
+        mock_settings.send_global_rate = 25.0
+
+        split_shared_limits(4)
+
+        assert mock_settings.rate_limit_cell_requests == 15
+        assert mock_settings.rate_limit_global_requests == 0
+        assert mock_settings.rate_limit_requests == 1
+        assert mock_settings.fact_refresh_token_budget == 50_000
+        assert mock_settings.send_global_rate == 6.25
+
+
+@pytest.mark.asyncio
+async def test_consume_processes_until_stop():
+    """Test that routed bytes are parsed and dispatched."""
+    updates = queue.Queue()
+    for update_id in range(3):
+        updates.put(json.dumps({"update_id": update_id}).encode())
+    updates.put(b"not json")
+    updates.put(None)
+    application = MagicMock()
+    application.process_update = AsyncMock()
+
+    processed = await consume(updates, application)
+
+    assert processed == 3
+    handled = [
+        call.args[0].update_id for call in application.process_update.call_args_list
+    ]
+    assert sorted(handled) == [0, 1, 2]
+
+
+def chat_update(update_id: int, chat_id: int) -> bytes:
+    """Raw payload of a text message in a chat."""
+    message = {
+        "message_id": update_id,
+        "date": 0,
+        "chat": {"id": chat_id, "type": "private"},
+        "text": "hi",
+    }
+    return json.dumps({"update_id": update_id, "message": message}).encode()
+
+
+@pytest.mark.asyncio
+async def test_consume_keeps_chat_order_within_worker_limit():
+    """Test that chats run in order, concurrently, at most workers at a time."""
+    updates = queue.Queue()
+    for update_id in range(12):
+        updates.put(chat_update(update_id, chat_id=update_id % 4))
+    updates.put(None)
+    order: dict[int, list[int]] = {}
+    running = peak = 0
+
+    async def process_update(update):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        order.setdefault(update.effective_chat.id, []).append(update.update_id)
+        running -= 1
+
+    application = MagicMock(bot=None, process_update=process_update)
+    with patch.object(settings, "update_queue_workers", 2):
+        assert await consume(updates, application) == 12
+
+    assert peak == 2
+    assert order == {chat: list(range(chat, 12, 4)) for chat in range(4)}
+
+
+@pytest.mark.asyncio
+async def test_consume_stops_reading_while_max_pending_unfinished():
+    """Test that a busy worker leaves updates in the router's queue."""
+    updates = queue.Queue()
+    for update_id in range(5):
+        updates.put(chat_update(update_id, chat_id=update_id))
+    release = asyncio.Event()
+
+    async def process_update(update):
+        await release.wait()
+
+    application = MagicMock(bot=None, process_update=process_update)
+    with patch.object(settings, "update_queue_max_size", 2):
+        task = asyncio.create_task(consume(updates, application))
+        await asyncio.sleep(0.1)
+        assert updates.qsize() == 3
+
+        updates.put(None)
+        release.set()
+        assert await asyncio.wait_for(task, 5) == 5
+
+
+@pytest.mark.asyncio
+async def test_router_routes_users_to_stable_workers():
+    """Test end to end that each user's updates reach one worker process."""
+    results = multiprocessing.get_context("spawn").Queue()
+    router = ShardRouter(2, queue_size=100, target=echo_worker, args=(results,))
+    router.start()
+    try:
+        for user_id in range(20):
+            for _ in range(2):
+                assert router.route(user_id, str(user_id).encode())
+        received = [results.get(timeout=30) for _ in range(40)]
+    finally:
+        await router.stop()
+
+    shards: dict[bytes, set[int]] = {}
+    for shard_id, body in received:
+        shards.setdefault(body, set()).add(shard_id)
+    assert all(len(owners) == 1 for owners in shards.values())
+    for body, owners in shards.items():
+        assert owners == {router.ring.node_for(int(body))}
+
+    stats = router.stats()
+    assert sum(shard["routed"] for shard in stats["shards"]) == 40
+    assert stats["alive"] == 0
+    assert not router.running
@@ -0,0 +1,132 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from bot.services.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_result():
+    """Test that concurrent callers for one key run fn once."""
+    group = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    tasks = [asyncio.create_task(group.do("key", fn)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["result"] * 3
+    assert calls == 1
+    assert group.stats() == {"in_flight": 0, "started": 1, "shared": 2}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    """Test that distinct keys are not coalesced."""
+    group = SingleFlight()
+
+    async def fn():
+        return "result"
+
+    await asyncio.gather(group.do("a", fn), group.do("b", fn))
+
+    assert group.started == 2
+
+
+@pytest.mark.asyncio
+async def test_error_propagates_to_every_waiter():
+    """Test that an exception reaches all waiters."""
+    group = SingleFlight()
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        raise ValueError("boom")
+
+    tasks = [asyncio.create_task(group.do("key", fn)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    """Test that one waiter leaving keeps the shared call alive."""
+    group = SingleFlight()
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(group.do("key", fn))
+    second = asyncio.create_task(group.do("key", fn))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "result"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_shared_call_cancelled_when_all_waiters_leave():
+    """Test that the shared call is cancelled once nobody waits for it."""
+    group = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fn():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.create_task(group.do("key", fn))
+    await started.wait()
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert group.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_claimed_call_is_joined_until_resolved():
+    """Test that a claimed key is shared and survives its waiters leaving."""
+    group = SingleFlight()
+    flight = group.claim("key")
+    assert group.claim("key") is None
+
+    waiter = asyncio.create_task(group.do("key", AsyncMock()))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert group.is_running("key")
+
+    second = asyncio.create_task(group.do("key", AsyncMock()))
+    await asyncio.sleep(0)
+    flight.set_result("streamed")
+
+    assert await second == "streamed"
+    assert not group.is_running("key")
+    assert group.stats()["started"] == 1
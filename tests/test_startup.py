@@ -0,0 +1,54 @@
+"""Tests for startup helpers."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from bot.services.startup import StartupTimer, ensure_webhook
+
+URL = "https://bot.example.com/webhook"
+
+
+def make_bot(registered_url: str) -> AsyncMock:
+    """Create a bot mock with a registered webhook URL."""
+    bot = AsyncMock()
+    bot.get_webhook_info.return_value = SimpleNamespace(url=registered_url)
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_ensure_webhook_skips_registered_url():
+    """Test that set_webhook is skipped when the URL already matches."""
+    bot = make_bot(URL)
+
+    assert await ensure_webhook(bot, URL) is False
+    bot.set_webhook.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ensure_webhook_sets_changed_url():
+    """Test that a different or missing URL is registered."""
+    bot = make_bot("")
+
+    assert await ensure_webhook(bot, URL) is True
+    bot.set_webhook.assert_awaited_once_with(URL)
+
+
+def test_startup_timer_records_phases_and_milestones():
+    """Test phase and milestone reporting."""
+    timer = StartupTimer()
+    timer.record("imports", 0.25)
+    with timer.phase("initialize"):
+        pass
+
+    timer.mark_ready()
+    timer.mark_first_update()
+    first_update = timer.first_update_after
+    timer.mark_first_update()
+
+    stats = timer.stats()
+    assert stats["phases_ms"]["imports"] == 250.0
+    assert "initialize" in stats["phases_ms"]
+    assert stats["ready_ms"] is not None
+    assert timer.first_update_after == first_update
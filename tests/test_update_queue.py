@@ -0,0 +1,113 @@
+"""Tests for background update queue."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from bot.services.update_queue import UpdateQueue
+
+
+def make_queue(max_size=2, workers=1, policy="block"):
+    """Create update queue instance with the given settings."""
+    with patch("bot.services.update_queue.settings") as mock_settings:
+        mock_settings.update_queue_max_size = max_size
+        mock_settings.update_queue_workers = workers
+        mock_settings.update_queue_overflow_policy = policy
+        return UpdateQueue()
+
+
+@pytest.mark.asyncio
+async def test_workers_process_enqueued_items():
+    """Test that all enqueued items are handled by the workers."""
+    queue = make_queue(max_size=10, workers=3)
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+
+    queue.start(handler)
+    for i in range(5):
+        assert await queue.put(i) is True
+    await queue.stop()
+
+    assert sorted(handled) == [0, 1, 2, 3, 4]
+    stats = queue.stats()
+    assert stats["processed"] == 5
+    assert stats["depth"] == 0
+    assert not queue.running
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_are_counted_and_do_not_kill_workers():
+    """Test that a failing item does not stop the worker."""
+    queue = make_queue(max_size=10)
+    handled = []
+
+    async def handler(item):
+        if item == "bad":
+            raise ValueError("boom")
+        handled.append(item)
+
+    queue.start(handler)
+    await queue.put("bad")
+    await queue.put("good")
+    await queue.stop()
+
+    assert handled == ["good"]
+    assert queue.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_shed_policy_rejects_when_full():
+    """Test that new items are shed when the queue is full."""
+    queue = make_queue(max_size=2, policy="shed")
+
+    assert await queue.put(1) is True
+    assert await queue.put(2) is True
+    assert await queue.put(3) is False
+    assert queue.shed == 1
+    assert queue.stats()["depth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_keeps_newest():
+    """Test that the oldest item is dropped to make room."""
+    queue = make_queue(max_size=2, policy="drop_oldest")
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+
+    for item in (1, 2, 3):
+        assert await queue.put(item) is True
+    queue.start(handler)
+    await queue.stop()
+
+    assert handled == [2, 3]
+    assert queue.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_free_slot():
+    """Test that put blocks until a worker frees a slot."""
+    queue = make_queue(max_size=1, policy="block")
+    await queue.put(1)
+
+    blocked = asyncio.create_task(queue.put(2))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    async def handler(item):
+        pass
+
+    queue.start(handler)
+    assert await asyncio.wait_for(blocked, 1) is True
+    await queue.stop()
+    assert queue.processed == 2
+
+
+def test_unknown_policy_is_rejected():
+    """Test that invalid overflow policies fail fast."""
+    with pytest.raises(ValueError):
+        make_queue(policy="random")